@@ -1,5 +1,98 @@
 # config.py
 # Stores folder path constants and possibly other environment/configuration variables.
 
+import os
+
 FRAMES_PATH = "./data/frames"
 ANNOTATIONS_PATH = "./data/annotations"
+
+# Trained detector used to pre-annotate converted frames
+MODEL_PATH = "./data/models/best.pt"
+# Exported model served with onnxruntime/OpenCV instead of torch when it exists
+ONNX_MODEL_PATH = "./data/models/best.onnx"
+CLASS_MAPPING_PATH = "./data/processed/yolo/class_mapping.json"
+PREANNOTATION_WORKERS = 1
+PREANNOTATION_CONFIDENCE = 0.25
+
+# Number of finished background jobs kept around for status polling
+JOB_HISTORY_LIMIT = 1000
+# Job records shared by all worker processes, so any worker can report or cancel a job
+JOBS_PATH = "./data/cache/jobs.db"
+
+# Number of directories whose listing is kept in the in-memory index
+LISTING_INDEX_LIMIT = 256
+# Number of annotation files whose isReady/isValid flags are kept in memory for listing filters
+ANNOTATION_STATUS_CACHE_LIMIT = 200000
+# Number of files whose content ETag (SHA-1) is kept in memory
+CONTENT_HASH_CACHE_LIMIT = 200000
+
+# Downscaled previews of frames: longest side in pixels per size name
+THUMBNAIL_SIZES = {"small": 160, "medium": 480, "large": 1280}
+THUMBNAIL_CACHE_PATH = "./data/cache/thumbnails"
+THUMBNAIL_CACHE_MAX_MB = 2048
+THUMBNAIL_WORKERS = 4
+
+# Browser caching: extracted frames never change in place, annotations are revalidated on every use
+FRAME_CACHE_MAX_AGE = 7 * 24 * 3600
+
+# DeepZoom-style tile pyramids for zooming into large frames
+PYRAMID_CACHE_PATH = "./data/cache/pyramids"
+PYRAMID_CACHE_MAX_MB = 8192
+PYRAMID_TILE_SIZE = 254
+PYRAMID_TILE_OVERLAP = 1
+PYRAMID_TILE_FORMAT = "jpg"
+
+# Bulk frame conversion: concurrent conversions within one job
+CONVERSION_WORKERS = 8
+
+# Concurrent annotation file reads for batch fetches
+BATCH_READ_WORKERS = 8
+
+# Lock files used to serialize writers of the same annotation across worker processes
+LOCKS_PATH = "./data/cache/locks"
+# Paths hash onto this many locks (and lock files), so unrelated files rarely wait on each other
+LOCK_STRIPES = 1024
+
+# SQLite search index over annotations, keywords and OCR text
+SEARCH_INDEX_PATH = "./data/cache/search.db"
+
+# Aggregated dataset statistics, maintained incrementally on every annotation write
+STATS_PATH = "./data/cache/stats.db"
+
+# Indentation of annotation files on disk; None writes compact JSON (smaller and faster to parse)
+ANNOTATION_JSON_INDENT = 2
+
+# Response compression: bodies below this size are sent as is
+COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Compressed bodies of recently served annotation files, per worker
+COMPRESSED_CACHE_MAX_MB = 64
+
+# Columnar (NumPy) packs of the annotation folders, refreshed from the JSON files on read
+COLUMNAR_PATH = "./data/cache/columnar"
+
+# Video timelines: cached segment tables and thumbnail sprite sheets, rebuilt when a video folder changes
+TIMELINE_CACHE_PATH = "./data/cache/timelines"
+# Videos whose parsed segment JSONs are kept in memory, per worker
+TIMELINE_SEGMENT_CACHE_SIZE = 32
+TIMELINE_SPRITE_TILE_WIDTH = 96
+TIMELINE_SPRITE_COLUMNS = 20
+TIMELINE_SPRITE_TILES = 400
+
+# Content-addressed store of frame images; the frame folders hold links to its blobs
+BLOB_STORE_PATH = "./data/blobs"
+# How blobs are materialized at their paths: "auto" (reflink, else hard link, else copy), "reflink", "hardlink" or "copy"
+BLOB_LINK_MODE = "auto"
+# Folders moved into the store by `python -m backend.services.blob_service ingest`
+BLOB_ROOTS = [FRAMES_PATH, ANNOTATIONS_PATH, "./data/processed/frames"]
+# Garbage collection keeps unreferenced blobs younger than this (writes still in flight)
+BLOB_GC_MIN_AGE_SECONDS = 3600
+
+# Change notifications: events are coalesced for this long before being pushed to clients
+EVENTS_DEBOUNCE_SECONDS = 0.25
+# Watch FRAMES_PATH and ANNOTATIONS_PATH (watchfiles); the only event source shared by all workers
+EVENTS_WATCH_FILESYSTEM = True
+
+# Built frontend (npm run build) served by the backend in production mode; set by start.py --prod
+FRONTEND_DIST_PATH = os.environ.get("FRONTEND_DIST_PATH")
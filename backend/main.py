@@ -1,11 +1,27 @@
+import os
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .config import FRONTEND_DIST_PATH
 from .routes.datasets import router as datasets_router
+from .routes.events import router as events_router
 from .routes.frames import router as frames_router
+from .routes.frontend import mount_frontend
+from .routes.health import router as health_router
+from .routes.jobs import router as jobs_router
+from .routes.metrics import router as metrics_router
+from .routes.search import router as search_router
+from .routes.stats import router as stats_router
+from .routes.videos import router as videos_router
+from .services.caching_service import FastJSONResponse
+from .services.compression_service import CompressionMiddleware
+from .services.events_service import start_events, stop_events
+from .services.health_service import mark_shutting_down
+from .services.jobs_service import shutdown_jobs
+from .services.metrics_service import MetricsMiddleware
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Allow all origins, methods, and headers for now (development only!)
 app.add_middleware(
@@ -14,15 +30,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # clients send it back as If-Match on saves
 )
 
+# gzip/brotli for JSON and listing responses that are not already encoded
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, bytes served and in-flight requests, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include the routers in the main FastAPI app
 app.include_router(datasets_router, prefix="/datasets")
 app.include_router(frames_router, prefix="/frames")
+app.include_router(jobs_router, prefix="/jobs")
+app.include_router(metrics_router, prefix="/metrics")
+app.include_router(search_router, prefix="/search")
+app.include_router(stats_router, prefix="/stats")
+app.include_router(videos_router, prefix="/videos")
+app.include_router(events_router, prefix="/events")
+app.include_router(health_router)
+
+@app.on_event("startup")
+async def startup():
+    start_events()
+
+@app.on_event("shutdown")
+def shutdown():
+    # In-flight requests are drained by uvicorn before this runs; stop background work last
+    mark_shutting_down()
+    stop_events()
+    shutdown_jobs()
 
-@app.get("/")
-def read_root():
-    return {"message": "Hello from your ML annotation backend!"}
+if FRONTEND_DIST_PATH and os.path.isdir(FRONTEND_DIST_PATH):
+    # Production: the built frontend is served from "/" by the same workers
+    mount_frontend(app, FRONTEND_DIST_PATH)
+else:
+    @app.get("/")
+    def read_root():
+        return {"message": "Hello from your ML annotation backend!"}
 
 if __name__ == "__main__":
     # Run with:  uvicorn main:app --reload
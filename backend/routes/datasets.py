@@ -1,20 +1,45 @@
 # datasets.py
 # FastAPI router to handle listing dataset folders, images, and handling annotation updates.
 
-from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from typing import Any, Dict, List, Optional, Union
 import os
 
 from ..config import ANNOTATIONS_PATH, FRAMES_PATH
+from ..services.caching_service import conditional_file_response, content_etag
+from ..services.columnar_service import pack_file
+from ..services.compression_service import negotiate_encoding
+from ..services.file_service import VersionConflictError
 from ..services.datasets_service import (
+    BATCH_FORMATS,
+    apply_hierarchy,
     get_file_contents,
+    infer_annotation_hierarchy,
+    iter_annotations_batch,
+    list_annotation_files,
     list_datasets_items,
     load_annotation,
+    patch_annotation,
     save_annotation,
+    stream_annotations_batch,
 )
 
 router = APIRouter()
 
+
+class BatchAnnotationsRequest(BaseModel):
+    paths: List[str]
+    fields: Optional[List[str]] = None
+    annotation_fields: Optional[List[str]] = None
+    format: str = "ndjson"
+
+
+class HierarchyRequest(BaseModel):
+    annotations: List[Dict[str, Any]]
+
+
 def set_no_cache_headers(response: Response):
     """Utility function to set no-cache headers and remove ETag."""
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
@@ -25,13 +50,20 @@ def set_no_cache_headers(response: Response):
         del response.headers["etag"]
 
 
-@router.get("/list", response_model=List[str])
+@router.get("/list", response_model=Union[List[str], Dict[str, Any]])
 def list_datasets(
     path: Optional[str] = Query(None, description="Optional subpath within the frames directory"),
+    sort: str = Query("name", description="Sort by name, frame (index in the file name) or mtime"),
+    order: str = Query("asc", description="asc or desc"),
+    is_ready: Optional[bool] = Query(None, description="Only files whose isReady flag matches"),
+    is_valid: Optional[bool] = Query(None, description="Only files whose isValid flag matches"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     response: Response = None
 ):
     """
     Returns a nested list of folders and images in the datasets folder.
+    With a limit the response is a page: {"items", "next_cursor", "total"}.
     """
     # Ensure we set no-cache before returning
     set_no_cache_headers(response)
@@ -43,22 +75,26 @@ def list_datasets(
         raise FileNotFoundError(f"Path '{target_path}' does not exist.")
 
     try:
-        items = list_datasets_items(target_path)
+        items = list_datasets_items(target_path, sort=sort, descending=(order == "desc"),
+                                    is_ready=is_ready, is_valid=is_valid, limit=limit, cursor=cursor)
         return items
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/file", response_model=Union[List[str], str])
 def list_frames(
     path: Optional[str] = Query(None, description="Optional subpath"),
-    response: Response = None
+    request: Request = None
 ):
     """
     Returns the contents of a file if the path points to a file.
     Otherwise, returns an empty string.
+    Files carry ETag/Last-Modified validators; a matching If-None-Match or
+    If-Modified-Since is answered with 304 Not Modified.
     """
-    set_no_cache_headers(response)
 
     try:
         # Construct the full path, deciding between ANNOTATIONS_PATH and FRAMES_PATH
@@ -78,7 +114,7 @@ def list_frames(
 
         # If it's a file, return its contents
         if os.path.isfile(target_path):
-            return get_file_contents(target_path)
+            return get_file_contents(target_path, request.headers)
 
         # Otherwise, return an empty string
         return ""
@@ -94,18 +130,172 @@ def list_frames(
 def update_annotations(
     path: str,
     annotations: Dict[str, Any],
-    response: Response = None
+    response: Response = None,
+    if_match: Optional[str] = Header(None)
 ):
     """
     Save/Update annotations for a given image in the datasets folder.
     Overwrites the existing annotation file with the new annotations.
+    When an If-Match ETag is sent, the save fails with 412 if the file changed since.
     """
     set_no_cache_headers(response)
 
     try:
-        save_annotation(path, ANNOTATIONS_PATH, annotations)
+        annotation_path = save_annotation(path, ANNOTATIONS_PATH, annotations, if_match=if_match)
+        # Let the client revalidate its cached copy against the new version
+        response.headers["ETag"] = content_etag(annotation_path)
         return {"message": "Annotations saved successfully."}
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/annotations")
+def patch_annotations(
+    path: str,
+    patch: Union[List[Dict[str, Any]], Dict[str, Any]],
+    response: Response = None,
+    if_match: Optional[str] = Header(None)
+):
+    """
+    Partially update the annotations of an image instead of resending the whole document.
+    The body is either a JSON Patch (RFC 6902) operation list, or an object with
+    "upsert" (annotation objects, matched by id), "delete" (annotation ids) and
+    "set" (top-level fields). With If-Match the patch fails with 412 if the file
+    changed since that ETag. Returns the new ETag.
+    """
+    set_no_cache_headers(response)
+
+    try:
+        annotation_path, _ = patch_annotation(path, ANNOTATIONS_PATH, patch, if_match=if_match)
+        etag = content_etag(annotation_path)
+        response.headers["ETag"] = etag
+        return {"message": "Annotations patched successfully.", "etag": etag}
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _batch_response(relative_paths, fields, annotation_fields, output_format, request: Request):
+    if output_format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{output_format}'.")
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    records = iter_annotations_batch(ANNOTATIONS_PATH, relative_paths, fields, annotation_fields)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        stream_annotations_batch(records, output_format, encoding),
+        media_type="application/x-ndjson" if output_format == "ndjson" else "application/json",
+        headers=headers,
+    )
+
+
+def _split_fields(value: Optional[str]):
+    return [field.strip() for field in value.split(",") if field.strip()] if value else None
+
+
+@router.post("/hierarchy")
+def infer_hierarchy_route(body: HierarchyRequest, response: Response = None):
+    """
+    Infer parent_id/children for a list of annotations from bounding box containment.
+    The parent of each annotation is the smallest box that fully contains it. Nothing is saved.
+    """
+    set_no_cache_headers(response)
+
+    try:
+        return {"annotations": infer_annotation_hierarchy(body.annotations)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/annotations/hierarchy")
+def apply_hierarchy_route(
+    path: str,
+    response: Response = None,
+    if_match: Optional[str] = Header(None)
+):
+    """
+    Rebuild parent_id/children of a saved annotation file from box containment and save it.
+    With If-Match the update fails with 412 if the file changed since that ETag.
+    Returns the updated annotations and the new ETag.
+    """
+    set_no_cache_headers(response)
+
+    try:
+        annotation_path, data = apply_hierarchy(path, ANNOTATIONS_PATH, if_match=if_match)
+        etag = content_etag(annotation_path)
+        response.headers["ETag"] = etag
+        return {"message": "Hierarchy applied successfully.", "etag": etag, "annotations": data.get("annotations", [])}
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batch")
+def get_annotations_batch(
+    path: Optional[str] = Query(None, description="Optional subpath of a folder within the datasets directory"),
+    fields: Optional[str] = Query(None, description="Comma-separated top-level fields to keep, e.g. name,frame,annotations"),
+    annotation_fields: Optional[str] = Query(None, description="Comma-separated annotation fields to keep, e.g. id,component_type,bounding_box"),
+    format: str = Query("ndjson", description="ndjson (one record per line) or json (array)"),
+    request: Request = None
+):
+    """
+    Streams the annotation JSON of every file in a folder in one response.
+    Each record is {"path", "data"} or {"path", "error"}; files are read concurrently.
+    """
+    if path and (os.path.isabs(path) or ".." in path.split("/")):
+        raise HTTPException(status_code=400, detail=f"Invalid path '{path}'.")
+    try:
+        relative_paths = list_annotation_files(ANNOTATIONS_PATH, path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return _batch_response(relative_paths, _split_fields(fields), _split_fields(annotation_fields), format, request)
+
+
+@router.post("/batch")
+def post_annotations_batch(body: BatchAnnotationsRequest, request: Request = None):
+    """
+    Streams the annotation JSON of an explicit list of files in one response.
+    """
+    for relative_path in body.paths:
+        if os.path.isabs(relative_path) or ".." in relative_path.split("/"):
+            raise HTTPException(status_code=400, detail=f"Invalid path '{relative_path}'.")
+    return _batch_response(body.paths, body.fields, body.annotation_fields, body.format, request)
+
+
+@router.get("/columnar")
+def get_columnar_pack(
+    path: Optional[str] = Query(None, description="Optional subpath of a folder within the datasets directory"),
+    request: Request = None
+):
+    """
+    Returns the annotations of a folder as a NumPy .npz pack (struct-of-arrays
+    boxes, ids, parent ids and class codes plus JSON side tables), refreshed
+    from the JSON files first. JSON stays available through /file and /batch.
+    """
+    if path and (os.path.isabs(path) or ".." in path.split("/")):
+        raise HTTPException(status_code=400, detail=f"Invalid path '{path}'.")
+    try:
+        pack_path = pack_file(path, ANNOTATIONS_PATH)
+        return conditional_file_response(pack_path, "application/octet-stream", request.headers,
+                                         filename=f"{os.path.basename(path or 'annotations')}.npz")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IOError as e:
+        raise HTTPException(status_code=500, detail=str(e))
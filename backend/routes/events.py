@@ -0,0 +1,39 @@
+# events.py
+# FastAPI router streaming change notifications to clients as Server-Sent Events.
+
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from ..services.events_service import ROOTS, subscribe
+
+router = APIRouter()
+
+@router.get("")
+async def stream_events(
+    root: Optional[str] = Query(None, description="frames or annotations; both when omitted"),
+    path: Optional[str] = Query(None, description="Only events in this folder (and below)"),
+    request: Request = None
+):
+    '''
+    Server-Sent Events stream of debounced change batches for a folder. Each message is
+    "event: changes" with a JSON list of {type, root, path}; a "resync" event means
+    the client fell behind and should reload the folder.
+    '''
+    if root is not None and root not in ROOTS:
+        raise HTTPException(status_code=400, detail=f"Invalid root '{root}'.")
+
+    async def event_stream():
+        yield "retry: 3000\n\n"
+        async for batch in subscribe(root, path, request.is_disconnected):
+            if batch is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: changes\ndata: {json.dumps(batch)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
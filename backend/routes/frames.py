@@ -1,22 +1,44 @@
 # frames.py
 # FastAPI router to handle listing frame folders, images, and converting them for annotation.
 
-from fastapi import APIRouter, HTTPException, Query, Response
-from typing import List, Optional, Union
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
 import os
 import shutil
 import json
 
 from ..config import FRAMES_PATH, ANNOTATIONS_PATH
 from ..services.frames_service import get_file_contents, list_frames_items, convert_frame_to_dataset
+from ..services.caching_service import IMMUTABLE_CACHE_CONTROL, conditional_file_response
+from ..services.conversion_service import enqueue_bulk_conversion, resolve_frame_paths
+from ..services.preannotation_service import enqueue_preannotation
+from ..services.pyramid_service import get_pyramid_info, get_tile_path
+from ..services.thumbnail_service import get_thumbnail_contents, warm_thumbnails
 
 router = APIRouter()
 
-@router.get("/list", response_model=Union[List[str], str])
-def list_frames(path: Optional[str] = Query(None, description="Optional subpath within the frames directory")):
+
+class BulkConvertRequest(BaseModel):
+    folder: Optional[str] = None
+    glob: Optional[str] = None
+    paths: Optional[List[str]] = None
+    recursive: bool = False
+    preannotate: bool = False
+
+
+@router.get("/list", response_model=Union[List[str], Dict[str, Any], str])
+def list_frames(path: Optional[str] = Query(None, description="Optional subpath within the frames directory"),
+    sort: str = Query("name", description="Sort by name, frame (index in the file name) or mtime"),
+    order: str = Query("asc", description="asc or desc"),
+    status: str = Query("unannotated", description="all, annotated or unannotated frames"),
+    diff: str = Query("exclude", description="exclude, include or only '_diff' frames"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")):
     '''
     Returns the contents of a file if the path points to a file.
     Otherwise, lists the folders and images in the specified directory.
+    With a limit the response is a page: {"items", "next_cursor", "total"}.
     '''
     try:
         # Construct the full path based on the query parameter
@@ -31,7 +53,8 @@ def list_frames(path: Optional[str] = Query(None, description="Optional subpath
             return ""
 
         # If the path is a directory, list its contents
-        items = list_frames_items(target_path)
+        items = list_frames_items(target_path, sort=sort, descending=(order == "desc"),
+                                  status=status, diff=diff, limit=limit, cursor=cursor)
         return items
 
     except FileNotFoundError as e:
@@ -43,16 +66,13 @@ def list_frames(path: Optional[str] = Query(None, description="Optional subpath
 
 @router.get("/file", response_model=Union[List[str], str])
 def list_frames(path: Optional[str] = Query(None, description="Optional subpath within the frames directory"),
-    response: Response = None):
+    request: Request = None):
     '''
     Returns the contents of a file if the path points to a file.
     Otherwise, lists the folders and images in the specified directory.
+    Frames are served with ETag/Last-Modified validators and long-lived cache headers.
     '''
 
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-
     try:
         # Construct the full path based on the query parameter
         target_path = FRAMES_PATH + '/' + path if path else FRAMES_PATH
@@ -63,7 +83,7 @@ def list_frames(path: Optional[str] = Query(None, description="Optional subpath
 
         # If the path is a file, return its contents
         if os.path.isfile(target_path):
-            return get_file_contents(target_path)
+            return get_file_contents(target_path, request.headers)
         return ""
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -73,19 +93,112 @@ def list_frames(path: Optional[str] = Query(None, description="Optional subpath
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/thumbnail")
+def get_thumbnail(path: str = Query(..., description="Subpath of an image within the frames directory"),
+    size: str = Query("medium", description="small, medium or large"),
+    request: Request = None):
+    '''
+    Returns a downscaled JPEG preview of a frame, generated once and cached on disk.
+    '''
+    try:
+        return get_thumbnail_contents(os.path.join(FRAMES_PATH, path), size, request.headers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IOError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/pyramid")
+def get_pyramid_descriptor(path: str = Query(..., description="Subpath of an image within the frames directory")):
+    '''
+    Returns the DeepZoom-style descriptor (size, tile size, overlap, format, max_level) of a frame.
+    The tile pyramid is built on the first request and cached on disk.
+    '''
+    try:
+        return get_pyramid_info(os.path.join(FRAMES_PATH, path))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IOError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/tile")
+def get_pyramid_tile(path: str = Query(..., description="Subpath of an image within the frames directory"),
+    level: int = Query(..., description="Pyramid level; max_level is full resolution"),
+    col: int = Query(..., description="Tile column"),
+    row: int = Query(..., description="Tile row"),
+    request: Request = None):
+    '''
+    Returns one tile of a frame's pyramid so clients only fetch the visible area.
+    '''
+    try:
+        tile_path = get_tile_path(os.path.join(FRAMES_PATH, path), level, col, row)
+        media_type = "image/jpeg" if tile_path.endswith(".jpg") else f"image/{os.path.splitext(tile_path)[1][1:]}"
+        return conditional_file_response(tile_path, media_type, request.headers, cache_control=IMMUTABLE_CACHE_CONTROL)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IOError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/thumbnails/warm")
+def warm_folder_thumbnails(path: Optional[str] = Query(None, description="Optional subpath within the frames directory"),
+    size: str = Query("medium", description="small, medium or large")):
+    '''
+    Queues thumbnail generation for every frame in a folder so browsing it hits the cache.
+    '''
+    try:
+        target_path = FRAMES_PATH + '/' + path if path else FRAMES_PATH
+        names = list_frames_items(target_path, status="all")
+        file_paths = [os.path.join(target_path, name) for name in names
+                      if os.path.splitext(name)[1]]
+        return {"queued": warm_thumbnails(file_paths, size)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/convert")
-def convert_frame(path: str):
+def convert_frame(path: str, preannotate: bool = False):
     '''
     Given a path to an image in the frames folder, copy it (and optional JSON)
     into the datasets folder with the same folder structure.
     If the JSON doesn't exist, create an empty one.
+    With preannotate=true the frame is also queued for the detector; poll the
+    returned job_id on /jobs/{job_id} for its status.
     '''
     try:
         convert_frame_to_dataset(path, FRAMES_PATH, ANNOTATIONS_PATH)
-        return {"message": f"Converted '{path}' to dataset successfully."}
+        result = {"message": f"Converted '{path}' to dataset successfully."}
+        if preannotate:
+            result["job_id"] = enqueue_preannotation(path, FRAMES_PATH, ANNOTATIONS_PATH)
+        return result
     except FileNotFoundError as e:
         print(e)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/convert/bulk")
+def convert_frames_bulk(body: BulkConvertRequest):
+    '''
+    Convert every frame selected by a folder (optionally recursive), a glob pattern
+    and/or a list of paths in one background job. Frames that already have an
+    annotation JSON are skipped. Poll /jobs/{job_id} for progress and cancel with
+    POST /jobs/{job_id}/cancel.
+    '''
+    try:
+        relative_paths = resolve_frame_paths(FRAMES_PATH, body.folder, body.glob, body.paths, body.recursive)
+        job_id = enqueue_bulk_conversion(relative_paths, FRAMES_PATH, ANNOTATIONS_PATH, body.preannotate)
+        return {"job_id": job_id, "total": len(relative_paths)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
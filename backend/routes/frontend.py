@@ -0,0 +1,41 @@
+# frontend.py
+# Serves the built frontend (frontend/dist) as static files in production mode.
+
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.staticfiles import StaticFiles
+
+from ..services.caching_service import IMMUTABLE_CACHE_CONTROL
+
+
+class SinglePageApp(StaticFiles):
+    '''
+    Static files with the index.html fallback a client-side router needs: a page
+    request (Accept: text/html) for an unknown path such as /annotation gets the app.
+    Vite's hashed assets/ files never change and are cached long-term.
+    '''
+    async def get_response(self, path, scope):
+        try:
+            response = await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            if e.status_code != 404 or not self._wants_html(scope):
+                raise
+            return await super().get_response("index.html", scope)
+
+        if response.status_code == 404 and self._wants_html(scope):
+            return await super().get_response("index.html", scope)
+        if response.status_code == 200 and path.startswith("assets/"):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    @staticmethod
+    def _wants_html(scope) -> bool:
+        accept = dict(scope.get("headers") or []).get(b"accept", b"")
+        return scope.get("method") in ("GET", "HEAD") and b"text/html" in accept
+
+
+def mount_frontend(app, directory: str):
+    '''
+    Serve the built frontend at "/". Must be called after all API routers are included,
+    so their routes take precedence.
+    '''
+    app.mount("/", SinglePageApp(directory=directory, html=True), name="frontend")
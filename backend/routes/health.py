@@ -0,0 +1,32 @@
+# health.py
+# FastAPI router with the liveness and readiness endpoints.
+
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..services.health_service import readiness_checks
+
+router = APIRouter()
+
+@router.get("/health")
+def health():
+    '''
+    Liveness: the worker process is up and its event loop answers.
+    '''
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@router.get("/ready")
+def ready():
+    '''
+    Readiness: the data folders and SQLite stores are reachable and the worker
+    is not shutting down. Answers 503 with the failing checks otherwise.
+    '''
+    checks = readiness_checks()
+    is_ready = all(checks.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not ready", "checks": checks, "pid": os.getpid()},
+    )
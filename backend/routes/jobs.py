@@ -0,0 +1,29 @@
+# jobs.py
+# FastAPI router to poll the status of background jobs.
+
+from fastapi import APIRouter, HTTPException
+
+from ..services.jobs_service import cancel_job, get_job
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+def job_status(job_id: str):
+    '''
+    Returns the status (queued, running, completed, failed, cancelled), progress and result of a background job.
+    '''
+    try:
+        return get_job(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{job_id}/cancel")
+def cancel(job_id: str):
+    '''
+    Requests cancellation of a queued or running job and returns its current status.
+    '''
+    try:
+        return cancel_job(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
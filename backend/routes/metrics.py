@@ -0,0 +1,31 @@
+# metrics.py
+# FastAPI router exposing the process metrics for Prometheus and as JSON.
+
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics_service import render_prometheus, snapshot
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+def read_metrics():
+    '''
+    Returns the metrics of the worker process serving the request in the Prometheus
+    text exposition format. Every worker keeps its own registry, so each series
+    carries a pid label: with several workers a scrape sees one of them, and the
+    series of different workers never look like counter resets of each other.
+    Sum over pid to aggregate.
+    '''
+    return PlainTextResponse(render_prometheus(pid=os.getpid()), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/json")
+def read_metrics_json():
+    '''
+    Returns the metrics of the worker process serving the request as JSON
+    ({"pid", "metrics"}, see metrics_service.snapshot).
+    '''
+    return {"pid": os.getpid(), "metrics": snapshot()}
@@ -0,0 +1,39 @@
+# search.py
+# FastAPI router to query the annotation search index.
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from ..config import ANNOTATIONS_PATH
+from ..services.search_service import enqueue_index_rebuild, search
+
+router = APIRouter()
+
+@router.get("")
+def search_annotations(
+    component_type: Optional[str] = Query(None, description="Exact component type, e.g. Button"),
+    text: Optional[str] = Query(None, description="Phrase in the component's text, e.g. Save"),
+    keyword: Optional[str] = Query(None, description="Frame keyword"),
+    is_ready: Optional[bool] = Query(None),
+    is_valid: Optional[bool] = Query(None),
+    limit: int = Query(100, ge=1, le=5000),
+    offset: int = Query(0, ge=0)
+):
+    '''
+    Returns the annotation files matching every given criterion, e.g.
+    frames containing a Button with text 'Save', or all frames with a keyword.
+    Each item lists the ids of the matching annotations.
+    '''
+    try:
+        items = search(component_type, text, keyword, is_ready, is_valid, limit, offset)
+        return {"items": items, "limit": limit, "offset": offset}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/rebuild")
+def rebuild():
+    '''
+    Re-creates the search index from every annotation file in a background job.
+    '''
+    return {"job_id": enqueue_index_rebuild(ANNOTATIONS_PATH)}
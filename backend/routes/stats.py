@@ -0,0 +1,25 @@
+# stats.py
+# FastAPI router to read and rebuild the aggregated dataset statistics.
+
+from fastapi import APIRouter
+
+from ..config import ANNOTATIONS_PATH
+from ..services.stats_service import enqueue_stats_rebuild, get_stats
+
+router = APIRouter()
+
+@router.get("")
+def read_stats():
+    '''
+    Returns frame counts (total, isReady, isValid), the number of boxes and, per
+    component_type, its box count, frame count and box-size histogram.
+    '''
+    return get_stats()
+
+
+@router.post("/rebuild")
+def rebuild():
+    '''
+    Recomputes the statistics from every annotation file in a background job.
+    '''
+    return {"job_id": enqueue_stats_rebuild(ANNOTATIONS_PATH)}
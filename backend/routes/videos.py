@@ -0,0 +1,48 @@
+# videos.py
+# FastAPI router to serve the segment timeline of an extracted video and its thumbnail sprite sheets.
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from ..services.caching_service import conditional_file_response
+from ..services.timeline_service import get_sprite_path, get_timeline_path
+
+router = APIRouter()
+
+
+@router.get("/{video_id:path}/timeline")
+def read_timeline(video_id: str, request: Request = None):
+    '''
+    Returns the segment table of a video folder (e.g. recordings/video_00) as
+    columnar arrays: frames, start/end frame indices, start/end seconds,
+    mean_diff and annotation status flags, plus the sprite sheet layout.
+    The table is cached until the folder or its annotations change and is
+    revalidated with its ETag.
+    '''
+    try:
+        return conditional_file_response(get_timeline_path(video_id), "application/json", request.headers,
+                                         compress=True)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IOError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{video_id:path}/timeline/sprite")
+def read_timeline_sprite(
+    video_id: str,
+    sheet: int = Query(0, ge=0, description="Sheet index (segment i is on sheet i // tiles_per_sheet)"),
+    request: Request = None
+):
+    '''
+    Returns one JPEG sprite sheet of tiny segment thumbnails for hover previews.
+    '''
+    try:
+        return conditional_file_response(get_sprite_path(video_id, sheet), "image/jpeg", request.headers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IOError as e:
+        raise HTTPException(status_code=500, detail=str(e))
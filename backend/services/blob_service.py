@@ -0,0 +1,368 @@
+# blob_service.py
+# Contains the content-addressed store of frame images, materialized into the frame folders as reflinks or hard links.
+
+import os
+import time
+import errno
+import shutil
+import sqlite3
+import hashlib
+import stat
+import argparse
+import threading
+
+import cv2
+
+from ..config import BLOB_GC_MIN_AGE_SECONDS, BLOB_LINK_MODE, BLOB_ROOTS, BLOB_STORE_PATH
+from .file_service import atomic_write_bytes
+from .metrics_service import increment
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks
+    fcntl = None
+
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+BLOB_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Linux ioctl making a file share the extents of another (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS refs (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+_local = threading.local()
+# Link methods that failed with "not supported" under auto mode; not retried by this process
+_unsupported = set()
+
+
+def _connect():
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        os.makedirs(BLOB_STORE_PATH, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(BLOB_STORE_PATH, "refs.db"), timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        _local.connection = connection
+    return connection
+
+
+def blob_path(digest: str) -> str:
+    return os.path.join(BLOB_STORE_PATH, "objects", digest[:2], digest[2:4], digest)
+
+
+def _temp_path(file_path: str) -> str:
+    # Hidden and without the target extension, so listings ignore it
+    return os.path.join(os.path.dirname(file_path) or ".",
+                        f".{os.path.basename(file_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _remove(file_path: str):
+    try:
+        _make_writable(file_path)
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def _make_writable(file_path: str):
+    # Windows refuses to delete or rename over read-only files (as left by earlier versions of the store)
+    mode = os.stat(file_path).st_mode
+    if not mode & stat.S_IWRITE:
+        os.chmod(file_path, mode | stat.S_IWRITE)
+
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _add_blob(digest: str, source_path: str) -> bool:
+    '''
+    Link a finished file into the store under its digest unless the blob already
+    exists (first writer wins, so links made to an existing blob stay valid).
+    The file keeps its mode: frames hard-linked to a blob must stay replaceable
+    on every platform, so writers replace them (write_image, atomic writes)
+    rather than rewriting them in place.
+    Returns True if the blob was added.
+    '''
+    path = blob_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.link(source_path, path)
+        return True
+    except FileExistsError:
+        return False
+
+
+def put_bytes(payload: bytes) -> str:
+    '''
+    Store payload and return its digest; identical content is stored once.
+    '''
+    digest = hashlib.sha256(payload).hexdigest()
+    path = blob_path(digest)
+    if os.path.exists(path):
+        increment("blob_writes_total", 1, "Images written through the blob store", result="deduplicated")
+        return digest
+
+    tmp_path = _temp_path(path)
+    atomic_write_bytes(tmp_path, payload)
+    try:
+        added = _add_blob(digest, tmp_path)
+    finally:
+        _remove(tmp_path)
+    increment("blob_writes_total", 1, "Images written through the blob store",
+              result="stored" if added else "deduplicated")
+    return digest
+
+
+def _reflink(source: str, dest: str):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform.")
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _copy(source: str, dest: str):
+    shutil.copyfile(source, dest)
+
+
+_LINKERS = {"reflink": _reflink, "hardlink": os.link, "copy": _copy}
+
+
+def _record(file_path: str, digest: str):
+    st = os.stat(file_path)
+    connection = _connect()
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO refs (path, digest, inode, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), digest, st.st_ino, st.st_size, st.st_mtime_ns),
+        )
+
+
+def materialize(digest: str, dest_path: str, mode: str = None) -> str:
+    '''
+    Make dest_path hold the blob's content. The link is created under a temporary
+    name and renamed over dest_path, so an existing file is replaced, never
+    rewritten in place. "auto" tries a reflink (copy-on-write, independent file),
+    then a hard link (same inode), then a plain copy.
+    Returns the method used.
+    '''
+    mode = mode or BLOB_LINK_MODE
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{mode}' (expected one of {', '.join(LINK_MODES)}).")
+    source = blob_path(digest)
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"No blob '{digest}' in '{BLOB_STORE_PATH}'.")
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    tmp_path = _temp_path(dest_path)
+    methods = [m for m in ("reflink", "hardlink", "copy") if m not in _unsupported] if mode == "auto" else [mode]
+    for method in methods:
+        _remove(tmp_path)
+        try:
+            _LINKERS[method](source, tmp_path)
+            break
+        except OSError:
+            _remove(tmp_path)
+            # Across filesystems or on ones without reflinks, fall back to the next method
+            if mode != "auto" or method == "copy":
+                raise
+            _unsupported.add(method)
+    try:
+        if os.path.exists(dest_path):
+            _make_writable(dest_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    _record(dest_path, digest)
+    increment("blob_links_total", 1, "Blobs materialized at a frame path", method=method)
+    return method
+
+
+def write_bytes(dest_path: str, payload: bytes, mode: str = None) -> str:
+    '''
+    Write an encoded image to dest_path through the store. Returns its digest.
+    '''
+    digest = put_bytes(payload)
+    materialize(digest, dest_path, mode)
+    return digest
+
+
+def write_image(dest_path: str, image, params=None, mode: str = None) -> str:
+    '''
+    Drop-in replacement for cv2.imwrite that deduplicates the encoded file.
+    The format follows dest_path's extension. Returns the digest.
+    '''
+    ext = os.path.splitext(dest_path)[1] or ".png"
+    ok, encoded = cv2.imencode(ext, image, params or [])
+    if not ok:
+        raise IOError(f"Could not encode image for '{dest_path}'.")
+    return write_bytes(dest_path, encoded.tobytes(), mode)
+
+
+def ingest_file(file_path: str, mode: str = None) -> str:
+    '''
+    Move an existing image into the store and replace it with a link to its blob.
+    On the store's filesystem the first copy of some content becomes the blob
+    itself (same inode, mode unchanged), so it must not be rewritten in place
+    afterwards; later copies are replaced by links.
+    Files recorded earlier and unchanged since are skipped without rehashing.
+    Returns "skipped", "stored" (first copy of this content) or "deduplicated".
+    '''
+    st = os.stat(file_path)
+    row = _connect().execute(
+        "SELECT digest, inode, size, mtime_ns FROM refs WHERE path = ?", (os.path.abspath(file_path),)
+    ).fetchone()
+    if row and tuple(row[1:]) == (st.st_ino, st.st_size, st.st_mtime_ns) and os.path.isfile(blob_path(row[0])):
+        return "skipped"
+
+    digest = hash_file(file_path)
+    path = blob_path(digest)
+    if not os.path.exists(path):
+        try:
+            # Same filesystem: the file itself becomes the blob, nothing is copied
+            if _add_blob(digest, file_path):
+                _record(file_path, digest)
+                return "stored"
+        except OSError:
+            tmp_path = _temp_path(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                shutil.copyfile(file_path, tmp_path)
+                _add_blob(digest, tmp_path)
+            finally:
+                _remove(tmp_path)
+
+    if os.stat(path).st_ino == st.st_ino and os.stat(path).st_dev == st.st_dev:
+        _record(file_path, digest)
+        return "stored"
+    materialize(digest, file_path, mode)
+    return "deduplicated"
+
+
+def _walk_files(root: str, extensions):
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(extensions) and not name.startswith("."):
+                yield os.path.join(dirpath, name)
+
+
+def ingest(roots=None, mode: str = None):
+    '''
+    Deduplicate the images under roots (BLOB_ROOTS by default) into the store.
+    Returns counts per outcome and the bytes no longer stored twice.
+    '''
+    counts = {"skipped": 0, "stored": 0, "deduplicated": 0, "saved_bytes": 0}
+    for root in roots or BLOB_ROOTS:
+        if os.path.abspath(root).startswith(os.path.abspath(BLOB_STORE_PATH)) or not os.path.isdir(root):
+            continue
+        for file_path in _walk_files(root, BLOB_EXTENSIONS):
+            result = ingest_file(file_path, mode)
+            counts[result] += 1
+            if result == "deduplicated":
+                counts["saved_bytes"] += os.path.getsize(file_path)
+    return counts
+
+
+def _iter_blobs():
+    objects = os.path.join(BLOB_STORE_PATH, "objects")
+    for dirpath, _, filenames in os.walk(objects):
+        for name in filenames:
+            if not name.startswith("."):
+                yield name, os.path.join(dirpath, name)
+
+
+def collect_garbage(dry_run: bool = False, min_age: float = BLOB_GC_MIN_AGE_SECONDS):
+    '''
+    Delete blobs no frame path uses any more. References whose file was deleted
+    or replaced are dropped first; a blob stays while a recorded path still holds
+    it or while it has other hard links. Deleting a blob never deletes frame
+    data: hard links and reflinks keep their content.
+    '''
+    connection = _connect()
+    stale = []
+    for path, inode, size, mtime_ns in connection.execute("SELECT path, inode, size, mtime_ns FROM refs"):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stale.append((path,))
+            continue
+        if (st.st_ino, st.st_size, st.st_mtime_ns) != (inode, size, mtime_ns):
+            stale.append((path,))
+    if stale and not dry_run:
+        with connection:
+            connection.executemany("DELETE FROM refs WHERE path = ?", stale)
+
+    stale_paths = {path for path, in stale}
+    live = {digest for path, digest in connection.execute("SELECT path, digest FROM refs") if path not in stale_paths}
+    result = {"blobs": 0, "removed": 0, "freed_bytes": 0, "refs_pruned": len(stale)}
+    now = time.time()
+    for digest, path in _iter_blobs():
+        result["blobs"] += 1
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            # Removed by a concurrent collection
+            continue
+        if digest in live or st.st_nlink > 1 or now - st.st_mtime < min_age:
+            continue
+        result["removed"] += 1
+        result["freed_bytes"] += st.st_size
+        if not dry_run:
+            _remove(path)
+    if not dry_run:
+        increment("blob_gc_removed_total", result["removed"], "Blobs deleted by garbage collection")
+    return result
+
+
+def store_stats():
+    '''
+    Return the number and size of blobs against the bytes of the paths using them.
+    '''
+    blobs, blob_bytes = 0, 0
+    for _, path in _iter_blobs():
+        blobs += 1
+        blob_bytes += os.path.getsize(path)
+    references, referenced_bytes = _connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM refs").fetchone()
+    return {
+        "blobs": blobs,
+        "blob_bytes": blob_bytes,
+        "references": references,
+        "referenced_bytes": referenced_bytes,
+        "saved_bytes": max(0, referenced_bytes - blob_bytes),
+    }
+
+
+if __name__ == "__main__":
+    # Run with:  python -m backend.services.blob_service {ingest,gc,stats}
+    parser = argparse.ArgumentParser(description="Content-addressed frame store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="Move existing frames into the store and link them back.")
+    ingest_parser.add_argument("roots", nargs="*", help=f"Folders to scan (default: {', '.join(BLOB_ROOTS)})")
+    ingest_parser.add_argument("--mode", choices=LINK_MODES, default=None, help="Link method (default: BLOB_LINK_MODE)")
+    gc_parser = commands.add_parser("gc", help="Delete blobs no frame path uses any more.")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    gc_parser.add_argument("--min-age", type=float, default=BLOB_GC_MIN_AGE_SECONDS,
+                           help="Keep unreferenced blobs younger than this many seconds")
+    commands.add_parser("stats", help="Show how much space the store saves.")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        print(ingest(args.roots or None, args.mode))
+    elif args.command == "gc":
+        print(collect_garbage(args.dry_run, args.min_age))
+    else:
+        print(store_stats())
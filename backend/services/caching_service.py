@@ -0,0 +1,134 @@
+# caching_service.py
+# Contains HTTP validator (ETag/Last-Modified) helpers and conditional file responses.
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+from ..config import COMPRESSION_MIN_BYTES, CONTENT_HASH_CACHE_LIMIT, FRAME_CACHE_MAX_AGE
+from .compression_service import compressed_file, negotiate_encoding
+from .metrics_service import increment
+from .serialization_service import dumps
+
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={FRAME_CACHE_MAX_AGE}, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_content_hashes = OrderedDict()  # file path -> ((inode, mtime, size), etag), least recently used first
+_content_hashes_lock = threading.Lock()
+
+
+def stat_etag(stat) -> str:
+    '''
+    Validator derived from mtime and size; cheap and good enough for write-once files.
+    '''
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def content_etag(file_path: str, stat=None) -> str:
+    '''
+    Validator derived from the file contents. Hashes are memoized per (inode, mtime,
+    size), so a file is only read again after it changed; atomic writes always create
+    a new inode, even within one mtime tick. The most recently used
+    CONTENT_HASH_CACHE_LIMIT files are remembered.
+    '''
+    stat = stat or os.stat(file_path)
+    key = os.path.abspath(file_path)
+    version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _content_hashes_lock:
+        cached = _content_hashes.get(key)
+        if cached is not None:
+            _content_hashes.move_to_end(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(file_path, "rb") as f:
+        etag = f'"{hashlib.sha1(f.read()).hexdigest()}"'
+    with _content_hashes_lock:
+        _content_hashes[key] = (version, etag)
+        _content_hashes.move_to_end(key)
+        while len(_content_hashes) > CONTENT_HASH_CACHE_LIMIT:
+            _content_hashes.popitem(last=False)
+    return etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    '''
+    Weak comparison of an If-None-Match header against an ETag, as required for GET.
+    '''
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def is_not_modified(headers, etag: str, mtime: float) -> bool:
+    '''
+    Evaluate If-None-Match, falling back to If-Modified-Since only when no ETag was sent.
+    '''
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class FastJSONResponse(JSONResponse):
+    '''
+    Default response class of the app: the same JSON responses, encoded by the serialization service.
+    '''
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def conditional_file_response(file_path: str, media_type: str, headers=None,
+                              cache_control: str = REVALIDATE_CACHE_CONTROL, use_content_hash: bool = False,
+                              filename: str = None, compress: bool = False):
+    '''
+    Serve a file with ETag, Last-Modified and Cache-Control headers, answering
+    304 Not Modified when the request validators still match.
+    headers are the request headers (or None to always send the body).
+    With compress, the body is sent gzip/brotli-encoded when the client accepts
+    it, from a cache of compressed file versions. The ETag is the same for every
+    coding, so it can still be sent back as If-Match on saves.
+    '''
+    stat = os.stat(file_path)
+    etag = content_etag(file_path, stat) if use_content_hash else stat_etag(stat)
+    response_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+    if headers is not None and is_not_modified(headers, etag, stat.st_mtime):
+        increment("files_served_total", 1, "Files served, by outcome", result="not_modified")
+        return Response(status_code=304, headers=response_headers)
+
+    encoding = negotiate_encoding(headers.get("accept-encoding")) if compress and headers is not None else None
+    if encoding is not None and stat.st_size >= COMPRESSION_MIN_BYTES:
+        body = compressed_file(file_path, etag, encoding)
+        increment("files_served_total", 1, "Files served, by outcome", result="sent_compressed")
+        increment("files_served_bytes_total", len(body), "File bytes sent")
+        response_headers["Content-Encoding"] = encoding
+        response_headers["Vary"] = "Accept-Encoding"
+        if filename:
+            response_headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return Response(content=body, media_type=media_type, headers=response_headers)
+
+    increment("files_served_total", 1, "Files served, by outcome", result="sent")
+    increment("files_served_bytes_total", stat.st_size, "File bytes sent")
+    return FileResponse(
+        path=file_path,
+        media_type=media_type,
+        filename=filename,
+        headers=response_headers,
+        stat_result=stat,
+    )
@@ -0,0 +1,393 @@
+# columnar_service.py
+# Contains the compact columnar (NumPy) form of annotation folders used by batch jobs instead of parsing JSON.
+
+import os
+import io
+
+import numpy as np
+
+from ..config import ANNOTATIONS_PATH, COLUMNAR_PATH
+from .file_service import atomic_write_bytes, file_lock
+from .serialization_service import dumps, loads, read_json
+
+PACK_NAME = "annotations.npz"
+FORMAT_VERSION = 1
+
+# Editor state that never leaves the UI (normalize_and_save_json strips it as well)
+UI_FIELDS = ("isSelected", "hidden", "color")
+# Annotation fields stored as columns; everything else goes to the side table
+COLUMN_FIELDS = ("id", "parent_id", "component_type", "bounding_box")
+
+FLAG_READY = 1
+FLAG_VALID = 2
+FLAG_PREANNOTATED = 4
+
+
+def _pack_path(folder: str, datasets_root: str) -> str:
+    root_key = os.path.normpath(datasets_root).strip(os.sep).replace(os.sep, "_").replace(".", "_") or "root"
+    return os.path.join(COLUMNAR_PATH, root_key, os.path.normpath(folder or "."), PACK_NAME)
+
+
+def _blob(records):
+    '''
+    Encode a list of JSON-serializable records as one UTF-8 blob plus offsets.
+    '''
+    encoded = [dumps(record) for record in records]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(chunk) for chunk in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _empty_arrays():
+    return {
+        "format_version": np.array(FORMAT_VERSION),
+        "frame_names": np.array([], dtype=np.str_),
+        "frame_images": np.array([], dtype=np.str_),
+        "frame_versions": np.zeros((0, 2), dtype=np.int64),
+        "frame_sizes": np.zeros((0, 2), dtype=np.int32),
+        "frame_flags": np.zeros(0, dtype=np.uint8),
+        "frame_offsets": np.zeros(1, dtype=np.int64),
+        "frame_blob": np.zeros(0, dtype=np.uint8),
+        "frame_blob_offsets": np.zeros(1, dtype=np.int64),
+        "ids": np.zeros(0, dtype=np.int64),
+        "parent_ids": np.zeros(0, dtype=np.int64),
+        "class_codes": np.zeros(0, dtype=np.int32),
+        "boxes": np.zeros((0, 4), dtype=np.float32),
+        "side_blob": np.zeros(0, dtype=np.uint8),
+        "side_blob_offsets": np.zeros(1, dtype=np.int64),
+        "class_names": np.array([], dtype=np.str_),
+    }
+
+
+class AnnotationPack:
+    '''
+    The annotations of one folder as struct-of-arrays. Frame i owns the rows
+    frame_offsets[i]:frame_offsets[i + 1] of ids, parent_ids (-1 for none),
+    class_codes (indices into class_names) and boxes (x, y, width, height).
+    Top-level document fields and the remaining annotation fields (name,
+    attributes, ...) live in JSON side tables that are only decoded on demand.
+    '''
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.frame_names = arrays["frame_names"]
+        self.frame_images = arrays["frame_images"]
+        self.frame_versions = arrays["frame_versions"]
+        self.frame_sizes = arrays["frame_sizes"]
+        self.frame_flags = arrays["frame_flags"]
+        self.frame_offsets = arrays["frame_offsets"]
+        self.ids = arrays["ids"]
+        self.parent_ids = arrays["parent_ids"]
+        self.class_codes = arrays["class_codes"]
+        self.boxes = arrays["boxes"]
+        self.class_names = arrays["class_names"]
+
+    def __len__(self):
+        return len(self.frame_names)
+
+    def index(self, name: str) -> int:
+        matches = np.nonzero(self.frame_names == name)[0]
+        if not len(matches):
+            raise KeyError(name)
+        return int(matches[0])
+
+    def rows(self, i: int) -> slice:
+        return slice(int(self.frame_offsets[i]), int(self.frame_offsets[i + 1]))
+
+    def _blob_record(self, prefix: str, i: int):
+        offsets = self.arrays[f"{prefix}_blob_offsets"]
+        return loads(self.arrays[f"{prefix}_blob"][offsets[i]:offsets[i + 1]].tobytes())
+
+    def document(self, i: int):
+        '''
+        Rebuild the JSON document of frame i (without the UI-only fields).
+        '''
+        data = self._blob_record("frame", i)
+        annotations = []
+        for row in range(*self.rows(i).indices(len(self.ids))):
+            x, y, width, height = (float(v) for v in self.boxes[row])
+            parent_id = int(self.parent_ids[row])
+            annotation = {
+                "id": int(self.ids[row]),
+                "parent_id": parent_id if parent_id >= 0 else None,
+                "component_type": str(self.class_names[self.class_codes[row]]),
+                "bounding_box": {"x": _number(x), "y": _number(y), "width": _number(width), "height": _number(height)},
+            }
+            annotation.update(self._blob_record("side", row))
+            annotations.append(annotation)
+        data["annotations"] = annotations
+        return data
+
+    def iter_documents(self):
+        for i in range(len(self)):
+            yield str(self.frame_names[i]), self.document(i)
+
+
+def _number(value: float):
+    return int(value) if value.is_integer() else value
+
+
+def _frame_columns(data):
+    '''
+    Split one JSON document into its column values and side-table records.
+    '''
+    frame = data.get("frame") or {}
+    flags = (FLAG_READY if data.get("isReady") else 0) | (FLAG_VALID if data.get("isValid") else 0) | \
+        (FLAG_PREANNOTATED if data.get("isPreAnnotated") else 0)
+    top_level = {key: value for key, value in data.items() if key != "annotations"}
+
+    ids, parent_ids, types, boxes, side = [], [], [], [], []
+    for annotation in data.get("annotations") or []:
+        bbox = annotation.get("bounding_box") or {}
+        ids.append(annotation.get("id", -1))
+        parent_id = annotation.get("parent_id")
+        parent_ids.append(-1 if parent_id is None else parent_id)
+        types.append(str(annotation.get("component_type")))
+        boxes.append([bbox.get(key) if isinstance(bbox.get(key), (int, float)) else np.nan
+                      for key in ("x", "y", "width", "height")])
+        side.append({key: value for key, value in annotation.items()
+                     if key not in COLUMN_FIELDS and key not in UI_FIELDS})
+    return {
+        "image": str(frame.get("path") or ""),
+        "size": (frame.get("width") or 0, frame.get("height") or 0),
+        "flags": flags,
+        "top_level": top_level,
+        "ids": ids,
+        "parent_ids": parent_ids,
+        "types": types,
+        "boxes": boxes,
+        "side": side,
+    }
+
+
+def _read_pack(pack_path: str):
+    try:
+        with np.load(pack_path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+    except (OSError, ValueError):
+        return None
+    if int(arrays.get("format_version", -1)) != FORMAT_VERSION:
+        return None
+    return arrays
+
+
+def _scan_folder(target_path: str):
+    '''
+    Return {json file name: (mtime_ns, size)} for the annotation files directly in a folder.
+    '''
+    versions = {}
+    with os.scandir(target_path) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                stat = entry.stat()
+                versions[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return versions
+
+
+def _rebuild(old, versions, target_path: str):
+    '''
+    Build the arrays for the current folder contents, reusing the rows of every
+    frame whose file is unchanged since the old pack and parsing only the rest.
+    Class codes of the old pack stay valid: new class names are appended.
+    '''
+    old_index = {str(name): i for i, name in enumerate(old["frame_names"])}
+    class_names = [str(name) for name in old["class_names"]]
+    class_codes = {name: code for code, name in enumerate(class_names)}
+
+    def blob_slice(prefix, start, stop):
+        offsets = old[f"{prefix}_blob_offsets"]
+        return old[f"{prefix}_blob"][offsets[start]:offsets[stop]], np.diff(offsets[start:stop + 1])
+
+    names = sorted(versions)
+    images, sizes, flags, counts = [], [], [], []
+    ids, parent_ids, codes, boxes = [], [], [], []
+    frame_blobs, frame_lengths, side_blobs, side_lengths = [], [], [], []
+
+    for name in names:
+        i = old_index.get(name)
+        if i is not None and tuple(old["frame_versions"][i]) == versions[name]:
+            start, stop = old["frame_offsets"][i], old["frame_offsets"][i + 1]
+            images.append(str(old["frame_images"][i]))
+            sizes.append(old["frame_sizes"][i])
+            flags.append(old["frame_flags"][i])
+            counts.append(stop - start)
+            ids.append(old["ids"][start:stop])
+            parent_ids.append(old["parent_ids"][start:stop])
+            codes.append(old["class_codes"][start:stop])
+            boxes.append(old["boxes"][start:stop])
+            blob, lengths = blob_slice("frame", i, i + 1)
+            frame_blobs.append(blob)
+            frame_lengths.append(lengths)
+            blob, lengths = blob_slice("side", start, stop)
+            side_blobs.append(blob)
+            side_lengths.append(lengths)
+            continue
+
+        columns = _frame_columns(read_json(os.path.join(target_path, name)))
+        for component_type in columns["types"]:
+            if component_type not in class_codes:
+                class_codes[component_type] = len(class_names)
+                class_names.append(component_type)
+        images.append(columns["image"])
+        sizes.append(columns["size"])
+        flags.append(columns["flags"])
+        counts.append(len(columns["ids"]))
+        ids.append(np.array(columns["ids"], dtype=np.int64))
+        parent_ids.append(np.array(columns["parent_ids"], dtype=np.int64))
+        codes.append(np.array([class_codes[t] for t in columns["types"]], dtype=np.int32))
+        boxes.append(np.array(columns["boxes"], dtype=np.float32).reshape(-1, 4))
+        blob, offsets = _blob([columns["top_level"]])
+        frame_blobs.append(blob)
+        frame_lengths.append(np.diff(offsets))
+        blob, offsets = _blob(columns["side"])
+        side_blobs.append(blob)
+        side_lengths.append(np.diff(offsets))
+
+    arrays = _empty_arrays()
+    if not names:
+        return arrays
+
+    def offsets_of(lengths):
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        return offsets
+
+    arrays.update(
+        frame_names=np.array(names, dtype=np.str_),
+        frame_images=np.array(images, dtype=np.str_),
+        frame_versions=np.array([versions[name] for name in names], dtype=np.int64).reshape(-1, 2),
+        frame_sizes=np.array(sizes, dtype=np.int32).reshape(-1, 2),
+        frame_flags=np.array(flags, dtype=np.uint8),
+        frame_offsets=offsets_of(counts),
+        frame_blob=np.concatenate(frame_blobs).astype(np.uint8),
+        frame_blob_offsets=offsets_of(np.concatenate(frame_lengths)),
+        ids=np.concatenate(ids).astype(np.int64),
+        parent_ids=np.concatenate(parent_ids).astype(np.int64),
+        class_codes=np.concatenate(codes).astype(np.int32),
+        boxes=np.concatenate(boxes).astype(np.float32).reshape(-1, 4),
+        side_blob=np.concatenate(side_blobs).astype(np.uint8),
+        side_blob_offsets=offsets_of(np.concatenate(side_lengths).astype(np.int64)),
+        class_names=np.array(class_names, dtype=np.str_),
+    )
+    return arrays
+
+
+def load_pack(folder: str = None, datasets_root: str = ANNOTATIONS_PATH) -> AnnotationPack:
+    '''
+    Return the columnar pack of the annotation files directly in a folder.
+    The pack is brought up to date first: only files changed since it was
+    written are parsed, and it is rewritten only when something changed.
+    Raises FileNotFoundError if the folder does not exist.
+    '''
+    target_path = os.path.join(datasets_root, folder or "")
+    if not os.path.isdir(target_path):
+        raise FileNotFoundError(f"Folder '{target_path}' not found.")
+    pack_path = _pack_path(folder, datasets_root)
+
+    versions = _scan_folder(target_path)
+    arrays = _read_pack(pack_path)
+    if arrays is not None and _is_current(arrays, versions):
+        return AnnotationPack(arrays)
+
+    with file_lock(pack_path):
+        # Another worker may have refreshed the pack while this one waited for the lock
+        arrays = _read_pack(pack_path)
+        if arrays is not None and _is_current(arrays, versions):
+            return AnnotationPack(arrays)
+        arrays = _rebuild(arrays or _empty_arrays(), versions, target_path)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+        atomic_write_bytes(pack_path, buffer.getvalue())
+    return AnnotationPack(arrays)
+
+
+def _is_current(arrays, versions) -> bool:
+    if len(arrays["frame_names"]) != len(versions):
+        return False
+    return all(
+        versions.get(str(name)) == tuple(version)
+        for name, version in zip(arrays["frame_names"], arrays["frame_versions"])
+    )
+
+
+def pack_file(folder: str = None, datasets_root: str = ANNOTATIONS_PATH) -> str:
+    '''
+    Refresh the pack of a folder and return the path of its .npz file.
+    '''
+    load_pack(folder, datasets_root)
+    return _pack_path(folder, datasets_root)
+
+
+def list_folders(datasets_root: str = ANNOTATIONS_PATH):
+    '''
+    Return every folder (relative to datasets_root, "" for the root) that directly contains annotation files.
+    '''
+    folders = []
+    for dirpath, dirnames, filenames in os.walk(datasets_root):
+        dirnames.sort()
+        if any(file.endswith(".json") for file in filenames):
+            folder = os.path.relpath(dirpath, datasets_root)
+            folders.append("" if folder == "." else folder.replace(os.sep, "/"))
+    return folders
+
+
+def load_dataset(datasets_root: str = ANNOTATIONS_PATH, folders=None):
+    '''
+    Concatenate the packs of every folder into whole-dataset arrays:
+    frame_paths (annotation paths relative to datasets_root), frame_images
+    (the frame.path of each document), frame_sizes,
+    frame_flags, frame_offsets, and per annotation ids, parent_ids, boxes
+    (x, y, width, height) and class_codes indexing one merged class_names list.
+    '''
+    class_names, class_codes = [], {}
+    paths, images, sizes, flags, counts = [], [], [], [], []
+    ids, parent_ids, boxes, codes = [], [], [], []
+
+    for folder in (list_folders(datasets_root) if folders is None else folders):
+        pack = load_pack(folder, datasets_root)
+        remap = np.zeros(len(pack.class_names), dtype=np.int32)
+        for code, name in enumerate(pack.class_names):
+            name = str(name)
+            if name not in class_codes:
+                class_codes[name] = len(class_names)
+                class_names.append(name)
+            remap[code] = class_codes[name]
+
+        prefix = f"{folder}/" if folder else ""
+        paths.extend(prefix + str(name) for name in pack.frame_names)
+        images.extend(str(image) for image in pack.frame_images)
+        sizes.append(pack.frame_sizes)
+        flags.append(pack.frame_flags)
+        counts.append(np.diff(pack.frame_offsets))
+        ids.append(pack.ids)
+        parent_ids.append(pack.parent_ids)
+        boxes.append(pack.boxes)
+        codes.append(remap[pack.class_codes])
+
+    def concat(chunks, dtype, shape=(-1,)):
+        return np.concatenate(chunks).astype(dtype).reshape(shape) if chunks else np.zeros(0, dtype).reshape(shape)
+
+    frame_offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    if counts:
+        frame_offsets[1:] = np.cumsum(np.concatenate(counts))
+    return {
+        "frame_paths": paths,
+        "frame_images": images,
+        "frame_sizes": concat(sizes, np.int32, (-1, 2)),
+        "frame_flags": concat(flags, np.uint8),
+        "frame_offsets": frame_offsets,
+        "ids": concat(ids, np.int64),
+        "parent_ids": concat(parent_ids, np.int64),
+        "boxes": concat(boxes, np.float32, (-1, 4)),
+        "class_codes": concat(codes, np.int32),
+        "class_names": class_names,
+    }
+
+
+if __name__ == "__main__":
+    # Run with:  python -m backend.services.columnar_service
+    folders = list_folders()
+    for folder in folders:
+        load_pack(folder)
+    print(f"Packed {len(folders)} annotation folders into {COLUMNAR_PATH}")
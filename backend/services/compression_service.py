@@ -0,0 +1,209 @@
+# compression_service.py
+# Contains gzip/brotli negotiation, the compression middleware for dynamic responses and a cache of compressed hot files.
+
+import os
+import zlib
+import threading
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from ..config import BROTLI_QUALITY, COMPRESSED_CACHE_MAX_MB, COMPRESSION_MIN_BYTES, GZIP_LEVEL
+from .metrics_service import increment
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/", "image/svg+xml")
+# Event streams must reach the client message by message
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+_cache = OrderedDict()
+_cache_keys = {}
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str):
+    '''
+    Pick the content coding for an Accept-Encoding header: the supported coding
+    with the highest q-value, preferring brotli on ties. Returns None for identity.
+    '''
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = (content_type or "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+
+
+class Compressor:
+    '''
+    Incremental gzip or brotli encoder for streamed bodies.
+    '''
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(chunk)
+        return self._zlib.compress(chunk)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress(payload: bytes, encoding: str) -> bytes:
+    compressor = Compressor(encoding)
+    return compressor.compress(payload) + compressor.finish()
+
+
+def compressed_file(file_path: str, etag: str, encoding: str) -> bytes:
+    '''
+    Return the compressed body of a file version (identified by its ETag).
+    Recently served versions are kept in a size-bounded LRU cache, so a hot
+    annotation file is compressed once per save instead of once per request.
+    '''
+    global _cache_bytes
+    path = os.path.abspath(file_path)
+    key = (path, etag, encoding)
+    with _cache_lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+            increment("compressed_cache_total", 1, "Compressed file cache lookups", result="hit")
+            return body
+
+    with open(file_path, "rb") as f:
+        body = compress(f.read(), encoding)
+    increment("compressed_cache_total", 1, "Compressed file cache lookups", result="miss")
+
+    max_bytes = COMPRESSED_CACHE_MAX_MB * 1024 * 1024
+    with _cache_lock:
+        # Only the latest version of a file is worth keeping
+        stale = _cache_keys.get((path, encoding))
+        if stale is not None and stale in _cache:
+            _cache_bytes -= len(_cache.pop(stale))
+        if len(body) <= max_bytes and key not in _cache:
+            _cache[key] = body
+            _cache_keys[(path, encoding)] = key
+            _cache_bytes += len(body)
+        while _cache_bytes > max_bytes:
+            evicted_key, evicted = _cache.popitem(last=False)
+            path_key = (evicted_key[0], evicted_key[2])
+            if _cache_keys.get(path_key) == evicted_key:
+                del _cache_keys[path_key]
+            _cache_bytes -= len(evicted)
+    return body
+
+
+class CompressionMiddleware:
+    '''
+    ASGI middleware compressing JSON and text responses with the coding the
+    client prefers. Small bodies, ranges, event streams and responses that are
+    already encoded (e.g. /datasets/batch or cached compressed files) pass
+    through untouched; streamed bodies are compressed chunk by chunk.
+    '''
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "mode": None, "compressor": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or "content-range" in headers
+                    or message["status"] < 200 or message["status"] in (204, 206, 304)
+                    or not is_compressible(headers.get("content-type"))
+                )
+                state["mode"] = "passthrough" if passthrough else None
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether compression is worth it
+                    state["start"] = message
+                return
+
+            if message["type"] != "http.response.body" or state["mode"] == "passthrough":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["mode"] is None:
+                start = state["start"]
+                if not more_body and len(body) < COMPRESSION_MIN_BYTES:
+                    state["mode"] = "passthrough"
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers = MutableHeaders(scope=start)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                state["compressor"] = Compressor(encoding)
+                if more_body:
+                    state["mode"] = "stream"
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                else:
+                    state["mode"] = "whole"
+                    body = compress(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    increment("responses_compressed_total", 1, "Responses compressed on the fly", encoding=encoding)
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                increment("responses_compressed_total", 1, "Responses compressed on the fly", encoding=encoding)
+                await send(start)
+
+            compressor = state["compressor"]
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
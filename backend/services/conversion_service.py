@@ -0,0 +1,143 @@
+# conversion_service.py
+# Contains the logic for converting many frames to the datasets folder as one background job.
+
+import os
+import glob
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..config import CONVERSION_WORKERS
+from .frames_service import VALID_IMAGE_EXTENSIONS, convert_frame_to_dataset
+from .jobs_service import check_cancelled, report_progress, submit_job
+from .listing_service import get_file_stems
+from .preannotation_service import enqueue_preannotation
+
+MAX_REPORTED_ERRORS = 50
+
+
+def _is_frame(relative_path: str) -> bool:
+    _, ext = os.path.splitext(relative_path)
+    return ext.lower() in VALID_IMAGE_EXTENSIONS and relative_path.find("_diff") == -1
+
+
+def resolve_frame_paths(frames_root: str, folder: str = None, pattern: str = None,
+                        paths=None, recursive: bool = False):
+    '''
+    Expand a folder, a glob pattern and/or an explicit path list (all relative to
+    frames_root) into a sorted, de-duplicated list of relative frame paths.
+    '_diff' images and non-image files are ignored.
+    '''
+    root = os.path.abspath(frames_root)
+    relative_paths = set()
+
+    def add(full_path):
+        full_path = os.path.abspath(full_path)
+        if not full_path.startswith(root + os.sep):
+            raise ValueError(f"Path '{full_path}' is outside the frames directory.")
+        relative_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+        if _is_frame(relative_path) and os.path.isfile(full_path):
+            relative_paths.add(relative_path)
+
+    if folder is not None:
+        folder_path = os.path.join(root, folder)
+        if not os.path.isdir(folder_path):
+            raise FileNotFoundError(f"Frames path '{folder_path}' does not exist.")
+        if recursive:
+            for dirpath, _, filenames in os.walk(folder_path):
+                for filename in filenames:
+                    add(os.path.join(dirpath, filename))
+        else:
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        add(entry.path)
+
+    if pattern:
+        for full_path in glob.iglob(os.path.join(root, pattern), recursive=True):
+            add(full_path)
+
+    for relative_path in paths or []:
+        add(os.path.join(root, relative_path))
+
+    return sorted(relative_paths)
+
+
+def _converted_stems(relative_paths, datasets_root: str):
+    '''
+    Snapshot, per folder, the names that already have an annotation JSON.
+    Taken once up front from the cached listing because every conversion
+    invalidates its folder's listing.
+    '''
+    folders = {os.path.dirname(relative_path) for relative_path in relative_paths}
+    return {folder: get_file_stems(os.path.join(datasets_root, folder), ".json") for folder in folders}
+
+
+def convert_frames(job_id: str, relative_paths, frames_root: str, datasets_root: str,
+                   preannotate: bool = False):
+    '''
+    Job body: convert every frame on a bounded pool, skipping frames that already
+    have an annotation JSON. Progress is reported after each frame and the job
+    stops submitting work as soon as cancellation is requested.
+    '''
+    total = len(relative_paths)
+    counts = {"total": total, "done": 0, "converted": 0, "skipped": 0, "failed": 0}
+    errors = []
+    report_progress(job_id, **counts)
+    converted = _converted_stems(relative_paths, datasets_root)
+
+    def convert(relative_path):
+        folder, file_name = os.path.split(relative_path)
+        if os.path.splitext(file_name)[0] in converted[folder]:
+            return "skipped"
+        convert_frame_to_dataset(relative_path, frames_root, datasets_root)
+        if preannotate:
+            enqueue_preannotation(relative_path, frames_root, datasets_root)
+        return "converted"
+
+    pending = {}
+    remaining = iter(relative_paths)
+    with ThreadPoolExecutor(max_workers=CONVERSION_WORKERS, thread_name_prefix="conversion") as executor:
+        try:
+            while True:
+                # Keep the queue bounded so cancellation takes effect quickly
+                while len(pending) < CONVERSION_WORKERS * 2:
+                    relative_path = next(remaining, None)
+                    if relative_path is None:
+                        break
+                    pending[executor.submit(convert, relative_path)] = relative_path
+                if not pending:
+                    break
+
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    relative_path = pending.pop(future)
+                    try:
+                        counts[future.result()] += 1
+                    except Exception as e:
+                        counts["failed"] += 1
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append({"path": relative_path, "error": str(e)})
+                    counts["done"] += 1
+                report_progress(job_id, **counts)
+                check_cancelled(job_id)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    return {**counts, "errors": errors}
+
+
+def enqueue_bulk_conversion(relative_paths, frames_root: str, datasets_root: str,
+                            preannotate: bool = False) -> str:
+    '''
+    Queue a bulk conversion job and return its id. Jobs run one at a time;
+    each job converts its frames concurrently.
+    '''
+    return submit_job(
+        "conversion",
+        convert_frames,
+        list(relative_paths),
+        frames_root,
+        datasets_root,
+        preannotate,
+        pass_job_id=True,
+    )
@@ -2,54 +2,109 @@
 # Contains the core logic for listing dataset folders/images, and loading/saving annotations.
 
 import os
-import json
-from fastapi.responses import FileResponse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-def list_datasets_items(path: str):
+from ..config import ANNOTATION_JSON_INDENT, ANNOTATION_STATUS_CACHE_LIMIT, BATCH_READ_WORKERS
+from .compression_service import Compressor
+from .caching_service import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    conditional_file_response,
+    content_etag,
+    etag_matches,
+)
+from .file_service import VersionConflictError, atomic_write_json, file_lock
+from .hierarchy_service import infer_hierarchy
+from .hooks_service import annotation_written
+from .listing_service import build_sorted_view, get_listing_view, invalidate_directory, paginate
+from .metrics_service import timer
+from .patch_service import apply_annotation_changes, apply_json_patch
+from .serialization_service import dumps, read_json
+from .validation_service import apply_validation
+
+_status_cache = OrderedDict()  # file path -> (mtime, status), least recently used first
+_status_lock = threading.Lock()
+
+def get_annotation_status(file_path: str, mtime: float):
+    '''
+    Return (isReady, isValid) for an annotation JSON, parsed once per file mtime.
+    The most recently used ANNOTATION_STATUS_CACHE_LIMIT files are remembered.
+    '''
+    with _status_lock:
+        cached = _status_cache.get(file_path)
+        if cached is not None:
+            _status_cache.move_to_end(file_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        data = read_json(file_path)
+        status = (bool(data.get("isReady", False)), bool(data.get("isValid", False)))
+    except (OSError, ValueError):
+        status = (False, False)
+    with _status_lock:
+        _status_cache[file_path] = (mtime, status)
+        _status_cache.move_to_end(file_path)
+        while len(_status_cache) > ANNOTATION_STATUS_CACHE_LIMIT:
+            _status_cache.popitem(last=False)
+    return status
+
+def list_datasets_items(path: str, sort: str = "name", descending: bool = False,
+                        is_ready: Optional[bool] = None, is_valid: Optional[bool] = None,
+                        limit: Optional[int] = None, cursor: Optional[str] = None):
     '''
-    Recursively list the folders and images in root_path.
-    Returns a list of relative paths (folders and files).
+    List the folders and annotation JSON files directly in path (non-recursive).
+    Returns a list of relative paths (folders and files), served from the cached listing index.
+    is_ready/is_valid filter the JSON files on their flags; folders are always listed.
+    With a limit a page dict {"items", "next_cursor", "total"} is returned instead.
     '''
 
     if not os.path.isdir(path):
         raise FileNotFoundError(f"Datasets path '{path}' does not exist.")
 
-    items = []
-    for entry in os.listdir(path):
-        entry_path = os.path.join(path, entry)
-        rel_path = os.path.relpath(entry_path, start=path)
-        if (os.path.isfile(entry_path)):
-            _, ext = os.path.splitext(rel_path)
-            if (ext.lower() == ".json"):
-                items.append(rel_path)
-        else:
-            items.append(rel_path)
-    return items
+    def include(entry):
+        if entry["is_dir"]:
+            return True
+        if os.path.splitext(entry["name"])[1].lower() != ".json":
+            return False
+        if is_ready is None and is_valid is None:
+            return True
+        ready, valid = get_annotation_status(os.path.join(path, entry["name"]), entry["mtime"])
+        return (is_ready is None or ready == is_ready) and (is_valid is None or valid == is_valid)
+
+    def build_view(entries):
+        return build_sorted_view([entry for entry in entries if include(entry)], sort, descending)
 
-def get_file_contents(file_path: str) -> str:
+    keys, names = get_listing_view(path, ("datasets", sort, descending, is_ready, is_valid), build_view)
+
+    if limit is None:
+        return names[::-1] if descending else list(names)
+    items, next_cursor = paginate(keys, names, limit, cursor, descending)
+    return {"items": items, "next_cursor": next_cursor, "total": len(names)}
+
+def get_file_contents(file_path: str, request_headers=None):
     '''
-    Reads and returns the contents of a file at the given path.
-    Supports plain text files. Raises exceptions for invalid paths or unsupported file types.
+    Returns a response streaming the file at the given path.
+    Annotation JSON is validated with a content-hash ETag and revalidated on every use,
+    so a save is always seen; images are extracted once and cached long-term.
+    Answers 304 Not Modified when request_headers carry a matching validator.
     '''
-    print(file_path)
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"File '{file_path}' does not exist or is not a file.")
     try:
         _, ext = os.path.splitext(file_path)
-        response = FileResponse(
-            path=file_path,
-            media_type= "application/json" if ext==".json" else f"image/{ext[1:]}",  
-            filename=os.path.basename(file_path)        
+        is_json = ext == ".json"
+        return conditional_file_response(
+            file_path,
+            media_type="application/json" if is_json else f"image/{ext[1:]}",
+            headers=request_headers,
+            cache_control=REVALIDATE_CACHE_CONTROL if is_json else IMMUTABLE_CACHE_CONTROL,
+            use_content_hash=is_json,
+            filename=os.path.basename(file_path),
+            compress=is_json,
         )
-        if "etag" in response.headers:
-            del response.headers["etag"]
-
-        # Add no-cache headers
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
-
-        return response
     except UnicodeDecodeError:
         raise ValueError(f"File '{file_path}' cannot be decoded as text.")
     except Exception as e:
@@ -68,21 +123,184 @@ def load_annotation(relative_path: str, datasets_root: str):
         # Optionally, create an empty annotation file on the fly or raise
         raise FileNotFoundError(f"No annotation JSON found at '{annotation_path}'.")
 
-    with open(annotation_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    return read_json(annotation_path)
 
-    return data
+def _annotation_path(relative_path: str, datasets_root: str) -> str:
+    base_name, ext = os.path.splitext(relative_path)
+    return os.path.join(datasets_root, f"{base_name}.json")
 
-def save_annotation(relative_path: str, datasets_root: str, annotations):
+def _check_version(annotation_path: str, if_match: Optional[str]):
+    '''
+    Raise VersionConflictError unless if_match matches the current file's ETag.
+    Must be called with the file lock held.
+    '''
+    if if_match is None:
+        return
+    current = content_etag(annotation_path) if os.path.isfile(annotation_path) else None
+    if current is None or not etag_matches(if_match, current):
+        raise VersionConflictError(
+            f"Annotation '{annotation_path}' was modified by someone else (current version {current})."
+        )
+
+def save_annotation(relative_path: str, datasets_root: str, annotations, if_match: Optional[str] = None):
     '''
     Save (overwrite) the annotation JSON for the given image path.
+    The write is atomic and serialized per file; with if_match (an ETag) the save
+    is refused with VersionConflictError if the file changed since that version.
+    Ready documents are validated first and saved with their isValid/validationErrors.
+    Returns the path of the written annotation file.
     '''
-    base_name, ext = os.path.splitext(relative_path)
-    annotation_rel = f"{base_name}.json"
-    annotation_path = os.path.join(datasets_root, annotation_rel)
+    annotation_path = _annotation_path(relative_path, datasets_root)
+    with timer("annotation_save_seconds", "Time to validate and write an annotation file", operation="save"):
+        apply_validation(annotations)
+
+        with file_lock(annotation_path):
+            _check_version(annotation_path, if_match)
+            atomic_write_json(annotation_path, annotations, indent=ANNOTATION_JSON_INDENT)
+            # Under the lock, so derived views are updated in the order the saves happened
+            annotation_written(annotation_path, annotations, datasets_root)
+    invalidate_directory(os.path.dirname(annotation_path))
+    return annotation_path
+
+def patch_annotation(relative_path: str, datasets_root: str, patch, if_match: Optional[str] = None):
+    '''
+    Apply a partial update to an annotation JSON and save it atomically.
+    patch is either a JSON Patch operation list or a dict with "upsert" (annotation
+    objects), "delete" (annotation ids) and "set" (top-level fields).
+    Ready documents are re-validated in the same write.
+    Returns (annotation path, updated document).
+    '''
+    annotation_path = _annotation_path(relative_path, datasets_root)
+    if not os.path.isfile(annotation_path):
+        raise FileNotFoundError(f"No annotation JSON found at '{annotation_path}'.")
+
+    with timer("annotation_save_seconds", "Time to validate and write an annotation file", operation="patch"), \
+            file_lock(annotation_path):
+        _check_version(annotation_path, if_match)
+        data = read_json(annotation_path)
+
+        if isinstance(patch, list):
+            data = apply_json_patch(data, patch)
+        elif isinstance(patch, dict):
+            data = apply_annotation_changes(data, patch.get("upsert"), patch.get("delete"), patch.get("set"))
+        else:
+            raise ValueError("Patch must be a JSON Patch list or an upsert/delete object.")
+
+        apply_validation(data)
+        atomic_write_json(annotation_path, data, indent=ANNOTATION_JSON_INDENT)
+        annotation_written(annotation_path, data, datasets_root)
+    invalidate_directory(os.path.dirname(annotation_path))
+    return annotation_path, data
+
+
+def infer_annotation_hierarchy(annotations):
+    '''
+    Replace parent_id/children of a list of annotations with the containment tree
+    of their bounding boxes. Raises ValueError for malformed annotations.
+    '''
+    if not isinstance(annotations, list):
+        raise ValueError("Annotations must be a list.")
+    try:
+        return infer_hierarchy(annotations)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Every annotation needs an id and a bounding_box with x, y, width and height ({e}).")
+
+def apply_hierarchy(relative_path: str, datasets_root: str, if_match: Optional[str] = None):
+    '''
+    Infer the containment tree of a saved annotation file and write it back atomically.
+    Ready documents are re-validated in the same write.
+    Returns (annotation path, updated document).
+    '''
+    annotation_path = _annotation_path(relative_path, datasets_root)
+    if not os.path.isfile(annotation_path):
+        raise FileNotFoundError(f"No annotation JSON found at '{annotation_path}'.")
+
+    with timer("annotation_save_seconds", "Time to validate and write an annotation file", operation="hierarchy"), \
+            file_lock(annotation_path):
+        _check_version(annotation_path, if_match)
+        data = read_json(annotation_path)
+        infer_annotation_hierarchy(data.get("annotations", []))
+
+        apply_validation(data)
+        atomic_write_json(annotation_path, data, indent=ANNOTATION_JSON_INDENT)
+        annotation_written(annotation_path, data, datasets_root)
+    invalidate_directory(os.path.dirname(annotation_path))
+    return annotation_path, data
+
+
+BATCH_FORMATS = ("ndjson", "json")
+
+def _read_projected(file_path: str, fields=None, annotation_fields=None):
+    '''
+    Load one annotation JSON and keep only the requested top-level and per-annotation fields.
+    '''
+    data = read_json(file_path)
+    if fields:
+        data = {key: data[key] for key in fields if key in data}
+    if annotation_fields and isinstance(data.get("annotations"), list):
+        data["annotations"] = [
+            {key: ann[key] for key in annotation_fields if key in ann}
+            for ann in data["annotations"]
+        ]
+    return data
+
+def iter_annotations_batch(datasets_root: str, relative_paths, fields=None, annotation_fields=None):
+    '''
+    Yield {"path", "data"} (or {"path", "error"}) records for many annotation files in order.
+    Files are read and parsed concurrently in bounded windows so memory stays flat
+    regardless of how many files are requested.
+    '''
+    window = BATCH_READ_WORKERS * 4
+
+    def read(relative_path):
+        try:
+            data = _read_projected(os.path.join(datasets_root, relative_path), fields, annotation_fields)
+            return {"path": relative_path, "data": data}
+        except (OSError, ValueError) as e:
+            return {"path": relative_path, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=BATCH_READ_WORKERS, thread_name_prefix="batch-read") as executor:
+        for start in range(0, len(relative_paths), window):
+            yield from executor.map(read, relative_paths[start:start + window])
+
+def list_annotation_files(datasets_root: str, folder: Optional[str] = None):
+    '''
+    Return the relative paths of the annotation JSON files directly in a folder, sorted by name.
+    '''
+    folder = folder or ""
+    target_path = os.path.join(datasets_root, folder)
+    names = list_datasets_items(target_path)
+    return [
+        os.path.join(folder, name).replace(os.sep, "/") if folder else name
+        for name in names
+        if name.lower().endswith(".json")
+    ]
+
+def stream_annotations_batch(records, output_format: str = "ndjson", encoding: Optional[str] = None):
+    '''
+    Serialize batch records as NDJSON (one record per line) or as a single JSON array,
+    optionally compressing the stream on the fly ("gzip" or "br").
+    '''
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"Invalid format '{output_format}', expected one of {', '.join(BATCH_FORMATS)}.")
+
+    def chunks():
+        if output_format == "ndjson":
+            for record in records:
+                yield dumps(record) + b"\n"
+            return
+        yield b"["
+        for i, record in enumerate(records):
+            yield (b"," if i else b"") + dumps(record)
+        yield b"]"
 
-    # Ensure the destination directory exists
-    os.makedirs(os.path.dirname(annotation_path), exist_ok=True)
+    if encoding is None:
+        yield from chunks()
+        return
 
-    with open(annotation_path, "w", encoding="utf-8") as f:
-        json.dump(annotations, f, indent=2)
+    compressor = Compressor(encoding)
+    for chunk in chunks():
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
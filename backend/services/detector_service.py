@@ -0,0 +1,180 @@
+# detector_service.py
+# Contains a lightweight CPU inference path for exported (ONNX) detectors that avoids the torch stack.
+
+import ast
+import os
+
+import cv2
+import numpy as np
+
+
+def letterbox_image(img, max_width: int, max_height: int):
+    '''
+    Resize an image into a max_width x max_height canvas the same way
+    resize_image_with_padding does in preprocessing: keep the aspect ratio,
+    shrink with INTER_AREA and center the result on a zero-filled background.
+    Returns the padded image, the scale factor and the (x, y) offset.
+    '''
+    h, w = img.shape[:2]
+    scale = min(max_width / w, max_height / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+
+    resized_img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    padded_img = np.zeros((max_height, max_width, img.shape[2]), dtype=np.uint8)
+    x_offset = (max_width - new_w) // 2
+    y_offset = (max_height - new_h) // 2
+    padded_img[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = resized_img
+
+    return padded_img, scale, (x_offset, y_offset)
+
+
+def non_max_suppression(boxes, scores, iou_threshold: float):
+    '''
+    Greedy NMS over xyxy boxes. The IoU of the kept box against all remaining
+    candidates is computed in one vectorized step per iteration.
+    Returns the indices of the kept boxes, highest score first.
+    '''
+    if len(boxes) == 0:
+        return np.empty((0,), dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxDetector:
+    '''
+    Runs a YOLO model exported to ONNX with onnxruntime, or with OpenCV DNN
+    when onnxruntime is not installed. Only numpy and OpenCV are required.
+    '''
+
+    def __init__(self, model_path: str, input_size: int = 640, use_opencv: bool = False):
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"ONNX model '{model_path}' does not exist.")
+
+        self.model_path = model_path
+        self.input_width = input_size
+        self.input_height = input_size
+        self.names = {}
+        self._session = None
+        self._net = None
+
+        if not use_opencv:
+            try:
+                import onnxruntime as ort
+            except ImportError:
+                use_opencv = True
+
+        if use_opencv:
+            self._net = cv2.dnn.readNetFromONNX(model_path)
+        else:
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            model_input = self._session.get_inputs()[0]
+            self._input_name = model_input.name
+            # Static exports carry the input size, dynamic ones keep the constructor value
+            _, _, height, width = model_input.shape
+            if isinstance(height, int) and isinstance(width, int):
+                self.input_height, self.input_width = height, width
+            metadata = self._session.get_modelmeta().custom_metadata_map
+            if "names" in metadata:
+                self.names = {int(k): v for k, v in ast.literal_eval(metadata["names"]).items()}
+
+    def preprocess(self, img):
+        '''
+        Convert a BGR image to the normalized NCHW float tensor expected by the model.
+        '''
+        padded_img, scale, offset = letterbox_image(img, self.input_width, self.input_height)
+        blob = cv2.cvtColor(padded_img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        blob = np.ascontiguousarray(blob.transpose(2, 0, 1)[np.newaxis])
+        return blob, scale, offset
+
+    def _forward(self, blob):
+        if self._session is not None:
+            return self._session.run(None, {self._input_name: blob})[0]
+        self._net.setInput(blob)
+        return self._net.forward()
+
+    def predict(self, img, conf_threshold: float = 0.25, iou_threshold: float = 0.45):
+        '''
+        Detect components in a BGR image (or an image path).
+        Returns (boxes, scores, class_ids) with xyxy boxes in original image pixels.
+        '''
+        if isinstance(img, str):
+            path = img
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                raise FileNotFoundError(f"Could not load image: {path}")
+
+        blob, scale, (x_offset, y_offset) = self.preprocess(img)
+
+        # YOLOv8 output: (1, 4 + num_classes, num_candidates) with cx, cy, w, h first
+        output = self._forward(blob)[0].T
+        class_scores = output[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        mask = scores >= conf_threshold
+        cxcywh, scores, class_ids = output[mask, :4], scores[mask], class_ids[mask]
+
+        boxes = np.empty_like(cxcywh)
+        boxes[:, 0] = cxcywh[:, 0] - cxcywh[:, 2] / 2
+        boxes[:, 1] = cxcywh[:, 1] - cxcywh[:, 3] / 2
+        boxes[:, 2] = cxcywh[:, 0] + cxcywh[:, 2] / 2
+        boxes[:, 3] = cxcywh[:, 1] + cxcywh[:, 3] / 2
+
+        # Offset boxes per class so a single NMS pass never suppresses across classes
+        class_offsets = class_ids[:, np.newaxis] * float(max(self.input_width, self.input_height))
+        keep = non_max_suppression(boxes + class_offsets, scores, iou_threshold)
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # Undo the letterbox so boxes refer to the original image
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - x_offset) / scale
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - y_offset) / scale
+        h, w = img.shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+
+        return boxes, scores, class_ids
+
+    def predict_tiled(self, img, tile_size: int = None, overlap: float = 0.2,
+                      conf_threshold: float = 0.25, iou_threshold: float = 0.45):
+        '''
+        Detect components on overlapping tiles of a large frame and merge the results,
+        matching models trained on tiles from scripts/training_data.py.
+        Returns (boxes, scores, class_ids) in original image pixels.
+        '''
+        from .tiling_service import compute_tiles, merge_tile_detections
+
+        if isinstance(img, str):
+            path = img
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                raise FileNotFoundError(f"Could not load image: {path}")
+
+        h, w = img.shape[:2]
+        tile_size = tile_size or max(self.input_width, self.input_height)
+
+        tile_results = []
+        for tile in compute_tiles(w, h, tile_size, overlap):
+            x, y, tw, th = tile
+            boxes, scores, class_ids = self.predict(img[y:y + th, x:x + tw], conf_threshold, iou_threshold)
+            tile_results.append((tile, boxes, scores, class_ids))
+
+        return merge_tile_detections(tile_results, iou_threshold)
@@ -0,0 +1,175 @@
+# events_service.py
+# Contains the change-event broker: filesystem watcher and write hooks in, debounced folder-scoped batches out.
+
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+from ..config import ANNOTATIONS_PATH, EVENTS_DEBOUNCE_SECONDS, EVENTS_WATCH_FILESYSTEM, FRAMES_PATH
+from .metrics_service import increment
+
+logger = logging.getLogger(__name__)
+
+ROOTS = {"frames": FRAMES_PATH, "annotations": ANNOTATIONS_PATH}
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+_pending = OrderedDict()  # (root, path) -> event
+_pending_lock = threading.Lock()
+_subscribers = set()
+_flush_task = None
+_watcher_stop = None
+
+
+class _Subscriber:
+    def __init__(self, root, folder):
+        self.root = root
+        self.folder = folder.strip("/") if folder else ""
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def wants(self, event) -> bool:
+        if self.root and event["root"] != self.root:
+            return False
+        return not self.folder or event["path"] == self.folder or event["path"].startswith(self.folder + "/")
+
+
+def _merge(previous, event_type):
+    '''
+    Coalesce two events on the same file: a file created then modified is still
+    "created", created then deleted cancels out, anything then deleted is "deleted".
+    Returns the merged type, or None if the events cancel.
+    '''
+    if previous is None:
+        return event_type
+    if event_type == "deleted":
+        return None if previous == "created" else "deleted"
+    if previous == "created":
+        return "created"
+    return event_type
+
+
+def publish(event_type: str, root: str, path: str, **details):
+    '''
+    Record a change for the next debounced broadcast. Safe to call from any thread.
+    event_type is created, modified or deleted (for files), or a domain event such as
+    annotation_saved or frame_converted; path is relative to the root folder.
+    Events are dropped when the broadcast loop is not running (e.g. in scripts).
+    '''
+    if _flush_task is None:
+        return
+    path = os.path.normpath(path).replace(os.sep, "/")
+    key = (root, path)
+    with _pending_lock:
+        previous = _pending.pop(key, None)
+        if event_type in ("created", "modified", "deleted"):
+            merged = _merge(previous["type"] if previous else None, event_type)
+            if merged is None:
+                return
+            event_type = merged
+        _pending[key] = {"type": event_type, "root": root, "path": path, **details}
+
+
+def publish_annotation(annotation_path: str, datasets_root: str, event_type: str):
+    publish(event_type, "annotations", os.path.relpath(annotation_path, datasets_root))
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(EVENTS_DEBOUNCE_SECONDS)
+        with _pending_lock:
+            if not _pending:
+                continue
+            events = list(_pending.values())
+            _pending.clear()
+
+        for subscriber in list(_subscribers):
+            batch = [event for event in events if subscriber.wants(event)]
+            if not batch:
+                continue
+            try:
+                subscriber.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                # A slow client: replace its backlog with a single "resync" instruction
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait([{"type": "resync", "root": subscriber.root, "path": subscriber.folder}])
+
+
+def _watch_filesystem(stop_event: threading.Event):
+    '''
+    Watcher thread: translate filesystem changes under the frames and annotations
+    roots into events. Every worker process runs its own watcher, so its clients
+    also see the writes handled by the other workers.
+    '''
+    try:
+        from watchfiles import Change, watch
+    except ImportError:
+        increment("events_watcher_errors_total", 1, "Filesystem watchers that could not run", reason="not_installed")
+        logger.warning("watchfiles is not installed; change events only come from this worker's writes.")
+        return
+
+    # Imported here: the hooks publish through this module
+    from .hooks_service import annotation_removed
+
+    change_types = {Change.added: "created", Change.modified: "modified", Change.deleted: "deleted"}
+    roots = {name: os.path.abspath(path) for name, path in ROOTS.items() if os.path.isdir(path)}
+    if not roots:
+        return
+
+    for changes in watch(*roots.values(), stop_event=stop_event, debounce=int(EVENTS_DEBOUNCE_SECONDS * 1000)):
+        for change, changed_path in changes:
+            name = os.path.basename(changed_path)
+            # Skip temporary files of atomic writes and other hidden files
+            if name.startswith(".") or name.endswith(".tmp"):
+                continue
+            for root, root_path in roots.items():
+                if changed_path.startswith(root_path + os.sep):
+                    publish(change_types[change], root, os.path.relpath(changed_path, root_path))
+                    if root == "annotations" and change == Change.deleted and name.endswith(".json"):
+                        annotation_removed(changed_path, root_path)
+                    break
+
+
+def start_events():
+    '''
+    Start the broadcast loop on the running event loop and, if enabled, the filesystem watcher.
+    '''
+    global _flush_task, _watcher_stop
+    if _flush_task is None:
+        _flush_task = asyncio.get_running_loop().create_task(_flush_loop())
+    if EVENTS_WATCH_FILESYSTEM and _watcher_stop is None:
+        _watcher_stop = threading.Event()
+        threading.Thread(target=_watch_filesystem, args=(_watcher_stop,), name="events-watcher", daemon=True).start()
+
+
+def stop_events():
+    global _flush_task, _watcher_stop
+    if _flush_task is not None:
+        _flush_task.cancel()
+        _flush_task = None
+    if _watcher_stop is not None:
+        _watcher_stop.set()
+        _watcher_stop = None
+
+
+async def subscribe(root: str = None, folder: str = None, is_disconnected=None):
+    '''
+    Async generator of event batches for one client, scoped to a root and folder.
+    Yields None every HEARTBEAT_SECONDS without events so the caller can keep the connection alive.
+    '''
+    if root is not None and root not in ROOTS:
+        raise ValueError(f"Invalid root '{root}', expected one of {', '.join(ROOTS)}.")
+    subscriber = _Subscriber(root, folder)
+    _subscribers.add(subscriber)
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                yield None
+    finally:
+        _subscribers.discard(subscriber)
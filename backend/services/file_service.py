@@ -0,0 +1,93 @@
+# file_service.py
+# Contains helpers for atomic file writes and per-file locking shared by the services.
+
+import os
+import stat
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from ..config import LOCK_STRIPES, LOCKS_PATH
+from .serialization_service import dumps
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+# A fixed pool of locks: paths hash onto one of LOCK_STRIPES stripes, so neither the
+# in-process locks nor the lock files grow with the number of files ever written
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+# Read once at import (os.umask can only be queried by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class VersionConflictError(Exception):
+    '''
+    Raised when a write is based on a version (ETag) of a file that is no longer current.
+    '''
+
+
+def atomic_write_bytes(file_path: str, payload: bytes):
+    '''
+    Write a file through a temporary file in the same folder and rename it into place,
+    so readers never observe a partially written file. The file keeps the mode of
+    the file it replaces, or gets the usual umask-based mode when it is new.
+    '''
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    # The temporary name must not end with the target extension so listings ignore it
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_json(file_path: str, data, indent: int = 2):
+    '''
+    Serialize data as JSON (compact when indent is None) and write it atomically.
+    '''
+    atomic_write_bytes(file_path, dumps(data, indent=indent))
+
+
+@contextmanager
+def file_lock(file_path: str):
+    '''
+    Hold an exclusive lock for file_path. Threads of this process are serialized
+    with a striped in-process lock; other worker processes with flock on the
+    stripe's lock file, kept outside the data folders (where available).
+    Unrelated paths may share a stripe, so file_lock must never be nested.
+    '''
+    key = os.path.abspath(file_path)
+    stripe = int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:8], 16) % LOCK_STRIPES
+
+    with _locks[stripe]:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(LOCKS_PATH, exist_ok=True)
+        lock_path = os.path.join(LOCKS_PATH, f"stripe-{stripe:04d}.lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -3,54 +3,97 @@
 
 import os
 import shutil
-import json
-from fastapi.responses import FileResponse
+from typing import Optional
 import re
 import cv2
-from ..config import FRAMES_PATH, ANNOTATIONS_PATH
-
-def list_frames_items(path: str):
+from ..config import ANNOTATION_JSON_INDENT, FRAMES_PATH, ANNOTATIONS_PATH
+from .caching_service import IMMUTABLE_CACHE_CONTROL, conditional_file_response
+from .file_service import atomic_write_json, file_lock
+from .hooks_service import annotation_written
+from .listing_service import (
+    build_sorted_view,
+    get_file_stems,
+    get_listing_view,
+    invalidate_directory,
+    paginate,
+)
+from .metrics_service import timer
+from .serialization_service import read_json
+
+VALID_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff"}
+FRAME_STATUS_FILTERS = ("all", "annotated", "unannotated")
+DIFF_FILTERS = ("exclude", "include", "only")
+
+def list_frames_items(path: str, sort: str = "name", descending: bool = False, status: str = "unannotated",
+                      diff: str = "exclude", limit: Optional[int] = None, cursor: Optional[str] = None):
     '''
     List only the immediate folders and files in the given path (non-recursive).
-    Returns a simple list of relative paths for demonstration.
+    By default frames that already have an annotation JSON and "_diff" images are
+    left out; status and diff change those filters. The annotated set comes from
+    the cached listing of the matching annotations folder.
+    Without a limit the full sorted list of relative paths is returned; with a limit
+    a page dict {"items", "next_cursor", "total"} is returned instead.
     '''
-    valid_image_extensions = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff"}
-
+    if status not in FRAME_STATUS_FILTERS:
+        raise ValueError(f"Invalid status '{status}', expected one of {', '.join(FRAME_STATUS_FILTERS)}.")
+    if diff not in DIFF_FILTERS:
+        raise ValueError(f"Invalid diff '{diff}', expected one of {', '.join(DIFF_FILTERS)}.")
     if not os.path.isdir(path):
         raise FileNotFoundError(f"Frames path '{path}' does not exist.")
 
-    items = []
-    for entry in os.listdir(path):
-        entry_path = os.path.join(path, entry)
-        rel_path = os.path.relpath(entry_path, start=path)
-        if (os.path.isfile(entry_path)):
-            _, ext = os.path.splitext(rel_path)
-            if (ext.lower() in valid_image_extensions and rel_path.find("_diff") == -1):
-                if not os.path.exists(entry_path.replace(FRAMES_PATH, ANNOTATIONS_PATH).replace(ext, ".json")):
-                    items.append(rel_path)
-        else:
-            items.append(rel_path)
-    return items
-
-def get_file_contents(file_path: str) -> str:
+    relative_dir = os.path.relpath(path, FRAMES_PATH)
+    annotated = get_file_stems(os.path.join(ANNOTATIONS_PATH, relative_dir), ".json")
+
+    def include(entry):
+        if entry["is_dir"]:
+            return True
+        stem, ext = os.path.splitext(entry["name"])
+        if ext.lower() not in VALID_IMAGE_EXTENSIONS:
+            return False
+        is_diff = entry["name"].find("_diff") != -1
+        if (diff == "exclude" and is_diff) or (diff == "only" and not is_diff):
+            return False
+        if status == "annotated":
+            return stem in annotated
+        if status == "unannotated":
+            return stem not in annotated
+        return True
+
+    def build_view(entries):
+        return build_sorted_view([entry for entry in entries if include(entry)], sort, descending)
+
+    # The annotated set is part of the key so conversions refresh the view
+    view_key = ("frames", sort, descending, status, diff, annotated if status != "all" else None)
+    keys, names = get_listing_view(path, view_key, build_view)
+
+    if limit is None:
+        return names[::-1] if descending else list(names)
+    items, next_cursor = paginate(keys, names, limit, cursor, descending)
+    return {"items": items, "next_cursor": next_cursor, "total": len(names)}
+
+def get_file_contents(file_path: str, request_headers=None):
     '''
-    Reads and returns the contents of a file at the given path.
-    Supports plain text files. Raises exceptions for invalid paths or unsupported file types.
+    Returns a response streaming the image at the given path.
+    Extracted frames never change in place, so they get long-lived cache headers
+    and a 304 Not Modified when request_headers carry a matching validator.
     '''
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"File '{file_path}' does not exist or is not a file.")
     try:
         _, ext = os.path.splitext(file_path)
-        return FileResponse(
-            path=file_path,
-            media_type=f"image/{ext[1:]}",  
-            filename=os.path.basename(file_path)        
+        return conditional_file_response(
+            file_path,
+            media_type=f"image/{ext[1:]}",
+            headers=request_headers,
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+            filename=os.path.basename(file_path),
         )
     except UnicodeDecodeError:
         raise ValueError(f"File '{file_path}' cannot be decoded as text.")
     except Exception as e:
         raise IOError(f"Error reading file '{file_path}': {str(e)}")
 
+@timer("frame_conversion_seconds", "Time to convert a frame into a dataset item")
 def convert_frame_to_dataset(relative_path: str, frames_root: str, datasets_root: str):
     '''
     Copy an image from the frames folder (plus optional JSON) to the datasets folder,
@@ -70,13 +113,11 @@ def convert_frame_to_dataset(relative_path: str, frames_root: str, datasets_root
     base_name, ext = os.path.splitext(relative_path)
     file_name = os.path.basename(relative_path)
     name,_ = os.path.splitext(file_name)
-    print(name)
     src_json_path = os.path.join(frames_root, f"{base_name}.json")
     dest_json_path = os.path.join(datasets_root, f"{base_name}.json")
 
     if os.path.isfile(src_json_path):
-        with open(src_json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_json(src_json_path)
     else:
         data = {}
     
@@ -91,12 +132,14 @@ def convert_frame_to_dataset(relative_path: str, frames_root: str, datasets_root
     metadata["keywords"] = keywords
     metadata["annotations"] = []
 
-    with open(dest_json_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    with file_lock(dest_json_path):
+        atomic_write_json(dest_json_path, metadata, indent=ANNOTATION_JSON_INDENT)
+        annotation_written(dest_json_path, metadata, datasets_root, event="frame_converted")
+    invalidate_directory(dest_dir)
 
     # rescale_image(src_image_path, dest_image_path)
 
-def rescale_image(src_image_path, dest_image_path, scale_factor=0.25):
+def rescale_image(src_image_path, dest_image_path, scale_factor=0.25, max_dimension=None):
     """
     Loads an image from src_image_path, rescales it by scale_factor,
     and saves the result to dest_image_path.
@@ -105,25 +148,30 @@ def rescale_image(src_image_path, dest_image_path, scale_factor=0.25):
       'INTER_AREA' is typically recommended for shrinking.
     - If scale_factor > 1.0, the image is enlarged (upscaled).
       'INTER_CUBIC' or 'INTER_LINEAR' is typically recommended for enlarging.
+    - If max_dimension is given, scale_factor is derived from it so the longest
+      side fits within max_dimension (images are never enlarged in that case).
     """
     # Read the source image in color
     src_image = cv2.imread(src_image_path, cv2.IMREAD_COLOR)
     if src_image is None:
         raise FileNotFoundError(f"Could not load image: {src_image_path}")
 
+    # Calculate the target dimensions
+    height, width = src_image.shape[:2]
+    if max_dimension is not None:
+        scale_factor = min(1.0, max_dimension / max(width, height))
+
     # Determine interpolation method based on scale_factor
     if scale_factor < 1.0:
         interpolation = cv2.INTER_AREA
     else:
         interpolation = cv2.INTER_CUBIC  # or cv2.INTER_LINEAR
 
-    # Calculate the target dimensions
-    height, width = src_image.shape[:2]
-    new_width = int(width * scale_factor)
-    new_height = int(height * scale_factor)
+    new_width = max(1, int(width * scale_factor))
+    new_height = max(1, int(height * scale_factor))
 
     # Resize the image
     resized_image = cv2.resize(src_image, (new_width, new_height), interpolation=interpolation)
 
     # Write the resulting image to the destination path
-    cv2.imwrite(dest_image_path, resized_image)
\ No newline at end of file
+    cv2.imwrite(dest_image_path, resized_image)
@@ -0,0 +1,46 @@
+# health_service.py
+# Contains the liveness and readiness checks used by process managers and load balancers.
+
+import os
+import sqlite3
+
+from ..config import ANNOTATIONS_PATH, FRAMES_PATH, JOBS_PATH, SEARCH_INDEX_PATH, STATS_PATH
+
+_shutting_down = False
+
+
+def mark_shutting_down():
+    '''
+    Report not ready from now on, so load balancers stop routing new work here.
+    '''
+    global _shutting_down
+    _shutting_down = True
+
+
+def _sqlite_ok(path: str) -> bool:
+    if not os.path.isfile(path):
+        # Created on first use
+        return True
+    try:
+        connection = sqlite3.connect(path, timeout=1)
+        try:
+            connection.execute("SELECT 1").fetchone()
+        finally:
+            connection.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def readiness_checks():
+    '''
+    Return {check name: passed} for everything a worker needs to serve requests.
+    '''
+    return {
+        "accepting": not _shutting_down,
+        "frames_path": os.path.isdir(FRAMES_PATH),
+        "annotations_path": os.path.isdir(ANNOTATIONS_PATH),
+        "search_index": _sqlite_ok(SEARCH_INDEX_PATH),
+        "stats": _sqlite_ok(STATS_PATH),
+        "jobs": _sqlite_ok(JOBS_PATH),
+    }
@@ -0,0 +1,166 @@
+# hierarchy_service.py
+# Contains the logic for deriving parent/child relationships between annotations from box containment.
+
+import bisect
+
+
+def _box_area(bbox) -> float:
+    return bbox["width"] * bbox["height"]
+
+
+def _edges(bbox):
+    return (bbox["x"], bbox["y"], bbox["x"] + bbox["width"], bbox["y"] + bbox["height"])
+
+
+def _rank(ann):
+    # Rank boxes by area; identical areas are ordered by id so ties still form a chain
+    return (_box_area(ann["bounding_box"]), -ann["id"])
+
+
+def _edges_contain(outer, inner) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+class _Node:
+    __slots__ = ("item", "edges", "rank", "children")
+
+    def __init__(self, item, edges, rank):
+        self.item = item
+        self.edges = edges
+        self.rank = rank
+        self.children = _Siblings()
+
+
+class _Siblings:
+    '''
+    The children of one node, kept sorted by left and by top edge along with
+    their widest and tallest extent. A box can only sit inside siblings whose
+    left edge lies in [right - widest, left] (and the same vertically), so a
+    lookup bisects both orders and scans the narrower window.
+    '''
+    __slots__ = ("xs", "x_nodes", "ys", "y_nodes", "max_width", "max_height")
+
+    def __init__(self):
+        self.xs, self.x_nodes = [], []
+        self.ys, self.y_nodes = [], []
+        self.max_width = self.max_height = 0
+
+    def add(self, node):
+        x1, y1, x2, y2 = node.edges
+        i = bisect.bisect_right(self.xs, x1)
+        self.xs.insert(i, x1)
+        self.x_nodes.insert(i, node)
+        i = bisect.bisect_right(self.ys, y1)
+        self.ys.insert(i, y1)
+        self.y_nodes.insert(i, node)
+        self.max_width = max(self.max_width, x2 - x1)
+        self.max_height = max(self.max_height, y2 - y1)
+
+    def containing(self, edges):
+        if not self.xs:
+            return ()
+        x1, y1, x2, y2 = edges
+        x_lo = bisect.bisect_left(self.xs, _lower_bound(x2 - self.max_width))
+        x_hi = bisect.bisect_right(self.xs, x1)
+        y_lo = bisect.bisect_left(self.ys, _lower_bound(y2 - self.max_height))
+        y_hi = bisect.bisect_right(self.ys, y1)
+        if x_hi - x_lo <= y_hi - y_lo:
+            window = self.x_nodes[x_lo:x_hi]
+        else:
+            window = self.y_nodes[y_lo:y_hi]
+        return [node for node in window if _edges_contain(node.edges, edges)]
+
+
+def _lower_bound(value):
+    # Leave room for rounding in x + width so float boxes are never missed
+    return value - abs(value) * 1e-9 - 1e-9
+
+
+class ContainmentIndex:
+    '''
+    Forest of boxes nested by containment, answering "which box most tightly
+    contains this one" without comparing against every box.
+    Boxes must be inserted from the highest rank (largest area) down, which
+    makes every box's parent already present when it arrives. A query walks
+    down from the roots through the children that contain the box, so it costs
+    a few bisections per nesting level; with the nested layouts of UI screens
+    building the tree for n boxes is O(n log n) instead of O(n^2).
+    '''
+    def __init__(self):
+        self._roots = _Siblings()
+
+    def _innermost_node(self, edges):
+        best = None
+        stack = self._roots.containing(edges)
+        while stack:
+            node = stack.pop()
+            # Children always rank below their parent, so the smallest rank seen wins
+            if best is None or node.rank < best.rank:
+                best = node
+            stack.extend(node.children.containing(edges))
+        return best
+
+    def innermost(self, bbox):
+        '''
+        Return the item of the smallest indexed box that fully contains bbox, or None.
+        '''
+        node = self._innermost_node(_edges(bbox))
+        return node.item if node is not None else None
+
+    def insert(self, bbox, item, rank):
+        '''
+        Add a box ranked below everything inserted so far and return the item of
+        its parent (the smallest box containing it), or None for a root.
+        '''
+        edges = _edges(bbox)
+        parent = self._innermost_node(edges)
+        node = _Node(item, edges, rank)
+        (parent.children if parent is not None else self._roots).add(node)
+        return parent.item if parent is not None else None
+
+
+def build_index(annotations) -> ContainmentIndex:
+    '''
+    Index annotations by their bounding boxes for innermost-container lookups.
+    '''
+    index = ContainmentIndex()
+    for ann in sorted(annotations, key=_rank, reverse=True):
+        index.insert(ann["bounding_box"], ann, _rank(ann))
+    return index
+
+
+def enclosing_ids(annotations, bboxes):
+    '''
+    Return, for each box in bboxes (e.g. OCR words), the id of the smallest
+    annotation whose box fully contains it, or None.
+    '''
+    index = build_index(annotations)
+    ids = []
+    for bbox in bboxes:
+        ann = index.innermost(bbox)
+        ids.append(ann["id"] if ann is not None else None)
+    return ids
+
+
+def infer_hierarchy(annotations):
+    '''
+    Set parent_id and children on every annotation from bounding box containment.
+    The parent of an annotation is the smallest other box that fully contains it;
+    identical boxes are nested in id order so the result never has cycles.
+    Returns the same list, updated in place.
+    '''
+    for ann in annotations:
+        ann["parent_id"] = None
+        ann["children"] = []
+
+    index = ContainmentIndex()
+    for ann in sorted(annotations, key=_rank, reverse=True):
+        parent = index.insert(ann["bounding_box"], ann, _rank(ann))
+        if parent is not None:
+            ann["parent_id"] = parent["id"]
+
+    id_map = {ann["id"]: ann for ann in annotations}
+    for ann in annotations:
+        if ann["parent_id"] is not None:
+            id_map[ann["parent_id"]]["children"].append(ann["id"])
+    return annotations
@@ -0,0 +1,36 @@
+# hooks_service.py
+# Contains the notification points called after an annotation file was written or removed.
+
+import os
+
+from ..config import ANNOTATIONS_PATH
+from .events_service import publish_annotation
+from .file_service import file_lock
+from .search_service import index_document, remove_document
+from .stats_service import remove_document_stats, update_document_stats
+
+
+def annotation_written(annotation_path: str, data, datasets_root: str = ANNOTATIONS_PATH,
+                       event: str = "annotation_saved"):
+    '''
+    Keep the derived views (search index, statistics) in sync with a freshly written
+    annotation file and notify subscribed clients with the given event type.
+    Writers call this while still holding the file's lock, so concurrent saves of
+    one file reach the derived views in write order.
+    '''
+    index_document(annotation_path, data, datasets_root)
+    update_document_stats(annotation_path, data, datasets_root)
+    publish_annotation(annotation_path, datasets_root, event)
+
+
+def annotation_removed(annotation_path: str, datasets_root: str = ANNOTATIONS_PATH):
+    '''
+    Drop a deleted (or moved away) annotation file from the derived views (search index, statistics).
+    Called by the filesystem watcher, so it takes the file's lock itself; a file
+    that exists again (re-created by a later save) keeps its entries.
+    '''
+    with file_lock(annotation_path):
+        if os.path.exists(annotation_path):
+            return
+        remove_document(annotation_path, datasets_root)
+        remove_document_stats(annotation_path, datasets_root)
@@ -0,0 +1,322 @@
+# jobs_service.py
+# Contains the registry for background jobs run on named thread pools, shared by all worker processes.
+
+import os
+import json
+import time
+import uuid
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import JOB_HISTORY_LIMIT, JOBS_PATH
+from .metrics_service import increment
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+"""
+
+# Jobs run by this process; the store makes them visible to the other workers
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executors = {}
+_executors_lock = threading.Lock()
+_local = threading.local()
+_last_persisted = {}
+_last_cancel_check = {}
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# Progress and remote cancellation are synced with the store at most this often
+SYNC_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    '''
+    Raised by a job function (via check_cancelled) to stop after a cancellation request.
+    '''
+
+
+def _connect():
+    '''
+    Return this thread's connection to the job store, creating the schema on first use.
+    '''
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(JOBS_PATH), exist_ok=True)
+        connection = sqlite3.connect(JOBS_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        _local.connection = connection
+    return connection
+
+
+def _snapshot(job) -> dict:
+    '''
+    Copy a job record for _persist and note the time of the write.
+    Must be called with _jobs_lock held.
+    '''
+    _last_persisted[job["id"]] = time.monotonic()
+    return dict(job)
+
+
+def _persist(job):
+    '''
+    Write a job snapshot to the store. The cancellation flag is owned by the store
+    (any worker may set it), so it is never overwritten here. Called without
+    _jobs_lock held, so a late write of an unfinished snapshot never replaces a
+    finished record.
+    '''
+    try:
+        with _connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, data, finished) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET data = excluded.data, finished = excluded.finished "
+                "WHERE jobs.finished IS NULL OR excluded.finished IS NOT NULL",
+                (job["id"], json.dumps(job, default=str), job["finished"]),
+            )
+    except sqlite3.Error as e:
+        increment("job_store_errors_total", 1, "Failed writes to the job store", operation="update")
+        logger.warning("Job store update failed for '%s': %s", job["id"], e)
+
+
+def _load(job_id: str):
+    '''
+    Return a job record from the store, or None. Unfinished jobs whose worker
+    process is gone are reported as failed.
+    '''
+    row = _connect().execute("SELECT data, cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = json.loads(row[0])
+    job["cancel_requested"] = job["cancel_requested"] or bool(row[1])
+    if job["status"] not in FINISHED_STATUSES and not _process_alive(job.get("pid")):
+        job.update(status="failed", error="The worker process running this job exited.")
+    return job
+
+
+def _process_alive(pid) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_executor(pool_name: str, max_workers: int) -> ThreadPoolExecutor:
+    '''
+    Return the shared thread pool registered under pool_name, creating it on first use.
+    '''
+    with _executors_lock:
+        executor = _executors.get(pool_name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=pool_name)
+            _executors[pool_name] = executor
+        return executor
+
+
+def _prune_finished_jobs():
+    '''
+    Drop the oldest finished jobs once the history limit is exceeded.
+    '''
+    with _jobs_lock:
+        finished = [job for job in _jobs.values() if job["status"] in FINISHED_STATUSES]
+        overflow = len(finished) - JOB_HISTORY_LIMIT
+        if overflow > 0:
+            finished.sort(key=lambda job: job["finished"])
+            for job in finished[:overflow]:
+                del _jobs[job["id"]]
+                _last_persisted.pop(job["id"], None)
+                _last_cancel_check.pop(job["id"], None)
+
+    try:
+        with _connect() as connection:
+            connection.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND id NOT IN "
+                "(SELECT id FROM jobs WHERE finished IS NOT NULL ORDER BY finished DESC LIMIT ?)",
+                (JOB_HISTORY_LIMIT,),
+            )
+    except sqlite3.Error as e:
+        increment("job_store_errors_total", 1, "Failed writes to the job store", operation="prune")
+        logger.warning("Job store pruning failed: %s", e)
+
+
+def _finish_job(job, status: str, **fields):
+    with _jobs_lock:
+        job["status"] = status
+        job["finished"] = time.time()
+        job.update(fields)
+        snapshot = _snapshot(job)
+    _persist(snapshot)
+    _prune_finished_jobs()
+
+
+def _cancel_requested(job_id: str, force_check: bool = False) -> bool:
+    '''
+    Return whether cancellation of a local job was requested, in this process or
+    (checked against the store every SYNC_INTERVAL) in another worker.
+    '''
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return False
+        if job["cancel_requested"]:
+            return True
+        now = time.monotonic()
+        if not force_check and now - _last_cancel_check.get(job_id, 0) < SYNC_INTERVAL:
+            return False
+        _last_cancel_check[job_id] = now
+
+    try:
+        row = _connect().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    except sqlite3.Error:
+        return False
+    if row is None or not row[0]:
+        return False
+    with _jobs_lock:
+        job["cancel_requested"] = True
+    return True
+
+
+def _run_job(job_id: str, func, args, kwargs):
+    cancelled = _cancel_requested(job_id, force_check=True)
+    with _jobs_lock:
+        job = _jobs[job_id]
+        if not cancelled:
+            job["status"] = "running"
+            job["started"] = time.time()
+            snapshot = _snapshot(job)
+    if cancelled:
+        _finish_job(job, "cancelled")
+        return
+    _persist(snapshot)
+    try:
+        result = func(*args, **kwargs)
+    except JobCancelled:
+        _finish_job(job, "cancelled")
+        return
+    except Exception as e:
+        _finish_job(job, "failed", error=str(e))
+        return
+    _finish_job(job, "completed", result=result)
+
+
+def submit_job(kind: str, func, *args, pool_name: str = None, max_workers: int = 1,
+               pass_job_id: bool = False, **kwargs) -> str:
+    '''
+    Queue func(*args, **kwargs) on a background thread pool and return a job id.
+    The job status can be polled with get_job() from any worker process. With
+    pass_job_id=True the job id is passed as the first argument so the function
+    can report progress and honour cancellation.
+    '''
+    job_id = uuid.uuid4().hex
+    if pass_job_id:
+        args = (job_id,) + args
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "created": time.time(),
+        "started": None,
+        "finished": None,
+        "result": None,
+        "error": None,
+        "progress": None,
+        "cancel_requested": False,
+        "pid": os.getpid(),
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        snapshot = _snapshot(job)
+    _persist(snapshot)
+    get_executor(pool_name or kind, max_workers).submit(_run_job, job_id, func, args, kwargs)
+    return job_id
+
+
+def get_job(job_id: str) -> dict:
+    '''
+    Return a snapshot of the job with the given id, whichever worker runs it.
+    Raises KeyError if the job is unknown (or was pruned from the history).
+    '''
+    with _jobs_lock:
+        if job_id in _jobs:
+            return dict(_jobs[job_id])
+    job = _load(job_id)
+    if job is None:
+        raise KeyError(f"Job '{job_id}' does not exist.")
+    return job
+
+
+def report_progress(job_id: str, **progress):
+    '''
+    Merge progress counters (e.g. done=10, total=100) into the job record.
+    '''
+    snapshot = None
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job["progress"] = {**(job["progress"] or {}), **progress}
+            if time.monotonic() - _last_persisted.get(job_id, 0) >= SYNC_INTERVAL:
+                snapshot = _snapshot(job)
+    if snapshot is not None:
+        _persist(snapshot)
+
+
+def cancel_job(job_id: str) -> dict:
+    '''
+    Request cancellation of a job. Queued jobs never start; running jobs stop
+    at their next check_cancelled() call. Finished jobs are returned unchanged.
+    Raises KeyError if the job is unknown.
+    '''
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None and job["status"] not in FINISHED_STATUSES:
+            job["cancel_requested"] = True
+
+    job = get_job(job_id)
+    if job["status"] not in FINISHED_STATUSES:
+        with _connect() as connection:
+            connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+        job["cancel_requested"] = True
+    return job
+
+
+def check_cancelled(job_id: str):
+    '''
+    Raise JobCancelled if cancellation of the job was requested.
+    '''
+    if _cancel_requested(job_id):
+        raise JobCancelled()
+
+
+def shutdown_jobs():
+    '''
+    Stop this process's jobs for a graceful shutdown: queued jobs are cancelled,
+    running jobs are asked to stop at their next check, and the pools are drained.
+    '''
+    with _jobs_lock:
+        unfinished = [job for job in _jobs.values() if job["status"] not in FINISHED_STATUSES]
+        for job in unfinished:
+            job["cancel_requested"] = True
+    for job in unfinished:
+        if job["status"] == "queued":
+            _finish_job(job, "cancelled")
+
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
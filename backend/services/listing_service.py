@@ -0,0 +1,207 @@
+# listing_service.py
+# Contains an in-memory index of directory listings that is rebuilt only when a directory changes.
+
+import os
+import re
+import json
+import base64
+import bisect
+import threading
+from collections import OrderedDict
+
+from ..config import LISTING_INDEX_LIMIT
+from .metrics_service import increment, timer
+
+_index = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _scan_directory(path: str):
+    '''
+    Read a directory with a single os.scandir pass.
+    Returns a list of entry dicts with name, is_dir, mtime and size.
+    '''
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Removed while scanning
+                continue
+            entries.append({
+                "name": entry.name,
+                "is_dir": is_dir,
+                "mtime": stat.st_mtime,
+                "size": 0 if is_dir else stat.st_size,
+            })
+    return entries
+
+
+def _get_index_entry(path: str):
+    '''
+    Return the cached index record for a directory, rescanning it when its
+    mtime changed (files were added, removed or renamed) since the last scan.
+    Returns None if the directory does not exist.
+    '''
+    key = os.path.abspath(path)
+    try:
+        mtime_ns = os.stat(key).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _index_lock:
+        record = _index.get(key)
+        if record is not None and record["mtime_ns"] == mtime_ns:
+            _index.move_to_end(key)
+            increment("listing_index_lookups_total", 1, "Directory index lookups", result="hit")
+            return record
+
+    increment("listing_index_lookups_total", 1, "Directory index lookups", result="miss")
+    with timer("listing_scan_seconds", "Time to scan a directory into the index"):
+        entries = _scan_directory(key)
+    record = {"mtime_ns": mtime_ns, "entries": entries, "stems": {}, "views": {}}
+    with _index_lock:
+        _index[key] = record
+        _index.move_to_end(key)
+        while len(_index) > LISTING_INDEX_LIMIT:
+            _index.popitem(last=False)
+    return record
+
+
+def get_directory_entries(path: str):
+    '''
+    Return the indexed entries of a directory (see _scan_directory).
+    Raises FileNotFoundError if the directory does not exist.
+    '''
+    record = _get_index_entry(path)
+    if record is None:
+        raise FileNotFoundError(f"Path '{path}' does not exist.")
+    return record["entries"]
+
+
+def get_file_stems(path: str, ext: str):
+    '''
+    Return the set of file names (without extension) in a directory that end with ext.
+    A missing directory yields an empty set. The set is cached with the listing.
+    '''
+    record = _get_index_entry(path)
+    if record is None:
+        return frozenset()
+    stems = record["stems"].get(ext)
+    if stems is None:
+        stems = frozenset(
+            os.path.splitext(entry["name"])[0]
+            for entry in record["entries"]
+            if not entry["is_dir"] and entry["name"].lower().endswith(ext)
+        )
+        record["stems"][ext] = stems
+    return stems
+
+
+def get_listing_view(path: str, view_key, build_view):
+    '''
+    Return build_view(entries) for a directory, cached alongside its listing
+    under view_key until the directory changes.
+    Raises FileNotFoundError if the directory does not exist.
+    '''
+    record = _get_index_entry(path)
+    if record is None:
+        raise FileNotFoundError(f"Path '{path}' does not exist.")
+    views = record["views"]
+    view = views.get(view_key)
+    if view is None:
+        with timer("listing_view_build_seconds", "Time to build a sorted/filtered listing view"):
+            view = build_view(record["entries"])
+        # Views keyed on other folders' state (e.g. the annotated set) go stale; keep only a few
+        if len(views) >= 32:
+            views.clear()
+        views[view_key] = view
+    return view
+
+
+SORT_FIELDS = ("name", "frame", "mtime")
+
+_frame_index_pattern = re.compile(r"(\d+)")
+
+
+def frame_index(name: str) -> int:
+    '''
+    Return the last number in a file name (frame_00042.png -> 42), or -1 if there is none.
+    '''
+    numbers = _frame_index_pattern.findall(name)
+    return int(numbers[-1]) if numbers else -1
+
+
+def sort_key(entry, sort: str, descending: bool = False):
+    '''
+    Build the sort key of an entry. Folders are grouped so that they come first
+    in either direction, and the name breaks ties so keys are unique.
+    '''
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort '{sort}', expected one of {', '.join(SORT_FIELDS)}.")
+    group = int(entry["is_dir"]) if descending else int(not entry["is_dir"])
+    if sort == "frame":
+        primary = frame_index(entry["name"])
+    elif sort == "mtime":
+        primary = entry["mtime"]
+    else:
+        primary = entry["name"].lower()
+    return (group, primary, entry["name"])
+
+
+def build_sorted_view(entries, sort: str, descending: bool = False):
+    '''
+    Sort entries ascending by sort_key and return parallel (keys, names) lists.
+    '''
+    keyed = sorted((sort_key(entry, sort, descending), entry["name"]) for entry in entries)
+    return [key for key, _ in keyed], [name for _, name in keyed]
+
+
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+
+
+def paginate(keys, names, limit: int, cursor: str = None, descending: bool = False):
+    '''
+    Return one page of a sorted view plus the cursor of the next page (None at the end).
+    The cursor encodes the key of the last returned item, so pages stay stable
+    when entries are added or removed in between requests.
+    '''
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer.")
+    try:
+        if descending:
+            end = bisect.bisect_left(keys, decode_cursor(cursor)) if cursor else len(keys)
+        else:
+            start = bisect.bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+    except TypeError:
+        raise ValueError("Cursor does not match the requested sort.")
+
+    if descending:
+        start = max(0, end - limit)
+        page_keys, page_names = keys[start:end][::-1], names[start:end][::-1]
+        has_more = start > 0
+    else:
+        end = start + limit
+        page_keys, page_names = keys[start:end], names[start:end]
+        has_more = end < len(keys)
+    next_cursor = encode_cursor(page_keys[-1]) if has_more and page_keys else None
+    return page_names, next_cursor
+
+
+def invalidate_directory(path: str):
+    '''
+    Drop the cached listing of a directory. Used after writes so a change is
+    visible immediately even on filesystems with coarse mtime resolution.
+    '''
+    with _index_lock:
+        _index.pop(os.path.abspath(path), None)
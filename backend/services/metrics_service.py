@@ -0,0 +1,274 @@
+# metrics_service.py
+# Contains the in-process metrics registry (counters, gauges, histograms) shared by the backend and the scripts.
+
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = {}  # name -> {"type", "help", "buckets", "series": {label tuple: value}}
+_lock = threading.Lock()
+_started = time.time()
+
+
+def _series(name: str, metric_type: str, labels, help_text: str = None, buckets=None):
+    '''
+    Return (metric, label key) for a metric, registering it on first use.
+    Must be called with _lock held.
+    '''
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = {"type": metric_type, "help": help_text or name.replace("_", " "),
+                  "buckets": tuple(buckets or DEFAULT_BUCKETS), "series": {}}
+        _metrics[name] = metric
+    elif metric["type"] != metric_type:
+        raise ValueError(f"Metric '{name}' is a {metric['type']}, not a {metric_type}.")
+    return metric, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, help_text: str = None, **labels):
+    '''
+    Add value to a counter.
+    '''
+    with _lock:
+        metric, key = _series(name, "counter", labels, help_text)
+        metric["series"][key] = metric["series"].get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, help_text: str = None, **labels):
+    with _lock:
+        metric, key = _series(name, "gauge", labels, help_text)
+        metric["series"][key] = value
+
+
+def add_gauge(name: str, delta: float, help_text: str = None, **labels):
+    with _lock:
+        metric, key = _series(name, "gauge", labels, help_text)
+        metric["series"][key] = metric["series"].get(key, 0) + delta
+
+
+def observe(name: str, value: float, help_text: str = None, buckets=None, **labels):
+    '''
+    Record one observation (usually seconds) in a histogram.
+    '''
+    with _lock:
+        metric, key = _series(name, "histogram", labels, help_text, buckets)
+        state = metric["series"].get(key)
+        if state is None:
+            state = metric["series"][key] = {"counts": [0] * len(metric["buckets"]), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(metric["buckets"]):
+            if value <= bound:
+                state["counts"][i] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+
+@contextmanager
+def timer(name: str, help_text: str = None, **labels):
+    '''
+    Time the enclosed block into the histogram name (in seconds).
+    '''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, help_text, **labels)
+
+
+class StageTracker:
+    '''
+    Counts items processed by a pipeline stage; see stage().
+    '''
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.start = time.perf_counter()
+        self.end = None
+
+    def add(self, count: int = 1):
+        self.items += count
+
+    def stop(self):
+        self.end = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+
+@contextmanager
+def stage(name: str):
+    '''
+    Track a pipeline stage: call add() on the yielded tracker for every item
+    (frame, file, image) processed. On exit the item count, time spent and
+    items/sec of the stage are recorded.
+    '''
+    tracker = StageTracker(name)
+    try:
+        yield tracker
+    finally:
+        tracker.stop()
+        record_stage(name, tracker.items, tracker.elapsed)
+
+
+def record_stage(name: str, items: int, seconds: float):
+    '''
+    Record a finished run of a pipeline stage: totals of items and seconds,
+    and the resulting average items/sec over all runs of the stage.
+    '''
+    with _lock:
+        items_metric, key = _series("pipeline_stage_items_total", "counter", {"stage": name},
+                                    "Items processed per pipeline stage")
+        seconds_metric, _ = _series("pipeline_stage_seconds_total", "counter", {"stage": name},
+                                    "Seconds spent per pipeline stage")
+        rate_metric, _ = _series("pipeline_stage_items_per_second", "gauge", {"stage": name},
+                                 "Average throughput per pipeline stage")
+        total_items = items_metric["series"][key] = items_metric["series"].get(key, 0) + items
+        total_seconds = seconds_metric["series"][key] = seconds_metric["series"].get(key, 0) + seconds
+        rate_metric["series"][key] = total_items / total_seconds if total_seconds > 0 else 0.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(**const_labels) -> str:
+    '''
+    Return all metrics in the Prometheus text exposition format (version 0.0.4).
+    const_labels (e.g. pid) are added to every series.
+    '''
+    const = sorted((k, str(v)) for k, v in const_labels.items())
+    lines = []
+    with _lock:
+        for name in sorted(_metrics):
+            metric = _metrics[name]
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in metric["series"].items():
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(key, const)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric["buckets"], value["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, const + [('le', repr(float(bound)))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, const + [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(key, const)} {value['sum']}")
+                lines.append(f"{name}_count{_format_labels(key, const)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    '''
+    Return all metrics as a JSON-serializable dict: name -> {type, series: [{labels, value}]}.
+    Histogram values are {count, sum, buckets: {upper bound: count}}.
+    '''
+    result = {}
+    with _lock:
+        for name, metric in _metrics.items():
+            series = []
+            for key, value in metric["series"].items():
+                if metric["type"] == "histogram":
+                    value = {
+                        "count": value["count"],
+                        "sum": value["sum"],
+                        "buckets": {str(bound): count for bound, count in zip(metric["buckets"], value["counts"])},
+                    }
+                series.append({"labels": dict(key), "value": value})
+            result[name] = {"type": metric["type"], "series": series}
+    return result
+
+
+def write_report(path: str, **extra):
+    '''
+    Write a JSON run report with all metrics recorded by this process, plus any
+    extra fields (e.g. the script name or its arguments).
+    '''
+    report = {"started": _started, "finished": time.time(), **extra, "metrics": snapshot()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def route_template(scope) -> str:
+    '''
+    Label for the route that served a request: its full template, e.g.
+    /videos/{video_id}/timeline, so label cardinality stays bounded.
+    The matched route (stored in the scope by the router) only knows its path
+    below the include_router prefix, so the prefix is recovered from the request
+    path by rendering the route's own part with the request's path parameters.
+    '''
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    params = scope.get("path_params") or {}
+    convertors = getattr(route, "param_convertors", {})
+    try:
+        suffix = path_format.format(**{
+            name: convertors[name].to_string(value) if name in convertors else value
+            for name, value in params.items()
+        })
+    except (KeyError, ValueError, AssertionError):
+        return path_format
+    path = scope.get("path", "")
+    if not path.endswith(suffix):
+        return path_format
+    return path[:len(path) - len(suffix)] + path_format or "/"
+
+
+class MetricsMiddleware:
+    '''
+    ASGI middleware recording, per route template, request counts and latency,
+    response bytes and the number of requests in flight.
+    '''
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = {"status": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        add_gauge("http_requests_in_flight", 1, "Requests currently being served")
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            add_gauge("http_requests_in_flight", -1, "Requests currently being served")
+            route_path = route_template(scope)
+            method = scope.get("method", "")
+            observe("http_request_duration_seconds", elapsed, "Request latency", method=method, route=route_path)
+            increment("http_requests_total", 1, "Requests served", method=method, route=route_path,
+                      status=state["status"])
+            increment("http_response_bytes_total", state["bytes"], "Response body bytes sent", route=route_path)
@@ -0,0 +1,172 @@
+# patch_service.py
+# Contains the logic for applying partial updates (JSON Patch or annotation upserts/deletes) to annotation documents.
+
+import re
+import copy
+
+# RFC 6901 array index: no sign, no leading zeros
+_ARRAY_INDEX = re.compile(r"0|[1-9][0-9]*")
+
+
+def _parse_pointer(pointer: str):
+    '''
+    Split an RFC 6901 JSON pointer into unescaped reference tokens.
+    '''
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise ValueError(f"Invalid JSON pointer '{pointer}'.")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _array_index(token: str, pointer: str) -> int:
+    if not _ARRAY_INDEX.fullmatch(token):
+        raise ValueError(f"Invalid array index in '{pointer}'.")
+    return int(token)
+
+
+def _json_equal(a, b) -> bool:
+    '''
+    RFC 6902 "test" equality: same JSON type and value, so true never equals 1
+    (numbers still compare by value, 1 equals 1.0).
+    '''
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    return type(a) is type(b) and a == b
+
+
+def _resolve_parent(doc, tokens, pointer):
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            try:
+                target = target[_array_index(token, pointer)]
+            except IndexError:
+                raise ValueError(f"Path '{pointer}' does not exist.")
+        elif isinstance(target, dict) and token in target:
+            target = target[token]
+        else:
+            raise ValueError(f"Path '{pointer}' does not exist.")
+    return target, tokens[-1]
+
+
+def _get(doc, pointer):
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        return doc
+    parent, key = _resolve_parent(doc, tokens, pointer)
+    try:
+        return parent[_array_index(key, pointer)] if isinstance(parent, list) else parent[key]
+    except (IndexError, KeyError, TypeError):
+        raise ValueError(f"Path '{pointer}' does not exist.")
+
+
+def _remove(doc, pointer):
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise ValueError("Cannot remove the whole document.")
+    parent, key = _resolve_parent(doc, tokens, pointer)
+    try:
+        return parent.pop(_array_index(key, pointer)) if isinstance(parent, list) else parent.pop(key)
+    except (IndexError, KeyError, AttributeError):
+        raise ValueError(f"Path '{pointer}' does not exist.")
+
+
+def _add(doc, pointer, value, replace=False):
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise ValueError("Cannot replace the whole document with a patch.")
+    parent, key = _resolve_parent(doc, tokens, pointer)
+    if isinstance(parent, list):
+        if key == "-" and not replace:
+            parent.append(value)
+            return
+        index = _array_index(key, pointer)
+        if replace:
+            if not 0 <= index < len(parent):
+                raise ValueError(f"Path '{pointer}' does not exist.")
+            parent[index] = value
+        else:
+            if not 0 <= index <= len(parent):
+                raise ValueError(f"Path '{pointer}' does not exist.")
+            parent.insert(index, value)
+    elif isinstance(parent, dict):
+        if replace and key not in parent:
+            raise ValueError(f"Path '{pointer}' does not exist.")
+        parent[key] = value
+    else:
+        raise ValueError(f"Path '{pointer}' does not exist.")
+
+
+def apply_json_patch(doc, operations):
+    '''
+    Apply an RFC 6902 JSON Patch (add, remove, replace, move, copy, test) and
+    return the patched copy. The input document is left untouched if any
+    operation fails. Raises ValueError for invalid operations.
+    '''
+    doc = copy.deepcopy(doc)
+    for operation in operations:
+        op = operation.get("op")
+        path = operation.get("path")
+        if path is None:
+            raise ValueError(f"Patch operation {operation} has no path.")
+        if op == "add":
+            _add(doc, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(doc, path)
+        elif op == "replace":
+            _add(doc, path, copy.deepcopy(operation["value"]), replace=True)
+        elif op == "move":
+            if path.startswith(operation["from"] + "/"):
+                raise ValueError(f"Cannot move '{operation['from']}' into its own child '{path}'.")
+            _add(doc, path, _remove(doc, operation["from"]))
+        elif op == "copy":
+            _add(doc, path, copy.deepcopy(_get(doc, operation["from"])))
+        elif op == "test":
+            if not _json_equal(_get(doc, path), operation["value"]):
+                raise ValueError(f"Test failed at '{path}'.")
+        else:
+            raise ValueError(f"Unsupported patch operation '{op}'.")
+    return doc
+
+
+def apply_annotation_changes(doc, upsert=None, delete=None, set_fields=None):
+    '''
+    Apply per-annotation changes and return the updated copy:
+    - upsert: annotation objects replacing the one with the same id (or appended)
+    - delete: ids to remove; references to them in parent_id/children are cleared
+    - set_fields: top-level fields to overwrite (anything but "annotations")
+    '''
+    doc = copy.deepcopy(doc)
+    annotations = doc.setdefault("annotations", [])
+    positions = {ann["id"]: i for i, ann in enumerate(annotations)}
+
+    for ann in upsert or []:
+        if "id" not in ann:
+            raise ValueError("Upserted annotations must have an id.")
+        if ann["id"] in positions:
+            annotations[positions[ann["id"]]] = ann
+        else:
+            positions[ann["id"]] = len(annotations)
+            annotations.append(ann)
+
+    deleted = set(delete or [])
+    if deleted:
+        annotations[:] = [ann for ann in annotations if ann["id"] not in deleted]
+        for ann in annotations:
+            if ann.get("parent_id") in deleted:
+                ann["parent_id"] = None
+            if "children" in ann:
+                ann["children"] = [child for child in ann["children"] if child not in deleted]
+
+    for key, value in (set_fields or {}).items():
+        if key == "annotations":
+            raise ValueError("Use upsert/delete to change annotations.")
+        doc[key] = value
+    return doc
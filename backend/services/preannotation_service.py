@@ -0,0 +1,148 @@
+# preannotation_service.py
+# Contains the logic for filling converted frames with suggested annotations from the trained detector.
+
+import os
+import json
+import threading
+
+from ..config import (
+    ANNOTATION_JSON_INDENT,
+    CLASS_MAPPING_PATH,
+    MODEL_PATH,
+    ONNX_MODEL_PATH,
+    PREANNOTATION_CONFIDENCE,
+    PREANNOTATION_WORKERS,
+)
+from .detector_service import OnnxDetector
+from .file_service import atomic_write_json, file_lock
+from .hierarchy_service import infer_hierarchy
+from .hooks_service import annotation_written
+from .jobs_service import submit_job
+from .serialization_service import read_json
+
+SUGGESTION_COLOR = "#FFA500"
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _load_model():
+    '''
+    Lazily load the detector once per process. An exported ONNX model is preferred
+    so CPU hosts never import torch; otherwise the ultralytics import is deferred
+    so the backend starts without the training stack when pre-annotation is unused.
+    '''
+    global _model
+    with _model_lock:
+        if _model is None:
+            if os.path.isfile(ONNX_MODEL_PATH):
+                _model = OnnxDetector(ONNX_MODEL_PATH)
+            elif os.path.isfile(MODEL_PATH):
+                from ultralytics import YOLO
+                _model = YOLO(MODEL_PATH)
+            else:
+                raise FileNotFoundError(f"Detector model '{MODEL_PATH}' does not exist.")
+        return _model
+
+
+def _load_class_names(model):
+    '''
+    Map detector class ids back to component types, preferring the mapping
+    written by the YOLO conversion script over the names stored in the model.
+    '''
+    if os.path.isfile(CLASS_MAPPING_PATH):
+        with open(CLASS_MAPPING_PATH, "r", encoding="utf-8") as f:
+            class_mapping = json.load(f)
+        return {class_id: component_type for component_type, class_id in class_mapping.items()}
+    return dict(model.names)
+
+
+def _predict(model, image_path: str):
+    '''
+    Run either detector flavour and return plain (xyxy, confidence, class id) lists.
+    '''
+    if isinstance(model, OnnxDetector):
+        boxes, scores, class_ids = model.predict(image_path, conf_threshold=PREANNOTATION_CONFIDENCE)
+        return boxes.tolist(), scores.tolist(), class_ids.tolist()
+
+    results = model.predict(image_path, conf=PREANNOTATION_CONFIDENCE, verbose=False)
+    boxes = results[0].boxes
+    return boxes.xyxy.tolist(), boxes.conf.tolist(), boxes.cls.tolist()
+
+
+def detect_components(image_path: str):
+    '''
+    Run the detector on a single image and return suggested annotation objects
+    in the UI annotation format, without any hierarchy information.
+    '''
+    model = _load_model()
+    class_names = _load_class_names(model)
+    boxes, scores, class_ids = _predict(model, image_path)
+
+    annotations = []
+    for i, (xyxy, conf, cls) in enumerate(zip(boxes, scores, class_ids)):
+        x1, y1, x2, y2 = xyxy
+        component_type = class_names.get(int(cls), str(int(cls)))
+        annotations.append({
+            "id": i + 1,
+            "name": f"{component_type}_{i + 1}",
+            "parent_id": None,
+            "component_type": component_type,
+            "bounding_box": {
+                "x": max(0, int(round(x1))),
+                "y": max(0, int(round(y1))),
+                "width": max(0, int(round(x2 - x1))),
+                "height": max(0, int(round(y2 - y1))),
+            },
+            "color": SUGGESTION_COLOR,
+            "isSelected": False,
+            "hidden": False,
+            "attributes": {},
+            "children": [],
+            "isReviewed": False,
+            "confidence": round(conf, 4),
+        })
+    return annotations
+
+
+def preannotate_frame(relative_path: str, frames_root: str, datasets_root: str):
+    '''
+    Detect components on a converted frame and store them as unreviewed suggestions
+    in its annotation JSON. Frames that already have annotations are left untouched
+    so a slow job never overwrites work an annotator saved in the meantime.
+    '''
+    image_path = os.path.join(frames_root, relative_path)
+    base_name, _ = os.path.splitext(relative_path)
+    annotation_path = os.path.join(datasets_root, f"{base_name}.json")
+
+    if not os.path.isfile(image_path):
+        raise FileNotFoundError(f"Source image '{image_path}' not found.")
+
+    annotations = infer_hierarchy(detect_components(image_path))
+
+    with file_lock(annotation_path):
+        metadata = read_json(annotation_path)
+        if metadata.get("annotations"):
+            return {"path": relative_path, "suggestions": 0, "skipped": True}
+
+        metadata["annotations"] = annotations
+        metadata["isPreAnnotated"] = True
+        atomic_write_json(annotation_path, metadata, indent=ANNOTATION_JSON_INDENT)
+        annotation_written(annotation_path, metadata, datasets_root, event="frame_preannotated")
+
+    return {"path": relative_path, "suggestions": len(annotations), "skipped": False}
+
+
+def enqueue_preannotation(relative_path: str, frames_root: str, datasets_root: str) -> str:
+    '''
+    Queue pre-annotation of a converted frame on the background worker pool.
+    Returns the job id used to poll its status.
+    '''
+    return submit_job(
+        "preannotation",
+        preannotate_frame,
+        relative_path,
+        frames_root,
+        datasets_root,
+        max_workers=PREANNOTATION_WORKERS,
+    )
@@ -0,0 +1,207 @@
+# pyramid_service.py
+# Contains the logic for building DeepZoom-style multi-resolution tile pyramids of frames, cached on disk.
+
+import os
+import json
+import math
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from ..config import (
+    PYRAMID_CACHE_MAX_MB,
+    PYRAMID_CACHE_PATH,
+    PYRAMID_TILE_FORMAT,
+    PYRAMID_TILE_OVERLAP,
+    PYRAMID_TILE_SIZE,
+)
+from .file_service import file_lock
+
+INFO_FILE = "info.json"
+
+_cache_lock = threading.Lock()
+_cache_index = None  # pyramid folder name -> size in bytes, least recently used first
+_cache_bytes = 0
+
+
+def _load_cache_index(force: bool = False):
+    '''
+    Build the LRU index from the pyramids already on disk, oldest first.
+    The cache folder is shared by all worker processes; the mtime of each
+    info.json carries the recency, so a rescan (force=True) picks up the
+    other workers' pyramids.
+    Must be called with _cache_lock held.
+    '''
+    global _cache_index, _cache_bytes
+    if _cache_index is not None and not force:
+        return
+    os.makedirs(PYRAMID_CACHE_PATH, exist_ok=True)
+    pyramids = []
+    for entry in os.scandir(PYRAMID_CACHE_PATH):
+        info_path = os.path.join(entry.path, INFO_FILE)
+        if entry.is_dir() and not entry.name.endswith(".tmp"):
+            try:
+                with open(info_path, "r", encoding="utf-8") as f:
+                    info = json.load(f)
+                pyramids.append((os.stat(info_path).st_mtime, entry.name, info.get("bytes", 0)))
+            except (FileNotFoundError, ValueError):
+                # Being built or evicted by another worker
+                continue
+    _cache_index = OrderedDict((name, size) for _, name, size in sorted(pyramids))
+    _cache_bytes = sum(_cache_index.values())
+
+
+def _evict():
+    '''
+    Remove least recently used pyramids until the cache fits its size limit.
+    Must be called with _cache_lock held.
+    '''
+    global _cache_bytes
+    max_bytes = PYRAMID_CACHE_MAX_MB * 1024 * 1024
+    if _cache_bytes <= max_bytes:
+        return
+    # Other workers add to the same folder: account for their pyramids before evicting
+    _load_cache_index(force=True)
+    while _cache_bytes > max_bytes and len(_cache_index) > 1:
+        name, size = _cache_index.popitem(last=False)
+        _cache_bytes -= size
+        shutil.rmtree(os.path.join(PYRAMID_CACHE_PATH, name), ignore_errors=True)
+
+
+def _pyramid_name(file_path: str) -> str:
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _write_level_tiles(img, level_dir: str) -> int:
+    '''
+    Cut one pyramid level into overlapping tiles named {col}_{row}.{format}.
+    Returns the number of bytes written.
+    '''
+    os.makedirs(level_dir, exist_ok=True)
+    height, width = img.shape[:2]
+    written = 0
+    for row in range(math.ceil(height / PYRAMID_TILE_SIZE)):
+        for col in range(math.ceil(width / PYRAMID_TILE_SIZE)):
+            x1 = max(0, col * PYRAMID_TILE_SIZE - PYRAMID_TILE_OVERLAP)
+            y1 = max(0, row * PYRAMID_TILE_SIZE - PYRAMID_TILE_OVERLAP)
+            x2 = min(width, (col + 1) * PYRAMID_TILE_SIZE + PYRAMID_TILE_OVERLAP)
+            y2 = min(height, (row + 1) * PYRAMID_TILE_SIZE + PYRAMID_TILE_OVERLAP)
+            tile_path = os.path.join(level_dir, f"{col}_{row}.{PYRAMID_TILE_FORMAT}")
+            cv2.imwrite(tile_path, img[y1:y2, x1:x2])
+            written += os.path.getsize(tile_path)
+    return written
+
+
+def _build_pyramid(file_path: str, pyramid_dir: str):
+    '''
+    Build every level of the pyramid. Level max_level is the full-resolution frame and
+    each level below halves it (rounding up) down to a single pixel at level 0.
+    The pyramid is written to a temporary folder and renamed into place when complete.
+    '''
+    img = cv2.imread(file_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise FileNotFoundError(f"Could not load image: {file_path}")
+
+    height, width = img.shape[:2]
+    max_level = math.ceil(math.log2(max(width, height))) if max(width, height) > 1 else 0
+
+    tmp_dir = f"{pyramid_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    total_bytes = 0
+    level_img = img
+    for level in range(max_level, -1, -1):
+        total_bytes += _write_level_tiles(level_img, os.path.join(tmp_dir, str(level)))
+        h, w = level_img.shape[:2]
+        if level > 0:
+            level_img = cv2.resize(level_img, (max(1, math.ceil(w / 2)), max(1, math.ceil(h / 2))),
+                                   interpolation=cv2.INTER_AREA)
+
+    info = {
+        "width": width,
+        "height": height,
+        "tile_size": PYRAMID_TILE_SIZE,
+        "overlap": PYRAMID_TILE_OVERLAP,
+        "format": PYRAMID_TILE_FORMAT,
+        "max_level": max_level,
+        "bytes": total_bytes,
+    }
+    with open(os.path.join(tmp_dir, INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+
+    shutil.rmtree(pyramid_dir, ignore_errors=True)
+    os.replace(tmp_dir, pyramid_dir)
+    return info
+
+
+def get_pyramid(file_path: str):
+    '''
+    Return (pyramid folder, info) for a frame, building the pyramid on first request.
+    Concurrent first requests for the same frame, in any worker process, wait for a single build.
+    '''
+    global _cache_bytes
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"File '{file_path}' does not exist or is not a file.")
+
+    name = _pyramid_name(file_path)
+    pyramid_dir = os.path.join(PYRAMID_CACHE_PATH, name)
+    info_path = os.path.join(pyramid_dir, INFO_FILE)
+
+    with _cache_lock:
+        _load_cache_index()
+        cached = name in _cache_index
+
+    if cached:
+        try:
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            # Refresh the shared recency
+            os.utime(info_path)
+            with _cache_lock:
+                if name in _cache_index:
+                    _cache_index.move_to_end(name)
+            return pyramid_dir, info
+        except FileNotFoundError:
+            # Evicted (possibly by another worker) between the index lookup and the read
+            with _cache_lock:
+                if name in _cache_index:
+                    _cache_bytes -= _cache_index.pop(name)
+
+    with file_lock(pyramid_dir):
+        if os.path.isfile(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        else:
+            info = _build_pyramid(file_path, pyramid_dir)
+
+    with _cache_lock:
+        if name not in _cache_index:
+            _cache_index[name] = info["bytes"]
+            _cache_bytes += info["bytes"]
+            _evict()
+    return pyramid_dir, info
+
+
+def get_pyramid_info(file_path: str):
+    '''
+    Return the DeepZoom descriptor of a frame: size, tile size, overlap, format and levels.
+    '''
+    _, info = get_pyramid(file_path)
+    return {key: value for key, value in info.items() if key != "bytes"}
+
+
+def get_tile_path(file_path: str, level: int, col: int, row: int) -> str:
+    '''
+    Return the path of a single tile. Raises ValueError for tiles outside the pyramid.
+    '''
+    pyramid_dir, info = get_pyramid(file_path)
+    if not 0 <= level <= info["max_level"]:
+        raise ValueError(f"Invalid level {level}, expected 0 to {info['max_level']}.")
+    tile_path = os.path.join(pyramid_dir, str(level), f"{col}_{row}.{info['format']}")
+    if col < 0 or row < 0 or not os.path.isfile(tile_path):
+        raise ValueError(f"Tile {col}_{row} does not exist at level {level}.")
+    return tile_path
@@ -0,0 +1,305 @@
+# search_service.py
+# Contains the SQLite (FTS5) search index over annotations, keywords and OCR text.
+
+import os
+import time
+import logging
+import sqlite3
+import threading
+
+from ..config import ANNOTATIONS_PATH, SEARCH_INDEX_PATH
+from .jobs_service import check_cancelled, report_progress, submit_job
+from .metrics_service import increment
+from .serialization_service import read_json
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    path TEXT PRIMARY KEY,
+    name TEXT,
+    is_ready INTEGER NOT NULL DEFAULT 0,
+    is_valid INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS frame_keywords (
+    path TEXT NOT NULL,
+    keyword TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frame_keywords_keyword ON frame_keywords (keyword, path);
+CREATE INDEX IF NOT EXISTS frame_keywords_path ON frame_keywords (path);
+CREATE TABLE IF NOT EXISTS annotations (
+    id INTEGER PRIMARY KEY,
+    frame_path TEXT NOT NULL,
+    ann_id INTEGER,
+    component_type TEXT,
+    text TEXT,
+    attributes TEXT
+);
+CREATE INDEX IF NOT EXISTS annotations_frame_path ON annotations (frame_path);
+CREATE TABLE IF NOT EXISTS writes (
+    path TEXT PRIMARY KEY,
+    written REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS annotations_component_type ON annotations (component_type, frame_path);
+CREATE VIRTUAL TABLE IF NOT EXISTS annotations_fts USING fts5 (
+    component_type, text, attributes, content='annotations', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS annotations_ai AFTER INSERT ON annotations BEGIN
+    INSERT INTO annotations_fts (rowid, component_type, text, attributes)
+    VALUES (new.id, new.component_type, new.text, new.attributes);
+END;
+CREATE TRIGGER IF NOT EXISTS annotations_ad AFTER DELETE ON annotations BEGIN
+    INSERT INTO annotations_fts (annotations_fts, rowid, component_type, text, attributes)
+    VALUES ('delete', old.id, old.component_type, old.text, old.attributes);
+END;
+"""
+
+# Files parsed by rebuild_index between two short write transactions
+REBUILD_BATCH_SIZE = 200
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def _connect():
+    '''
+    Return this thread's connection to the index, creating the schema on first use.
+    '''
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(SEARCH_INDEX_PATH), exist_ok=True)
+        connection = sqlite3.connect(SEARCH_INDEX_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        _local.connection = connection
+    return connection
+
+
+def _annotation_text(ann):
+    '''
+    Split an annotation's attributes into the visible text (attributes.text)
+    and the remaining string attribute values.
+    '''
+    attributes = ann.get("attributes") or {}
+    text = attributes.get("text") if isinstance(attributes.get("text"), str) else ""
+    others = " ".join(
+        str(value) for key, value in attributes.items()
+        if key != "text" and isinstance(value, (str, int, float)) and not isinstance(value, bool)
+    )
+    return text, others
+
+
+def _delete_rows(connection, path: str):
+    connection.execute("DELETE FROM frames WHERE path = ?", (path,))
+    connection.execute("DELETE FROM frame_keywords WHERE path = ?", (path,))
+    connection.execute("DELETE FROM annotations WHERE frame_path = ?", (path,))
+
+
+def _stamp(connection, path: str):
+    # Time of the last write hook for a path, so a running rebuild keeps the newer rows
+    connection.execute("INSERT OR REPLACE INTO writes (path, written) VALUES (?, ?)", (path, time.time()))
+
+
+def _index_rows(connection, path: str, data):
+    _delete_rows(connection, path)
+
+    connection.execute(
+        "INSERT INTO frames (path, name, is_ready, is_valid) VALUES (?, ?, ?, ?)",
+        (path, data.get("name"), int(bool(data.get("isReady"))), int(bool(data.get("isValid")))),
+    )
+    connection.executemany(
+        "INSERT INTO frame_keywords (path, keyword) VALUES (?, ?)",
+        [(path, keyword.lower()) for keyword in set(data.get("keywords") or []) if isinstance(keyword, str)],
+    )
+    rows = []
+    for ann in data.get("annotations") or []:
+        text, others = _annotation_text(ann)
+        rows.append((path, ann.get("id"), ann.get("component_type"), text, others))
+    connection.executemany(
+        "INSERT INTO annotations (frame_path, ann_id, component_type, text, attributes) VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+
+
+def index_document(annotation_path: str, data, datasets_root: str = ANNOTATIONS_PATH):
+    '''
+    Replace the indexed rows of one annotation file with its current contents.
+    Indexing failures are reported but never fail the write that triggered them.
+    '''
+    path = os.path.relpath(annotation_path, datasets_root).replace(os.sep, "/")
+    try:
+        connection = _connect()
+        with _write_lock, connection:
+            _index_rows(connection, path, data)
+            _stamp(connection, path)
+    except sqlite3.Error as e:
+        increment("search_index_errors_total", 1, "Search index updates that failed", operation="update")
+        logger.warning("Search index update failed for '%s': %s", path, e)
+
+
+def remove_document(annotation_path: str, datasets_root: str = ANNOTATIONS_PATH):
+    '''
+    Drop the indexed rows of a deleted annotation file.
+    '''
+    path = os.path.relpath(annotation_path, datasets_root).replace(os.sep, "/")
+    try:
+        connection = _connect()
+        with _write_lock, connection:
+            _delete_rows(connection, path)
+            _stamp(connection, path)
+    except sqlite3.Error as e:
+        increment("search_index_errors_total", 1, "Search index updates that failed", operation="remove")
+        logger.warning("Search index removal failed for '%s': %s", path, e)
+
+
+def _written_since(connection, paths, since: float):
+    placeholders = ",".join("?" * len(paths))
+    return {path for (path,) in connection.execute(
+        f"SELECT path FROM writes WHERE written >= ? AND path IN ({placeholders})", (since, *paths))}
+
+
+def _index_batch(connection, batch, started: float) -> int:
+    '''
+    Write one batch of parsed files in a short transaction, skipping the files a
+    write hook indexed after the rebuild started (their rows are newer than the batch).
+    '''
+    if not batch:
+        return 0
+    with _write_lock, connection:
+        fresh = _written_since(connection, [path for path, _ in batch], started)
+        for path, data in batch:
+            if path not in fresh:
+                _index_rows(connection, path, data)
+    return len(batch)
+
+
+def _remove_stale(connection, seen, started: float):
+    '''
+    Drop the rows of files the rebuild did not find, unless a write hook touched them since it started.
+    '''
+    stale = [path for (path,) in connection.execute("SELECT path FROM frames") if path not in seen]
+    for i in range(0, len(stale), REBUILD_BATCH_SIZE):
+        batch = stale[i:i + REBUILD_BATCH_SIZE]
+        with _write_lock, connection:
+            fresh = _written_since(connection, batch, started)
+            for path in batch:
+                if path not in fresh:
+                    _delete_rows(connection, path)
+
+
+def rebuild_index(datasets_root: str = ANNOTATIONS_PATH, job_id: str = None):
+    '''
+    Re-create the index from every annotation JSON under datasets_root and drop
+    the rows of files that no longer exist. Files are parsed outside the write
+    lock and written REBUILD_BATCH_SIZE at a time, so saves keep being indexed
+    while the rebuild runs and are never overwritten by its older reads.
+    With a job_id, progress is reported and the rebuild stops after the current
+    batch once cancellation is requested (the index stays usable, stale rows included).
+    Returns the number of indexed files.
+    '''
+    connection = _connect()
+    started = time.time()
+    seen = set()
+    batch = []
+    count = 0
+    for dirpath, _, filenames in os.walk(datasets_root):
+        for file in filenames:
+            if not file.endswith(".json"):
+                continue
+            file_path = os.path.join(dirpath, file)
+            try:
+                data = read_json(file_path)
+            except (OSError, ValueError) as e:
+                increment("search_index_errors_total", 1, "Search index updates that failed", operation="read")
+                logger.warning("Skipping '%s' in the search index rebuild: %s", file_path, e)
+                continue
+            path = os.path.relpath(file_path, datasets_root).replace(os.sep, "/")
+            seen.add(path)
+            batch.append((path, data))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                count += _index_batch(connection, batch, started)
+                batch = []
+                if job_id is not None:
+                    report_progress(job_id, indexed=count)
+                    check_cancelled(job_id)
+    count += _index_batch(connection, batch, started)
+    _remove_stale(connection, seen, started)
+    return count
+
+
+def _rebuild_index_job(job_id: str, datasets_root: str):
+    return rebuild_index(datasets_root, job_id)
+
+
+def enqueue_index_rebuild(datasets_root: str = ANNOTATIONS_PATH) -> str:
+    '''
+    Queue a cancellable rebuild of the index and return its job id.
+    '''
+    return submit_job("search-rebuild", _rebuild_index_job, datasets_root, pass_job_id=True)
+
+
+def _phrase(value: str) -> str:
+    '''
+    Quote user input as an FTS5 phrase so it never parses as query syntax.
+    '''
+    return '"' + value.replace('"', '""') + '"'
+
+
+def search(component_type: str = None, text: str = None, keyword: str = None,
+           is_ready: bool = None, is_valid: bool = None, limit: int = 100, offset: int = 0):
+    '''
+    Find annotation files matching all given criteria:
+    - component_type: exact component type of at least one annotation
+    - text: phrase contained in that annotation's text (full-text, case-insensitive)
+    - keyword: exact (case-insensitive) frame keyword
+    - is_ready / is_valid: frame flags
+    Returns a list of {"path", "annotation_ids"} sorted by path.
+    '''
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer.")
+
+    connection = _connect()
+    params = []
+    frame_filters = []
+    if keyword:
+        frame_filters.append("{col} IN (SELECT path FROM frame_keywords WHERE keyword = ?)")
+        params.append(keyword.lower())
+    if is_ready is not None:
+        frame_filters.append("{col} IN (SELECT path FROM frames WHERE is_ready = ?)")
+        params.append(int(is_ready))
+    if is_valid is not None:
+        frame_filters.append("{col} IN (SELECT path FROM frames WHERE is_valid = ?)")
+        params.append(int(is_valid))
+
+    if component_type or text:
+        conditions = [f.format(col="a.frame_path") for f in frame_filters]
+        join = ""
+        if text:
+            join = "JOIN annotations_fts ON annotations_fts.rowid = a.id"
+            conditions.append("annotations_fts MATCH ?")
+            params.append(f"text : {_phrase(text)}")
+        if component_type:
+            conditions.append("a.component_type = ?")
+            params.append(component_type)
+        sql = (f"SELECT a.frame_path, group_concat(a.ann_id) FROM annotations a {join} "
+               f"WHERE {' AND '.join(conditions)} GROUP BY a.frame_path ORDER BY a.frame_path LIMIT ? OFFSET ?")
+    else:
+        conditions = [f.format(col="f.path") for f in frame_filters] or ["1"]
+        sql = (f"SELECT f.path, NULL FROM frames f WHERE {' AND '.join(conditions)} "
+               f"ORDER BY f.path LIMIT ? OFFSET ?")
+    params.extend([limit, offset])
+
+    try:
+        rows = connection.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        raise ValueError(f"Invalid search: {e}")
+    return [
+        {"path": path, "annotation_ids": [int(i) for i in ids.split(",")] if ids else []}
+        for path, ids in rows
+    ]
+
+
+if __name__ == "__main__":
+    # Run with:  python -m backend.services.search_service
+    print(f"Indexed {rebuild_index()} annotation files into {SEARCH_INDEX_PATH}")
@@ -0,0 +1,45 @@
+# serialization_service.py
+# Contains the single JSON encoder/decoder of the backend, backed by orjson when it is installed.
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(data, indent: int = None) -> bytes:
+    '''
+    Encode data as UTF-8 JSON: compact by default, or pretty-printed with indent.
+    orjson handles compact and 2-space output; other indents (and values orjson
+    rejects, like integers beyond 64 bits) go through the stdlib encoder.
+    '''
+    if orjson is not None and indent in (None, 2):
+        try:
+            return orjson.dumps(data, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+        except TypeError:
+            pass
+    separators = (",", ":") if indent is None else None
+    return json.dumps(data, indent=indent, separators=separators, ensure_ascii=False).encode("utf-8")
+
+
+def loads(payload):
+    '''
+    Decode JSON from bytes or str.
+    '''
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def read_json(file_path: str):
+    '''
+    Read and decode a JSON file.
+    '''
+    with open(file_path, "rb") as f:
+        return loads(f.read())
+
@@ -0,0 +1,314 @@
+# stats_service.py
+# Contains the incrementally maintained dataset statistics (counters and box-size histograms).
+
+import os
+import json
+import math
+import time
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from ..config import ANNOTATIONS_PATH, STATS_PATH
+from .jobs_service import check_cancelled, report_progress, submit_job
+from .metrics_service import increment
+from .serialization_service import read_json
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_stats (
+    path TEXT PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS writes (
+    path TEXT PRIMARY KEY,
+    written REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def _connect():
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(STATS_PATH), exist_ok=True)
+        connection = sqlite3.connect(STATS_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        _local.connection = connection
+    return connection
+
+
+def _size_bucket(bbox) -> int:
+    '''
+    Power-of-two bucket of a box's size (square root of its area): bucket k holds sizes in [2^k, 2^(k+1)).
+    '''
+    try:
+        area = float(bbox["width"]) * float(bbox["height"])
+    except (KeyError, TypeError, ValueError):
+        return -1
+    return int(math.log2(math.sqrt(area))) if area >= 1 else 0
+
+
+def summarize_document(data) -> Counter:
+    '''
+    Return the counters one annotation file contributes to the aggregates.
+    '''
+    summary = Counter({"frames": 1})
+    summary["frames.ready"] = int(bool(data.get("isReady")))
+    summary["frames.valid"] = int(bool(data.get("isValid")))
+
+    classes = set()
+    for ann in data.get("annotations") or []:
+        component_type = str(ann.get("component_type"))
+        classes.add(component_type)
+        summary["boxes"] += 1
+        summary[f"class.{component_type}.count"] += 1
+        bucket = _size_bucket(ann.get("bounding_box") or {})
+        if bucket >= 0:
+            summary[f"class.{component_type}.size.{bucket}"] += 1
+    for component_type in classes:
+        summary[f"class.{component_type}.frames"] += 1
+    return summary
+
+
+def _apply_delta(connection, delta):
+    connection.executemany(
+        "INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+        [(key, value) for key, value in delta.items() if value],
+    )
+    connection.execute("DELETE FROM stats WHERE value = 0")
+
+
+def _relative(annotation_path: str, datasets_root: str) -> str:
+    return os.path.relpath(annotation_path, datasets_root).replace(os.sep, "/")
+
+
+def _set_summary(connection, path: str, summary) -> Counter:
+    '''
+    Store a file's summary and return the change of its contribution to the aggregates.
+    '''
+    row = connection.execute("SELECT summary FROM file_stats WHERE path = ?", (path,)).fetchone()
+    delta = Counter(summary)
+    if row is not None:
+        delta.subtract(json.loads(row[0]))
+    connection.execute("INSERT OR REPLACE INTO file_stats (path, summary) VALUES (?, ?)", (path, json.dumps(summary)))
+    return delta
+
+
+def _drop_summary(connection, path: str) -> Counter:
+    row = connection.execute("SELECT summary FROM file_stats WHERE path = ?", (path,)).fetchone()
+    delta = Counter()
+    if row is not None:
+        delta.subtract(json.loads(row[0]))
+        connection.execute("DELETE FROM file_stats WHERE path = ?", (path,))
+    return delta
+
+
+def _stamp(connection, path: str):
+    # Time of the last write hook for a path, so a running rebuild keeps the newer summary
+    connection.execute("INSERT OR REPLACE INTO writes (path, written) VALUES (?, ?)", (path, time.time()))
+
+
+def update_document_stats(annotation_path: str, data, datasets_root: str = ANNOTATIONS_PATH):
+    '''
+    Replace one file's contribution to the aggregates: subtract the summary stored
+    for its previous version and add the new one, in a single transaction.
+    Failures are reported but never fail the write that triggered them.
+    '''
+    path = _relative(annotation_path, datasets_root)
+    summary = summarize_document(data)
+    try:
+        connection = _connect()
+        with _write_lock, connection:
+            # Take the write lock before reading so concurrent workers cannot lose an update
+            connection.execute("BEGIN IMMEDIATE")
+            _apply_delta(connection, _set_summary(connection, path, summary))
+            _stamp(connection, path)
+    except sqlite3.Error as e:
+        increment("stats_errors_total", 1, "Statistics updates that failed", operation="update")
+        logger.warning("Stats update failed for '%s': %s", path, e)
+
+
+def remove_document_stats(annotation_path: str, datasets_root: str = ANNOTATIONS_PATH):
+    '''
+    Subtract a deleted annotation file's contribution from the aggregates.
+    '''
+    path = _relative(annotation_path, datasets_root)
+    try:
+        connection = _connect()
+        with _write_lock, connection:
+            connection.execute("BEGIN IMMEDIATE")
+            _apply_delta(connection, _drop_summary(connection, path))
+            _stamp(connection, path)
+    except sqlite3.Error as e:
+        increment("stats_errors_total", 1, "Statistics updates that failed", operation="remove")
+        logger.warning("Stats removal failed for '%s': %s", path, e)
+
+
+def get_stats():
+    '''
+    Return the current aggregates as nested JSON. Only the small aggregate table is read,
+    so the cost does not depend on the number of annotation files.
+    '''
+    rows = _connect().execute("SELECT key, value FROM stats").fetchall()
+    result = {"frames": {"total": 0, "ready": 0, "valid": 0}, "boxes": 0, "classes": {}}
+    for key, value in rows:
+        if key == "frames":
+            result["frames"]["total"] = value
+        elif key in ("frames.ready", "frames.valid"):
+            result["frames"][key.split(".")[1]] = value
+        elif key == "boxes":
+            result["boxes"] = value
+        elif key.startswith("class."):
+            # class.<component_type>.<metric>[.<bucket>]; component types may contain dots
+            parts = key[len("class."):]
+            if ".size." in parts:
+                component_type, bucket = parts.rsplit(".size.", 1)
+                stats = result["classes"].setdefault(component_type, {"count": 0, "frames": 0, "size_histogram": {}})
+                low = 2 ** int(bucket)
+                stats["size_histogram"][f"{low}-{low * 2}"] = value
+            else:
+                component_type, metric = parts.rsplit(".", 1)
+                stats = result["classes"].setdefault(component_type, {"count": 0, "frames": 0, "size_histogram": {}})
+                stats[metric] = value
+    return result
+
+
+def _summarize_files(file_paths):
+    '''
+    Worker: summarize a chunk of files. Returns [(file_path, summary)] for readable files.
+    '''
+    summaries = []
+    for file_path in file_paths:
+        try:
+            summaries.append((file_path, summarize_document(read_json(file_path))))
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping '%s' in the statistics rebuild: %s", file_path, e)
+    return summaries
+
+
+def _written_since(connection, paths, since: float):
+    placeholders = ",".join("?" * len(paths))
+    return {path for (path,) in connection.execute(
+        f"SELECT path FROM writes WHERE written >= ? AND path IN ({placeholders})", (since, *paths))}
+
+
+def _merge_summaries(connection, summaries, started: float):
+    '''
+    Merge freshly computed summaries into the store in one short transaction,
+    skipping the files a write hook updated after the rebuild started.
+    '''
+    if not summaries:
+        return
+    with _write_lock, connection:
+        connection.execute("BEGIN IMMEDIATE")
+        fresh = _written_since(connection, [path for path, _ in summaries], started)
+        delta = Counter()
+        for path, summary in summaries:
+            if path not in fresh:
+                delta.update(_set_summary(connection, path, summary))
+        _apply_delta(connection, delta)
+
+
+def _remove_stale(connection, seen, started: float, batch_size: int):
+    stale = [path for (path,) in connection.execute("SELECT path FROM file_stats") if path not in seen]
+    for i in range(0, len(stale), batch_size):
+        batch = stale[i:i + batch_size]
+        with _write_lock, connection:
+            connection.execute("BEGIN IMMEDIATE")
+            fresh = _written_since(connection, batch, started)
+            delta = Counter()
+            for path in batch:
+                if path not in fresh:
+                    delta.update(_drop_summary(connection, path))
+            _apply_delta(connection, delta)
+
+
+def _correct_aggregates(connection):
+    '''
+    Make the aggregates equal the sum of the stored summaries. The difference is
+    read from one snapshot without the write lock; every write changes both sides
+    alike, so it still holds when applied.
+    '''
+    totals = Counter()
+    with connection:
+        connection.execute("BEGIN")
+        for (summary,) in connection.execute("SELECT summary FROM file_stats"):
+            totals.update(json.loads(summary))
+        current = dict(connection.execute("SELECT key, value FROM stats"))
+    totals.subtract(current)
+    with _write_lock, connection:
+        connection.execute("BEGIN IMMEDIATE")
+        _apply_delta(connection, totals)
+
+
+def rebuild_stats(datasets_root: str = ANNOTATIONS_PATH, workers: int = None, chunk_size: int = 500,
+                  job_id: str = None):
+    '''
+    Recompute every file's summary in parallel processes and merge them chunk by
+    chunk, so saves during the rebuild are neither blocked nor overwritten with an
+    older summary. Files that no longer exist are dropped and the aggregates are
+    then reconciled with the summaries. With a job_id, progress is reported and the
+    rebuild stops after the current chunk once cancellation is requested.
+    Returns the number of summarized files.
+    '''
+    connection = _connect()
+    started = time.time()
+    file_paths = [
+        os.path.join(dirpath, file)
+        for dirpath, _, filenames in os.walk(datasets_root)
+        for file in filenames if file.endswith(".json")
+    ]
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+
+    seen = set()
+    # Spawned, not forked: the server process runs other threads that a fork would copy mid-operation
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+        futures = [executor.submit(_summarize_files, chunk) for chunk in chunks]
+        try:
+            for chunk, future in zip(chunks, futures):
+                summaries = [(_relative(file_path, datasets_root), summary) for file_path, summary in future.result()]
+                # Counted here: the worker processes have their own metrics registries
+                if len(summaries) < len(chunk):
+                    increment("stats_errors_total", len(chunk) - len(summaries), "Statistics updates that failed",
+                              operation="read")
+                seen.update(path for path, _ in summaries)
+                _merge_summaries(connection, summaries, started)
+                if job_id is not None:
+                    report_progress(job_id, summarized=len(seen), total=len(file_paths))
+                    check_cancelled(job_id)
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    _remove_stale(connection, seen, started, chunk_size)
+    _correct_aggregates(connection)
+    return len(seen)
+
+
+def _rebuild_stats_job(job_id: str, datasets_root: str):
+    return rebuild_stats(datasets_root, job_id=job_id)
+
+
+def enqueue_stats_rebuild(datasets_root: str = ANNOTATIONS_PATH) -> str:
+    '''
+    Queue a cancellable rebuild of the statistics and return its job id.
+    '''
+    return submit_job("stats-rebuild", _rebuild_stats_job, datasets_root, pass_job_id=True)
+
+
+if __name__ == "__main__":
+    # Run with:  python -m backend.services.stats_service
+    print(f"Summarized {rebuild_stats()} annotation files into {STATS_PATH}")
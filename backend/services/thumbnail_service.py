@@ -0,0 +1,158 @@
+# thumbnail_service.py
+# Contains the logic for generating downscaled frame previews and caching them on disk.
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import FileResponse, Response
+
+from ..config import (
+    THUMBNAIL_CACHE_MAX_MB,
+    THUMBNAIL_CACHE_PATH,
+    THUMBNAIL_SIZES,
+    THUMBNAIL_WORKERS,
+)
+from .caching_service import IMMUTABLE_CACHE_CONTROL, is_not_modified, stat_etag
+from .frames_service import rescale_image
+from .jobs_service import get_executor
+
+THUMBNAIL_EXT = ".jpg"
+
+_cache_lock = threading.Lock()
+_cache_index = None  # file name -> size in bytes, least recently used first
+_cache_bytes = 0
+_in_flight = {}
+
+
+def _load_cache_index(force: bool = False):
+    '''
+    Build the LRU index from the files already in the cache folder, oldest first.
+    The cache folder is shared by all worker processes; file mtimes carry the
+    recency, so a rescan (force=True) picks up the other workers' thumbnails.
+    Must be called with _cache_lock held.
+    '''
+    global _cache_index, _cache_bytes
+    if _cache_index is not None and not force:
+        return
+    os.makedirs(THUMBNAIL_CACHE_PATH, exist_ok=True)
+    files = []
+    for entry in os.scandir(THUMBNAIL_CACHE_PATH):
+        # Skip temporary files of generations still in progress
+        if entry.is_file() and entry.name.endswith(THUMBNAIL_EXT) and ".tmp" not in entry.name:
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+    _cache_index = OrderedDict((name, size) for _, name, size in sorted(files))
+    _cache_bytes = sum(_cache_index.values())
+
+
+def _evict():
+    '''
+    Remove least recently used thumbnails until the cache fits its size limit.
+    Must be called with _cache_lock held.
+    '''
+    global _cache_bytes
+    max_bytes = THUMBNAIL_CACHE_MAX_MB * 1024 * 1024
+    if _cache_bytes <= max_bytes:
+        return
+    # Other workers add to the same folder: account for their files before evicting
+    _load_cache_index(force=True)
+    while _cache_bytes > max_bytes and len(_cache_index) > 1:
+        name, size = _cache_index.popitem(last=False)
+        _cache_bytes -= size
+        try:
+            os.remove(os.path.join(THUMBNAIL_CACHE_PATH, name))
+        except FileNotFoundError:
+            pass
+
+
+def _cache_name(file_path: str, size: str) -> str:
+    '''
+    Cache file name for a source image. The key covers path, mtime and file size,
+    so an overwritten frame never serves a stale thumbnail.
+    '''
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}|{size}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest() + THUMBNAIL_EXT
+
+
+def _generate(file_path: str, size: str, name: str) -> str:
+    global _cache_bytes
+    cache_path = os.path.join(THUMBNAIL_CACHE_PATH, name)
+    tmp_path = os.path.join(THUMBNAIL_CACHE_PATH, f"{name}.{os.getpid()}.{threading.get_ident()}.tmp{THUMBNAIL_EXT}")
+    rescale_image(file_path, tmp_path, max_dimension=THUMBNAIL_SIZES[size])
+    os.replace(tmp_path, cache_path)
+
+    with _cache_lock:
+        if name not in _cache_index:
+            _cache_index[name] = os.path.getsize(cache_path)
+            _cache_bytes += _cache_index[name]
+            _evict()
+    return cache_path
+
+
+def get_thumbnail_path(file_path: str, size: str, wait: bool = True):
+    '''
+    Return the cached thumbnail of an image, generating it on the background pool on a miss.
+    Concurrent requests for the same thumbnail share a single generation.
+    With wait=False the generation is only queued and None is returned on a miss.
+    '''
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Invalid size '{size}', expected one of {', '.join(THUMBNAIL_SIZES)}.")
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"File '{file_path}' does not exist or is not a file.")
+
+    global _cache_bytes
+    name = _cache_name(file_path, size)
+    with _cache_lock:
+        _load_cache_index()
+        if name in _cache_index:
+            cache_path = os.path.join(THUMBNAIL_CACHE_PATH, name)
+            try:
+                # Refresh the shared recency; fails if another worker evicted the file
+                os.utime(cache_path)
+                _cache_index.move_to_end(name)
+                return cache_path
+            except FileNotFoundError:
+                _cache_bytes -= _cache_index.pop(name)
+        future = _in_flight.get(name)
+        if future is None:
+            future = get_executor("thumbnails", THUMBNAIL_WORKERS).submit(_generate, file_path, size, name)
+            _in_flight[name] = future
+            future.add_done_callback(lambda _: _in_flight.pop(name, None))
+
+    if not wait:
+        return None
+    return future.result()
+
+
+def get_thumbnail_contents(file_path: str, size: str, request_headers=None):
+    '''
+    Serve the thumbnail of an image as a JPEG response with long-lived cache headers.
+    The ETag comes from the source frame, so a cached preview revalidates without
+    generating anything.
+    '''
+    if request_headers is not None and os.path.isfile(file_path):
+        stat = os.stat(file_path)
+        etag = stat_etag(stat)
+        if is_not_modified(request_headers, etag, stat.st_mtime):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+    thumbnail_path = get_thumbnail_path(file_path, size)
+    return FileResponse(
+        path=thumbnail_path,
+        media_type="image/jpeg",
+        headers={"ETag": stat_etag(os.stat(file_path)), "Cache-Control": IMMUTABLE_CACHE_CONTROL},
+    )
+
+
+def warm_thumbnails(file_paths, size: str) -> int:
+    '''
+    Queue thumbnail generation for many images without waiting. Returns the number queued.
+    '''
+    queued = 0
+    for file_path in file_paths:
+        if get_thumbnail_path(file_path, size, wait=False) is None:
+            queued += 1
+    return queued
@@ -0,0 +1,78 @@
+# tiling_service.py
+# Contains the logic for slicing large frames into overlapping tiles and merging tile detections back.
+
+import numpy as np
+
+from .detector_service import non_max_suppression
+
+
+def compute_tiles(width: int, height: int, tile_size: int, overlap: float = 0.2):
+    '''
+    Return (x, y, w, h) windows covering a width x height frame with tiles of
+    tile_size pixels overlapping by the given fraction. The last row/column is
+    shifted back inside the frame instead of being padded, and frames smaller
+    than a tile produce a single window.
+    '''
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(tile_size, width), min(tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def slice_boxes(boxes, tile, min_visibility: float = 0.5):
+    '''
+    Clip xyxy boxes (frame pixels, shape (n, 4)) to a tile and shift them into
+    tile coordinates. Boxes keeping less than min_visibility of their area are dropped.
+    Returns the tile-space boxes and the indices of the source boxes that were kept.
+    '''
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    x, y, w, h = tile
+
+    clipped = boxes.copy()
+    clipped[:, [0, 2]] = clipped[:, [0, 2]].clip(x, x + w)
+    clipped[:, [1, 3]] = clipped[:, [1, 3]].clip(y, y + h)
+
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    visible = (clipped[:, 2] - clipped[:, 0]) * (clipped[:, 3] - clipped[:, 1])
+    keep = np.nonzero((area > 0) & (visible >= min_visibility * area))[0]
+
+    clipped = clipped[keep]
+    clipped[:, [0, 2]] -= x
+    clipped[:, [1, 3]] -= y
+    return clipped, keep
+
+
+def merge_tile_detections(tile_results, iou_threshold: float = 0.5):
+    '''
+    Merge per-tile predictions into frame-level detections.
+    tile_results is a list of (tile, boxes, scores, class_ids) with boxes in tile
+    coordinates; duplicates from overlapping tiles are removed with class-aware NMS.
+    '''
+    all_boxes, all_scores, all_classes = [], [], []
+    for (x, y, _, _), boxes, scores, class_ids in tile_results:
+        if len(boxes) == 0:
+            continue
+        all_boxes.append(np.asarray(boxes, dtype=np.float32) + np.array([x, y, x, y], dtype=np.float32))
+        all_scores.append(np.asarray(scores, dtype=np.float32))
+        all_classes.append(np.asarray(class_ids, dtype=np.int64))
+
+    if not all_boxes:
+        return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32), np.empty((0,), dtype=np.int64)
+
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
+    class_ids = np.concatenate(all_classes)
+
+    class_offsets = class_ids[:, np.newaxis] * float(boxes.max() + 1)
+    keep = non_max_suppression(boxes + class_offsets, scores, iou_threshold)
+    return boxes[keep], scores[keep], class_ids[keep]
@@ -0,0 +1,240 @@
+# timeline_service.py
+# Contains the per-video segment table (times, frame indices, diffs, annotation status) and its thumbnail sprite sheets.
+
+import os
+import glob
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from ..config import (
+    ANNOTATIONS_PATH,
+    FRAMES_PATH,
+    TIMELINE_CACHE_PATH,
+    TIMELINE_SEGMENT_CACHE_SIZE,
+    TIMELINE_SPRITE_COLUMNS,
+    TIMELINE_SPRITE_TILE_WIDTH,
+    TIMELINE_SPRITE_TILES,
+)
+from .datasets_service import get_annotation_status
+from .file_service import atomic_write_bytes, atomic_write_json, file_lock
+from .metrics_service import timer
+from .serialization_service import read_json
+
+STATUS_CONVERTED = 1
+STATUS_READY = 2
+STATUS_VALID = 4
+
+SPRITE_EXT = ".jpg"
+SPRITE_QUALITY = 80
+
+_segments = OrderedDict()  # video id -> (frames signature, segment columns), least recently used first
+_segments_lock = threading.Lock()
+
+
+def _video_dirs(video_id: str):
+    video_id = os.path.normpath(video_id or "").strip(os.sep)
+    if not video_id or video_id == "." or video_id.startswith(".."):
+        raise ValueError(f"Invalid video id '{video_id}'.")
+    frames_dir = os.path.join(FRAMES_PATH, video_id)
+    if not os.path.isdir(frames_dir):
+        raise FileNotFoundError(f"Video folder '{frames_dir}' does not exist.")
+    return video_id, frames_dir, os.path.join(ANNOTATIONS_PATH, video_id)
+
+
+def _frames_signature(frames_dir: str):
+    '''
+    Identify the extraction state of a video folder: the folder mtime plus the
+    count and newest mtime of its segment JSONs (rewritten in place by re-extraction).
+    '''
+    newest, count = 0, 0
+    for entry in os.scandir(frames_dir):
+        if entry.is_file() and entry.name.endswith(".json"):
+            count += 1
+            newest = max(newest, entry.stat().st_mtime_ns)
+    return f"{os.stat(frames_dir).st_mtime_ns:x}-{newest:x}-{count}"
+
+
+def _annotations_signature(annotations_dir: str):
+    # Annotation saves are atomic renames, which always touch the folder mtime
+    try:
+        return f"{os.stat(annotations_dir).st_mtime_ns:x}"
+    except FileNotFoundError:
+        return "0"
+
+
+def _read_segments(frames_dir: str):
+    '''
+    Parse the segment JSONs written by extract_frames into columns, ordered by start frame.
+    '''
+    rows = []
+    for entry in os.scandir(frames_dir):
+        if not (entry.is_file() and entry.name.endswith(".json")):
+            continue
+        try:
+            meta = read_json(entry.path)
+        except (OSError, ValueError):
+            continue
+        name = meta.get("name") or os.path.splitext(entry.name)[0] + ".png"
+        rows.append((
+            int(meta.get("start_frame_idx", -1)), name,
+            int(meta.get("end_frame_idx", -1)),
+            float(meta.get("start_frame_sec", 0.0)), float(meta.get("end_frame_sec", 0.0)),
+            float(meta.get("mean_diff", 0.0)),
+            int(meta.get("width", 0)), int(meta.get("height", 0)),
+        ))
+    rows.sort()
+    return {
+        "frames": [row[1] for row in rows],
+        "start_frame_idx": [row[0] for row in rows],
+        "end_frame_idx": [row[2] for row in rows],
+        "start_sec": [row[3] for row in rows],
+        "end_sec": [row[4] for row in rows],
+        "mean_diff": [row[5] for row in rows],
+        "width": max((row[6] for row in rows), default=0),
+        "height": max((row[7] for row in rows), default=0),
+    }
+
+
+def _get_segments(video_id: str, frames_dir: str):
+    '''
+    Return (frames signature, segment columns) of a video, parsed once per extraction state.
+    '''
+    signature = _frames_signature(frames_dir)
+    with _segments_lock:
+        cached = _segments.get(video_id)
+        if cached is not None and cached[0] == signature:
+            _segments.move_to_end(video_id)
+            return cached
+    segments = (signature, _read_segments(frames_dir))
+    with _segments_lock:
+        _segments[video_id] = segments
+        _segments.move_to_end(video_id)
+        while len(_segments) > TIMELINE_SEGMENT_CACHE_SIZE:
+            _segments.popitem(last=False)
+    return segments
+
+
+def _annotation_status(annotations_dir: str, frames):
+    '''
+    Status flags of every segment frame from its annotation JSON (parsed once per file mtime).
+    '''
+    existing = {}
+    if os.path.isdir(annotations_dir):
+        for entry in os.scandir(annotations_dir):
+            if entry.is_file() and entry.name.endswith(".json"):
+                existing[entry.name] = entry
+    status = []
+    for name in frames:
+        entry = existing.get(os.path.splitext(name)[0] + ".json")
+        if entry is None:
+            status.append(0)
+            continue
+        is_ready, is_valid = get_annotation_status(entry.path, entry.stat().st_mtime)
+        status.append(STATUS_CONVERTED | (STATUS_READY if is_ready else 0) | (STATUS_VALID if is_valid else 0))
+    return status
+
+
+def _tile_size(width: int, height: int):
+    tile_width = TIMELINE_SPRITE_TILE_WIDTH
+    aspect = height / width if width and height else 9 / 16
+    return tile_width, max(1, round(tile_width * aspect))
+
+
+def _remove_stale(cache_dir: str, pattern: str, keep_prefix: str):
+    for path in glob.glob(os.path.join(cache_dir, pattern)):
+        if not os.path.basename(path).startswith(keep_prefix):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def get_timeline_path(video_id: str) -> str:
+    '''
+    Return the path of the cached timeline JSON of a video, rebuilding it when
+    the video folder or its annotation folder changed since it was written.
+    The file holds one array per column, so a whole recording is one response:
+    frames, start/end frame indices, start/end seconds, mean_diff and status
+    (bit flags: 1 converted, 2 ready, 4 valid), plus the sprite sheet layout.
+    '''
+    video_id, frames_dir, annotations_dir = _video_dirs(video_id)
+    frames_signature, segments = _get_segments(video_id, frames_dir)
+    signature = f"{frames_signature}-{_annotations_signature(annotations_dir)}"
+    cache_dir = os.path.join(TIMELINE_CACHE_PATH, video_id)
+    timeline_path = os.path.join(cache_dir, f"timeline-{signature}.json")
+    if os.path.isfile(timeline_path):
+        return timeline_path
+
+    with timer("timeline_build_seconds", "Time to build the timeline table of a video"), file_lock(timeline_path):
+        if os.path.isfile(timeline_path):
+            return timeline_path
+        tile_width, tile_height = _tile_size(segments["width"], segments["height"])
+        count = len(segments["frames"])
+        timeline = {
+            "video": video_id.replace(os.sep, "/"),
+            "count": count,
+            "width": segments["width"],
+            "height": segments["height"],
+            **{key: segments[key] for key in ("frames", "start_frame_idx", "end_frame_idx",
+                                              "start_sec", "end_sec", "mean_diff")},
+            "status": _annotation_status(annotations_dir, segments["frames"]),
+            "status_flags": {"converted": STATUS_CONVERTED, "ready": STATUS_READY, "valid": STATUS_VALID},
+            "sprite": {
+                "tile_width": tile_width,
+                "tile_height": tile_height,
+                "columns": TIMELINE_SPRITE_COLUMNS,
+                "tiles_per_sheet": TIMELINE_SPRITE_TILES,
+                "sheets": -(-count // TIMELINE_SPRITE_TILES),
+            },
+        }
+        atomic_write_json(timeline_path, timeline, indent=None)
+    _remove_stale(cache_dir, "timeline-*.json", f"timeline-{signature}.")
+    return timeline_path
+
+
+def get_sprite_path(video_id: str, sheet: int) -> str:
+    '''
+    Return the path of one sprite sheet of a video: up to TIMELINE_SPRITE_TILES
+    tiny thumbnails in timeline order, TIMELINE_SPRITE_COLUMNS per row and
+    letterboxed into equal tiles. Segment i is tile i % tiles_per_sheet of sheet
+    i // tiles_per_sheet. Sheets are rebuilt when the video folder changes.
+    '''
+    video_id, frames_dir, _ = _video_dirs(video_id)
+    frames_signature, segments = _get_segments(video_id, frames_dir)
+    frames = segments["frames"][sheet * TIMELINE_SPRITE_TILES:(sheet + 1) * TIMELINE_SPRITE_TILES]
+    if sheet < 0 or not frames:
+        raise FileNotFoundError(f"Sprite sheet {sheet} does not exist for video '{video_id}'.")
+
+    cache_dir = os.path.join(TIMELINE_CACHE_PATH, video_id)
+    sprite_path = os.path.join(cache_dir, f"sprite-{frames_signature}-{sheet}{SPRITE_EXT}")
+    if os.path.isfile(sprite_path):
+        return sprite_path
+
+    with timer("timeline_sprite_seconds", "Time to build one timeline sprite sheet"), file_lock(sprite_path):
+        if os.path.isfile(sprite_path):
+            return sprite_path
+        tile_width, tile_height = _tile_size(segments["width"], segments["height"])
+        rows = -(-len(frames) // TIMELINE_SPRITE_COLUMNS)
+        sheet_img = np.zeros((rows * tile_height, TIMELINE_SPRITE_COLUMNS * tile_width, 3), dtype=np.uint8)
+        # Let the decoder downscale large frames instead of resizing full-resolution pixels
+        flags = cv2.IMREAD_REDUCED_COLOR_4 if segments["width"] >= 4 * tile_width else cv2.IMREAD_COLOR
+        for i, name in enumerate(frames):
+            img = cv2.imread(os.path.join(frames_dir, name), flags)
+            if img is None:
+                continue
+            h, w = img.shape[:2]
+            scale = min(tile_width / w, tile_height / h)
+            new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+            tile = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+            y = (i // TIMELINE_SPRITE_COLUMNS) * tile_height + (tile_height - new_h) // 2
+            x = (i % TIMELINE_SPRITE_COLUMNS) * tile_width + (tile_width - new_w) // 2
+            sheet_img[y:y + new_h, x:x + new_w] = tile
+        ok, encoded = cv2.imencode(SPRITE_EXT, sheet_img, [cv2.IMWRITE_JPEG_QUALITY, SPRITE_QUALITY])
+        if not ok:
+            raise IOError(f"Could not encode sprite sheet {sheet} of video '{video_id}'.")
+        atomic_write_bytes(sprite_path, encoded.tobytes())
+    _remove_stale(cache_dir, f"sprite-*{SPRITE_EXT}", f"sprite-{frames_signature}-")
+    return sprite_path
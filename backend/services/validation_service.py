@@ -0,0 +1,118 @@
+# validation_service.py
+# Contains the annotation checks (bounding boxes, parent/child links, cycles) shared by the save path and scripts.
+
+
+def validate_bounding_box(bbox, annotation_id):
+    '''
+    Return an error message if the bounding box is missing or invalid, otherwise None.
+    '''
+    if not isinstance(bbox, dict):
+        return f"Annotation {annotation_id} has a missing or malformed bounding box."
+
+    required_keys = ["x", "y", "width", "height"]
+    if not all(k in bbox for k in required_keys):
+        return f"Annotation {annotation_id} has an incomplete bounding box."
+
+    if not all(isinstance(bbox[k], (int, float)) and bbox[k] >= 0 for k in required_keys):
+        return f"Annotation {annotation_id} has invalid bounding box values."
+
+    return None
+
+
+def validate_parent_child_relationships(annotations):
+    '''
+    Ensure every parent_id and child reference points to an existing annotation
+    and that parent and child agree with each other.
+    '''
+    errors = []
+    id_map = {ann.get("id"): ann for ann in annotations}
+
+    for ann in annotations:
+        parent_id = ann.get("parent_id")
+        if parent_id is not None and parent_id not in id_map:
+            errors.append(f"Annotation {ann.get('id')} has a non-existent parent_id {parent_id}.")
+
+        for child_id in ann.get("children") or []:
+            if child_id not in id_map:
+                errors.append(f"Annotation {ann.get('id')} has an invalid child reference to {child_id}.")
+            elif id_map[child_id].get("parent_id") != ann.get("id"):
+                errors.append(f"Annotation {child_id} does not correctly reference its parent {ann.get('id')}.")
+
+    return errors
+
+
+def detect_circular_references(annotations):
+    '''
+    Report every annotation whose chain of parents loops back on itself.
+    Each chain is walked once (results are memoized), so this is linear in the
+    number of annotations.
+    '''
+    errors = []
+    parents = {ann.get("id"): ann.get("parent_id") for ann in annotations}
+    in_cycle = {}
+
+    for ann in annotations:
+        path = []
+        on_path = set()
+        current = ann.get("id")
+        result = False
+        while current is not None:
+            if current in in_cycle:
+                result = in_cycle[current]
+                break
+            if current in on_path:
+                result = True
+                break
+            path.append(current)
+            on_path.add(current)
+            current = parents.get(current)
+
+        for annotation_id in path:
+            in_cycle[annotation_id] = result
+
+    for ann in annotations:
+        if in_cycle.get(ann.get("id")):
+            errors.append(f"Annotation {ann.get('id')} has a circular parent-child relationship.")
+
+    return errors
+
+
+def validate_document(data):
+    '''
+    Run all checks on an annotation document and return the list of error messages.
+    '''
+    annotations = data.get("annotations")
+    if not isinstance(annotations, list):
+        return ["Missing or malformed 'annotations' list."]
+    if not all(isinstance(ann, dict) for ann in annotations):
+        return ["Every entry of 'annotations' must be an object."]
+
+    errors = []
+    for ann in annotations:
+        bbox_error = validate_bounding_box(ann.get("bounding_box"), ann.get("id"))
+        if bbox_error:
+            errors.append(bbox_error)
+
+    errors.extend(validate_parent_child_relationships(annotations))
+    errors.extend(detect_circular_references(annotations))
+    return errors
+
+
+def apply_validation(data):
+    '''
+    Validate a ready annotation document and record the outcome in it as
+    isValid/validationErrors. Documents that are not ready are left untouched,
+    as they are still being edited.
+    Returns the list of errors, or None if the document was not validated.
+    '''
+    if not isinstance(data, dict) or not data.get("isReady", False):
+        return None
+
+    errors = validate_document(data)
+    if errors:
+        data["validationErrors"] = errors
+        data["isValid"] = False
+    else:
+        data["isValid"] = True
+        data.pop("validationErrors", None)
+    return errors
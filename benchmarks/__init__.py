@@ -0,0 +1,8 @@
+"""
+Offline, CPU-only benchmark suite for the pipeline scripts and the backend routes.
+
+Usage:
+  python -m benchmarks run --frames 10000 --output benchmarks/results/latest.json
+  python -m benchmarks compare baseline.json latest.json
+  python -m benchmarks loadtest --folder bench/video_0000 --users 50 --url http://localhost:8000
+"""
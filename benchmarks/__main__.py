@@ -0,0 +1,164 @@
+"""
+Command line entry point: generate a synthetic workspace, time every stage and
+route, and write the results; or compare two result files.
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.metrics_service import snapshot
+
+from benchmarks import stages
+from benchmarks.results import compare_results, load_results, print_comparison, run_metadata, write_results
+
+STAGES = ("generate", "extract_frames", "validate", "preprocess", "yolo", "ocr", "routes", "serialization")
+
+
+def run(args):
+    from benchmarks.synthetic import generate_dataset, generate_video
+
+    output_path = os.path.abspath(args.output)
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="ui_ai_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    print(f"Workspace: {workdir}")
+
+    results = run_metadata({key: value for key, value in vars(args).items() if key != "func"})
+    results["stages"] = {}
+    results["routes"] = {}
+    results["serialization"] = {}
+    stage_results = results["stages"]
+    skip = set(args.skip or ())
+
+    try:
+        video_paths = [os.path.join("data", "raw", "videos", "recordings", f"video_{i:02d}.mp4")
+                       for i in range(args.videos)]
+        folders = []
+
+        def generate():
+            for i, path in enumerate(video_paths):
+                generate_video(path, args.video_frames, change_rate=args.change_rate, seed=args.seed + i)
+            folders.extend(generate_dataset("data", args.frames, args.folder_size, args.unique_images,
+                                            seed=args.seed))
+            return args.frames + args.videos * args.video_frames
+
+        steps = [
+            ("generate", generate),
+            ("extract_frames", lambda: stages.extract_frames(video_paths)),
+            ("validate", stages.validate_annotations),
+            ("preprocess", stages.preprocess_data),
+            ("yolo", stages.convert_annotations_to_yolo),
+            ("ocr", stages.extract_ocr_text),
+        ]
+        for name, func in steps:
+            if name not in skip:
+                stages.run_stage(stage_results, name, func, quiet=not args.verbose)
+
+        if "routes" not in skip and folders:
+            print("Running routes...")
+            try:
+                from benchmarks.routes import benchmark_routes
+                results["routes"] = benchmark_routes(folders[0], min(args.folder_size, args.frames), args.requests)
+            except ImportError as e:
+                stage_results["routes"] = {"skipped": f"{type(e).__name__}: {e}"}
+                print(f" - skipped ({e})")
+
+        if "serialization" not in skip:
+            print("Running serialization...")
+            from benchmarks.serialization import benchmark_serialization
+            results["serialization"] = benchmark_serialization()
+
+        results["metrics"] = snapshot()
+    finally:
+        os.chdir(previous_dir)
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    write_results(output_path, results)
+    print(f"Results written to {output_path}")
+
+
+def loadtest(args):
+    import asyncio
+    from benchmarks.loadtest import print_report, run_load_test
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    if args.workdir:
+        os.chdir(args.workdir)
+
+    report = asyncio.run(run_load_test(
+        args.folder, args.url, args.users, args.duration, saves=args.saves, think_time=args.think_ms / 1000.0,
+        ramp_up=args.ramp_up, read_only=args.read_only, seed=args.seed,
+    ))
+    print_report(report)
+
+    if output_path:
+        results = run_metadata({key: value for key, value in vars(args).items() if key != "func"})
+        results.update(report)
+        write_results(output_path, results)
+        print(f"Results written to {output_path}")
+
+
+def compare(args):
+    rows, regressions = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+    print_comparison(rows, regressions)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%.")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Generate synthetic data and benchmark every stage and route.")
+    run_parser.add_argument("--frames", type=int, default=1000, help="Annotated frames to generate (10^3 to 10^6).")
+    run_parser.add_argument("--folder-size", type=int, default=1000, help="Frames per folder.")
+    run_parser.add_argument("--unique-images", type=int, default=50,
+                            help="Distinct screens rendered; other frames are hard links to them.")
+    run_parser.add_argument("--videos", type=int, default=2, help="Synthetic recordings for the extraction stage.")
+    run_parser.add_argument("--video-frames", type=int, default=600, help="Frames per synthetic recording.")
+    run_parser.add_argument("--change-rate", type=float, default=0.05, help="Probability that a frame changes the screen.")
+    run_parser.add_argument("--requests", type=int, default=200, help="Requests per route.")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--skip", nargs="*", choices=STAGES, help="Stages to skip.")
+    run_parser.add_argument("--workdir", help="Workspace directory (kept); a temporary one by default.")
+    run_parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace.")
+    run_parser.add_argument("--verbose", action="store_true", help="Show the scripts' own output.")
+    run_parser.add_argument("--output", default=os.path.join("benchmarks", "results", "latest.json"))
+    run_parser.set_defaults(func=run)
+
+    load_parser = commands.add_parser("loadtest", help="Replay concurrent annotator sessions against the backend.")
+    load_parser.add_argument("--folder", required=True, help="Datasets folder the annotators work in.")
+    load_parser.add_argument("--url", help="Base URL of a running backend; the in-process ASGI app by default.")
+    load_parser.add_argument("--workdir", help="Directory holding data/ for the in-process app (e.g. a kept benchmark workspace).")
+    load_parser.add_argument("--users", type=int, default=20, help="Concurrent virtual annotators.")
+    load_parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run after ramp-up.")
+    load_parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which users start.")
+    load_parser.add_argument("--saves", type=int, default=3, help="Saves per frame.")
+    load_parser.add_argument("--think-ms", type=float, default=200.0, help="Average pause between a user's actions.")
+    load_parser.add_argument("--read-only", action="store_true", help="Do not save (safe against production data).")
+    load_parser.add_argument("--seed", type=int, default=0)
+    load_parser.add_argument("--output", help="Write the report as JSON to this path.")
+    load_parser.set_defaults(func=loadtest)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Relative slowdown reported as a regression (0.1 = 10%%).")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
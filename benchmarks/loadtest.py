@@ -0,0 +1,172 @@
+"""
+Concurrent annotator load test for the backend.
+
+Every virtual user replays the annotation page's session on asyncio: list the
+folder, fetch a frame's JSON (the page reads the image path from it), fetch
+the image, save a few times with If-Match, then move on to the next frame.
+Requests go to a running instance (--url) or straight into the ASGI app, in
+which case the load generator shares the process and the CPU with the server.
+"""
+
+import time
+import random
+import asyncio
+
+from .results import summarize_latencies
+
+
+class RouteStats:
+    """Latencies, errors and status codes of one route."""
+    def __init__(self):
+        self.latencies_ms = []
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, latency_ms, status):
+        self.latencies_ms.append(latency_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        # 412 is the expected answer when two annotators save the same frame
+        if status == "error" or (status >= 400 and status != 412):
+            self.errors += 1
+
+
+class LoadTest:
+    def __init__(self, client, folder: str, users: int, duration: float, saves: int = 3,
+                 think_time: float = 0.2, ramp_up: float = 0.0, read_only: bool = False, seed: int = 0):
+        self.client = client
+        self.folder = folder.strip("/")
+        self.users = users
+        self.duration = duration
+        self.saves = saves
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.read_only = read_only
+        self.seed = seed
+        self.routes = {}
+        self.sessions = 0
+        self.deadline = None
+
+    async def request(self, label: str, method: str, url: str, **kwargs):
+        """Send one request and record it under label. Returns the response, or None on a transport error."""
+        stats = self.routes.setdefault(label, RouteStats())
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            stats.record((time.perf_counter() - start) * 1000.0, "error")
+            return None
+        stats.record((time.perf_counter() - start) * 1000.0, response.status_code)
+        return response
+
+    async def think(self, rng: random.Random):
+        if self.think_time > 0:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * self.think_time)
+
+    async def session(self, rng: random.Random, frame_index: int):
+        """One annotator session on the frame_index-th frame of the folder."""
+        listing = await self.request("GET /datasets/list", "GET", "/datasets/list",
+                                     params={"path": self.folder, "limit": 100})
+        if listing is None or listing.status_code != 200:
+            return
+        names = [name for name in listing.json()["items"] if name.endswith(".json")]
+        if not names:
+            return
+        name = f"{self.folder}/{names[frame_index % len(names)]}"
+
+        metadata = await self.request("GET /datasets/file (json)", "GET", "/datasets/file", params={"path": name})
+        if metadata is None or metadata.status_code != 200:
+            return
+        document = metadata.json()
+        etag = metadata.headers.get("etag")
+
+        image_path = document.get("frame", {}).get("path")
+        if image_path:
+            await self.request("GET /datasets/file (image)", "GET", "/datasets/file", params={"path": image_path})
+
+        if self.read_only:
+            return
+        for _ in range(self.saves):
+            await self.think(rng)
+            headers = {"If-Match": etag} if etag else {}
+            response = await self.request("POST /datasets/annotations", "POST", "/datasets/annotations",
+                                          params={"path": image_path or name}, json=document, headers=headers)
+            if response is None:
+                return
+            if response.status_code == 412:
+                # Someone else saved this frame: reload it like the page would
+                metadata = await self.request("GET /datasets/file (json)", "GET", "/datasets/file",
+                                              params={"path": name})
+                if metadata is None or metadata.status_code != 200:
+                    return
+                document = metadata.json()
+                etag = metadata.headers.get("etag")
+            else:
+                etag = response.headers.get("etag", etag)
+
+    async def user(self, user_id: int):
+        rng = random.Random(self.seed + user_id)
+        if self.ramp_up > 0:
+            await asyncio.sleep(self.ramp_up * user_id / self.users)
+        # Spread the users over the folder so that they mostly work on different frames
+        frame_index = user_id * 100 // self.users
+        while time.perf_counter() < self.deadline:
+            await self.session(rng, frame_index)
+            self.sessions += 1
+            frame_index += 1
+            await self.think(rng)
+
+    async def run(self):
+        """Run all users until the duration elapsed and return the report."""
+        start = time.perf_counter()
+        self.deadline = start + self.ramp_up + self.duration
+        await asyncio.gather(*(self.user(user_id) for user_id in range(self.users)))
+        elapsed = time.perf_counter() - start
+        return self.report(elapsed)
+
+    def report(self, elapsed: float):
+        routes = {}
+        for label, stats in sorted(self.routes.items()):
+            routes[label] = summarize_latencies(stats.latencies_ms, elapsed, stats.errors)
+            routes[label]["statuses"] = {str(status): count for status, count in stats.statuses.items()}
+
+        all_latencies = [latency for stats in self.routes.values() for latency in stats.latencies_ms]
+        total_errors = sum(stats.errors for stats in self.routes.values())
+        return {
+            "users": self.users,
+            "elapsed_sec": round(elapsed, 3),
+            "sessions": self.sessions,
+            "total": summarize_latencies(all_latencies, elapsed, total_errors),
+            "routes": routes,
+        }
+
+
+def make_client(url: str = None, users: int = 10, timeout: float = 30.0):
+    """
+    Return an httpx.AsyncClient for a running instance at url, or for the
+    in-process ASGI app (paths relative to the current directory) when url is None.
+    """
+    import httpx
+
+    if url:
+        limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+        return httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+
+    from backend.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+
+async def run_load_test(folder: str, url: str = None, users: int = 10, duration: float = 30.0, **options):
+    async with make_client(url, users) as client:
+        return await LoadTest(client, folder, users, duration, **options).run()
+
+
+def print_report(report):
+    print(f"{report['users']} users, {report['sessions']} sessions in {report['elapsed_sec']}s")
+    header = f"{'route':<32} {'requests':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for label, summary in list(report["routes"].items()) + [("total", report["total"])]:
+        if not summary.get("requests"):
+            continue
+        print(f"{label:<32} {summary['requests']:>9} {summary['throughput_rps']:>8} {summary['p50_ms']:>9} "
+              f"{summary['p95_ms']:>9} {summary['p99_ms']:>9} {summary['errors']:>7}")
@@ -0,0 +1,109 @@
+"""
+Machine-readable benchmark results: latency summaries, run metadata and
+comparison of two result files (e.g. from two commits).
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize_latencies(latencies_ms, elapsed_sec, errors=0):
+    """Summarize a list of request latencies (ms) measured over elapsed_sec."""
+    if not latencies_ms:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies_ms), 4),
+        "throughput_rps": round(len(latencies_ms) / elapsed_sec, 2) if elapsed_sec > 0 else None,
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(config):
+    """Describe the run (commit, machine, parameters) so results stay comparable."""
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+    }
+
+
+def write_results(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Compare two result files. Stage seconds, route p50/p95 latencies and
+    document encode/decode times that grew by more than threshold (a fraction)
+    are regressions.
+    Returns (rows, regressions), each row being (metric, old, new, change).
+    """
+    rows = []
+    for name, stage in current.get("stages", {}).items():
+        old = baseline.get("stages", {}).get(name, {})
+        if "seconds" in stage and "seconds" in old:
+            rows.append((f"stage {name} seconds", old["seconds"], stage["seconds"],
+                         _change(old["seconds"], stage["seconds"])))
+    for route, summary in current.get("routes", {}).items():
+        old = baseline.get("routes", {}).get(route, {})
+        for key in ("p50_ms", "p95_ms"):
+            if key in summary and key in old:
+                rows.append((f"route {route} {key}", old[key], summary[key], _change(old[key], summary[key])))
+    for size, timings in current.get("serialization", {}).items():
+        old = baseline.get("serialization", {}).get(size, {})
+        for key in ("encode_ms", "decode_ms"):
+            if key in timings and key in old:
+                rows.append((f"serialization {size} annotations {key}", old[key], timings[key],
+                             _change(old[key], timings[key])))
+
+    regressions = [row for row in rows if row[3] is not None and row[3] > threshold]
+    return rows, regressions
+
+
+def print_comparison(rows, regressions):
+    for metric, old, new, change in rows:
+        flag = "  REGRESSION" if (metric, old, new, change) in regressions else ""
+        change_text = f"{change * 100:+.1f}%" if change is not None else "n/a"
+        print(f"{metric:<60} {old:>12.3f} {new:>12.3f} {change_text:>9}{flag}")
@@ -0,0 +1,63 @@
+"""
+In-process latency benchmark of the /frames and /datasets routes.
+
+Requests go through FastAPI's TestClient, so no server or network is needed;
+the numbers include routing, validation and serialization but not sockets.
+"""
+
+import json
+import os
+import time
+
+from .results import summarize_latencies
+
+
+def build_cases(folder: str, frames_in_folder: int):
+    """
+    Return {route label: function(client, i)} issuing the i-th request of a route.
+    """
+    def frame(i):
+        return f"{folder}/frame_{i % frames_in_folder:05d}"
+
+    def save(client, i):
+        with open(os.path.join("data", "annotations", f"{frame(i)}.json"), "r", encoding="utf-8") as f:
+            document = json.load(f)
+        return client.post("/datasets/annotations", params={"path": f"{frame(i)}.png"}, json=document)
+
+    return {
+        "GET /frames/list": lambda client, i: client.get(
+            "/frames/list", params={"path": folder, "status": "all", "limit": 100}),
+        "GET /frames/file": lambda client, i: client.get("/frames/file", params={"path": f"{frame(i)}.png"}),
+        "GET /frames/thumbnail": lambda client, i: client.get(
+            "/frames/thumbnail", params={"path": f"{frame(i)}.png", "size": "small"}),
+        "GET /datasets/list": lambda client, i: client.get("/datasets/list", params={"path": folder, "limit": 100}),
+        "GET /datasets/file": lambda client, i: client.get("/datasets/file", params={"path": f"{frame(i)}.json"}),
+        "POST /datasets/annotations": save,
+        "GET /search": lambda client, i: client.get("/search", params={"component_type": "button", "limit": 50}),
+        "GET /stats": lambda client, i: client.get("/stats"),
+    }
+
+
+def benchmark_routes(folder: str, frames_in_folder: int, requests_per_route: int = 200):
+    """
+    Send requests_per_route sequential requests to every route and return
+    {route label: latency summary}. Responses with status >= 400 count as errors.
+    """
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    results = {}
+    with TestClient(app) as client:
+        for label, send in build_cases(folder, frames_in_folder).items():
+            latencies, errors = [], 0
+            start = time.perf_counter()
+            for i in range(requests_per_route):
+                t0 = time.perf_counter()
+                response = send(client, i)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                if response.status_code >= 400:
+                    errors += 1
+            results[label] = summarize_latencies(latencies, time.perf_counter() - start, errors)
+            print(f" - {label}: p50 {results[label]['p50_ms']}ms, p95 {results[label]['p95_ms']}ms, "
+                  f"{errors} errors")
+    return results
@@ -0,0 +1,76 @@
+"""
+Encode/decode and compression cost of large annotation documents.
+
+Compares the stdlib json module (pretty-printed, as the backend used to write
+annotations) with the backend's serialization service, and gzip with brotli.
+"""
+
+import json
+import time
+import random
+
+from backend.services import compression_service
+from backend.services.serialization_service import dumps, loads
+
+from .synthetic import layout_to_annotations, random_layout
+
+
+def make_document(annotations: int, seed: int = 0):
+    """An annotation document with about the given number of annotations."""
+    rng = random.Random(seed)
+    components = []
+    while len(components) < annotations:
+        for component in random_layout(rng, 1920, 1080, windows=8):
+            component["id"] += len(components)
+            if component["parent_id"] is not None:
+                component["parent_id"] += len(components)
+            components.append(component)
+    return {
+        "frame": {"name": "frame_00000", "path": "bench/frame_00000.png", "width": 1920, "height": 1080},
+        "name": "frame_00000",
+        "keywords": ["bench"],
+        "annotations": layout_to_annotations(components[:annotations]),
+        "isReady": True,
+        "isValid": True,
+    }
+
+
+def _time_ms(func, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    return (time.perf_counter() - start) * 1000.0 / repeats, result
+
+
+def benchmark_serialization(sizes=(100, 500, 2000), repeats: int = 50):
+    """
+    Return {annotation count: timings (ms per document) and sizes (bytes)} for
+    encoding, decoding and compressing one document.
+    """
+    results = {}
+    for size in sizes:
+        document = make_document(size)
+        stdlib_encode_ms, pretty = _time_ms(lambda: json.dumps(document, indent=2).encode("utf-8"), repeats)
+        stdlib_decode_ms, _ = _time_ms(lambda: json.loads(pretty), repeats)
+        encode_ms, compact = _time_ms(lambda: dumps(document), repeats)
+        decode_ms, _ = _time_ms(lambda: loads(compact), repeats)
+
+        result = {
+            "stdlib_encode_ms": round(stdlib_encode_ms, 3),
+            "stdlib_decode_ms": round(stdlib_decode_ms, 3),
+            "encode_ms": round(encode_ms, 3),
+            "decode_ms": round(decode_ms, 3),
+            "pretty_bytes": len(pretty),
+            "compact_bytes": len(compact),
+        }
+        for encoding in compression_service.available_encodings():
+            compress_ms, body = _time_ms(lambda: compression_service.compress(pretty, encoding), repeats)
+            result[f"{encoding}_ms"] = round(compress_ms, 3)
+            result[f"{encoding}_bytes"] = len(body)
+        results[str(size)] = result
+        print(f" - {size} annotations: encode {stdlib_encode_ms:.2f} -> {encode_ms:.2f}ms, "
+              f"decode {stdlib_decode_ms:.2f} -> {decode_ms:.2f}ms, "
+              f"{len(pretty)} -> {len(compact)} bytes compact, "
+              + ", ".join(f"{encoding} {result[f'{encoding}_bytes']} bytes"
+                          for encoding in compression_service.available_encodings()))
+    return results
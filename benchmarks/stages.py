@@ -0,0 +1,87 @@
+"""
+Timed runs of the pipeline scripts on a synthetic workspace.
+
+The scripts use paths relative to the working directory (data/...), so the
+benchmark changes into the workspace before loading them.
+"""
+
+import io
+import os
+import importlib.util
+from contextlib import nullcontext, redirect_stdout
+
+from backend.services.metrics_service import stage
+
+from .results import ROOT_DIR
+
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+
+
+def load_script(file_name: str):
+    """Import a numbered pipeline script (whose file name is not a valid module name)."""
+    module_name = "bench_" + os.path.splitext(file_name)[0].replace(" - ", "_").replace(" ", "_")
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_stage(results: dict, name: str, func, quiet: bool = True):
+    """
+    Time func(), which returns the number of items it processed, and store
+    seconds, items and items/sec under results[name]. A stage whose script or
+    dependencies are unavailable is recorded as skipped with the reason.
+    """
+    print(f"Running {name}...")
+    try:
+        with stage(name) as tracker, (redirect_stdout(io.StringIO()) if quiet else nullcontext()):
+            tracker.add(func() or 0)
+    except Exception as e:
+        results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+        print(f" - skipped ({results[name]['skipped']})")
+        return
+
+    results[name] = {
+        "seconds": round(tracker.elapsed, 3),
+        "items": tracker.items,
+        "items_per_sec": round(tracker.rate, 2),
+    }
+    print(f" - {tracker.items} items in {tracker.elapsed:.2f}s ({tracker.rate:.1f}/s)")
+
+
+def count_json_files(root_dir: str) -> int:
+    return sum(
+        1 for _, _, files in os.walk(root_dir)
+        for file in files if file.endswith(".json")
+    )
+
+
+def extract_frames(video_paths):
+    script = load_script("1 - extract_frames.py")
+    return sum(script.process_video(path) for path in video_paths)
+
+
+def validate_annotations():
+    script = load_script("3 - validate_annotations.py")
+    script.validate_annotations(revalidate=True)
+    return count_json_files(script.ANNOTATION_ROOT_DIR)
+
+
+def preprocess_data():
+    script = load_script("4 - preprocess_data.py")
+    script.preprocess_data()
+    return count_json_files(script.ANNOTATION_OUTPUT_DIR)
+
+
+def convert_annotations_to_yolo():
+    script = load_script("5 - convert_annotations_to_yolo.py")
+    class_mapping = script.get_class_mapping(script.ANNOTATIONS_DIR)
+    script.save_class_mapping(class_mapping, script.CLASS_MAPPING_FILE)
+    script.convert_annotations(script.ANNOTATIONS_DIR, script.FRAMES_DIR, script.YOLO_OUTPUT_DIR, class_mapping)
+    return count_json_files(script.ANNOTATIONS_DIR)
+
+
+def extract_ocr_text():
+    script = load_script("6 - extract_ocr_text.py")
+    script.detect_text_and_update_annotations()
+    return count_json_files(script.ANNOTATIONS_DIR)
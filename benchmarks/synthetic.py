@@ -0,0 +1,210 @@
+"""
+Synthetic UI screen recordings and annotation datasets.
+
+Screens are drawn with OpenCV: windows with a title bar, buttons, text lines
+and input fields. The same layout yields both the pixels and the matching
+annotation JSON, so every stage of the pipeline can run on generated data.
+"""
+
+import os
+import json
+import random
+import shutil
+
+import cv2
+import numpy as np
+
+COMPONENT_COLORS = {
+    "window": (235, 235, 235),
+    "title_bar": (120, 70, 30),
+    "button": (200, 140, 60),
+    "text": (20, 20, 20),
+    "input": (255, 255, 255),
+}
+BACKGROUND = (90, 60, 40)
+WORDS = ("File", "Edit", "View", "Save", "Open", "Cancel", "OK", "Search", "Name", "Settings", "Help", "Apply")
+
+
+def random_layout(rng: random.Random, width: int, height: int, windows: int = 3):
+    """
+    Build a random screen layout: a list of components with id, parent_id,
+    component_type, bounding_box and text. Windows contain a title bar,
+    buttons, text lines and input fields.
+    """
+    components = []
+
+    def add(component_type, x, y, w, h, parent_id=None, text=""):
+        component = {
+            "id": len(components) + 1,
+            "parent_id": parent_id,
+            "component_type": component_type,
+            "bounding_box": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)},
+            "text": text,
+        }
+        components.append(component)
+        return component["id"]
+
+    for _ in range(windows):
+        w = rng.randint(width // 4, width // 2)
+        h = rng.randint(height // 4, height // 2)
+        x = rng.randint(0, width - w)
+        y = rng.randint(0, height - h)
+        window_id = add("window", x, y, w, h)
+        add("title_bar", x, y, w, 24, window_id, rng.choice(WORDS))
+
+        cursor_y = y + 36
+        while cursor_y + 28 < y + h:
+            kind = rng.choice(("button", "text", "input"))
+            item_w = rng.randint(60, max(61, w // 2))
+            if x + 10 + item_w > x + w:
+                break
+            add(kind, x + 10, cursor_y, item_w, 24, window_id, " ".join(rng.sample(WORDS, 2)))
+            cursor_y += 32
+
+    return components
+
+
+def mutate_layout(components, rng: random.Random, width: int, height: int):
+    """
+    Apply one visible change: usually relabel a widget (a small change),
+    sometimes move a whole window (a large change).
+    """
+    windows = [c for c in components if c["component_type"] == "window"]
+    if windows and rng.random() < 0.2:
+        window = rng.choice(windows)
+        box = window["bounding_box"]
+        dx = rng.randint(-box["x"], width - box["x"] - box["width"])
+        dy = rng.randint(-box["y"], height - box["y"] - box["height"])
+        for component in components:
+            if component["id"] == window["id"] or component["parent_id"] == window["id"]:
+                component["bounding_box"]["x"] += dx
+                component["bounding_box"]["y"] += dy
+    else:
+        widgets = [c for c in components if c["component_type"] != "window"]
+        if widgets:
+            rng.choice(widgets)["text"] = " ".join(rng.sample(WORDS, 2))
+
+
+def draw_layout(components, width: int, height: int):
+    """Render a layout into a BGR image."""
+    img = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+    for component in components:
+        box = component["bounding_box"]
+        top_left = (box["x"], box["y"])
+        bottom_right = (box["x"] + box["width"], box["y"] + box["height"])
+        kind = component["component_type"]
+        if kind != "text":
+            cv2.rectangle(img, top_left, bottom_right, COMPONENT_COLORS[kind], thickness=-1)
+        if kind in ("button", "input"):
+            cv2.rectangle(img, top_left, bottom_right, (60, 60, 60), thickness=1)
+        if component["text"]:
+            color = (255, 255, 255) if kind in ("title_bar", "button") else COMPONENT_COLORS["text"]
+            cv2.putText(img, component["text"], (box["x"] + 4, box["y"] + box["height"] - 7),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1, cv2.LINE_AA)
+    return img
+
+
+def layout_to_annotations(components):
+    """Convert a layout into the annotation list format used by the backend."""
+    children = {}
+    for component in components:
+        if component["parent_id"] is not None:
+            children.setdefault(component["parent_id"], []).append(component["id"])
+
+    return [{
+        "id": component["id"],
+        "name": f"{component['component_type']}_{component['id']}",
+        "parent_id": component["parent_id"],
+        "component_type": component["component_type"],
+        "bounding_box": dict(component["bounding_box"]),
+        "color": "#FF0000",
+        "isSelected": False,
+        "hidden": False,
+        "attributes": {"text": component["text"]},
+        "children": children.get(component["id"], []),
+    } for component in components]
+
+
+def generate_video(path: str, frames: int, width: int = 640, height: int = 360, fps: int = 10,
+                   change_rate: float = 0.05, seed: int = 0):
+    """
+    Write a synthetic screen recording. Each frame changes the screen with
+    probability change_rate, so about frames * change_rate distinct frames
+    are expected from the extraction. Returns the number of changes made.
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise IOError(f"Could not open a video writer for '{path}'.")
+
+    components = random_layout(rng, width, height)
+    img = draw_layout(components, width, height)
+    changes = 0
+    for _ in range(frames):
+        if rng.random() < change_rate:
+            mutate_layout(components, rng, width, height)
+            img = draw_layout(components, width, height)
+            changes += 1
+        writer.write(img)
+    writer.release()
+    return changes
+
+
+def _link_or_copy(src: str, dest: str):
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def generate_dataset(data_dir: str, frames: int, folder_size: int = 1000, unique_images: int = 50,
+                     width: int = 1280, height: int = 720, seed: int = 0):
+    """
+    Write frames and annotations as the extraction and conversion steps would:
+    data/frames/<folder>/frame_XXXXX.png (+ metadata JSON) and
+    data/annotations/<folder>/frame_XXXXX.json, ready but not yet validated.
+    Only unique_images screens are rendered; the rest are hard links to them,
+    so 10^6 frames cost little disk space. Returns the list of folders.
+    """
+    rng = random.Random(seed)
+    frames_dir = os.path.join(data_dir, "frames")
+    annotations_dir = os.path.join(data_dir, "annotations")
+
+    screens = []
+    pool_dir = os.path.join(data_dir, "synthetic_pool")
+    os.makedirs(pool_dir, exist_ok=True)
+    for i in range(min(unique_images, frames)):
+        components = random_layout(rng, width, height)
+        image_path = os.path.join(pool_dir, f"screen_{i:05d}.png")
+        cv2.imwrite(image_path, draw_layout(components, width, height))
+        screens.append((image_path, layout_to_annotations(components)))
+
+    folders = []
+    for index in range(frames):
+        folder = f"bench/video_{index // folder_size:04d}"
+        if index % folder_size == 0:
+            folders.append(folder)
+            os.makedirs(os.path.join(frames_dir, folder), exist_ok=True)
+            os.makedirs(os.path.join(annotations_dir, folder), exist_ok=True)
+
+        name = f"frame_{index % folder_size:05d}"
+        image_path, annotations = screens[index % len(screens)]
+        relative_path = f"{folder}/{name}.png"
+        _link_or_copy(image_path, os.path.join(frames_dir, f"{folder}/{name}.png"))
+
+        frame = {"name": f"{name}.png", "width": width, "height": height, "start_frame_idx": index}
+        with open(os.path.join(frames_dir, folder, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(frame, f)
+
+        document = {
+            "frame": {**frame, "path": relative_path},
+            "name": name,
+            "keywords": ["bench", name],
+            "annotations": annotations,
+            "isReady": True,
+        }
+        with open(os.path.join(annotations_dir, folder, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(document, f)
+
+    return folders
@@ -1,3 +1,5 @@
+/// <reference types="vite/client" />
+
 declare module '*.scss' {
     const content: { [className: string]: string };
     export default content;
@@ -3,7 +3,7 @@ import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 import { faFolder, faImage } from "@fortawesome/free-solid-svg-icons";
 import { useEffect, useRef, useState } from "react";
 import { FrameOrFolderState, MetadataState } from "../../types";
-import { listDatasets, getImageFile, getMetadataFile } from "../../services/datasetsService";
+import { listDatasetsPage, getImageFile, getMetadataFile } from "../../services/datasetsService";
 import DrawerHandle from "./DrawerHandle";
 
 export interface AnnotationNavBarProps {
@@ -19,6 +19,7 @@ const AnnotationNavBar: React.FC<AnnotationNavBarProps> = ({
 }) => {
     const [panelWidthPx, setPanelWidth] = useState(250);
     const [contents, setContents] = useState<FrameOrFolderState[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const loadingRef = useRef(false);
 
     useEffect(() => {
@@ -34,12 +35,21 @@ const AnnotationNavBar: React.FC<AnnotationNavBarProps> = ({
             setMetadata(metadata);
         }
         else {
-            const result = await listDatasets(path);
-            setContents(result);
+            const page = await listDatasetsPage(path);
+            setContents(page.items);
+            setNextCursor(page.nextCursor);
             setMetadata(null);
         }
     }
 
+    const loadMore = async () => {
+        if (!nextCursor)
+            return;
+        const page = await listDatasetsPage(path, { cursor: nextCursor });
+        setContents((current) => [...current, ...page.items]);
+        setNextCursor(page.nextCursor);
+    }
+
     const handleClick = (item: FrameOrFolderState) => {
         if (loadingRef.current)
             return;
@@ -100,6 +110,15 @@ const AnnotationNavBar: React.FC<AnnotationNavBarProps> = ({
                             </div>
                         )
                     }
+                    {
+                        nextCursor &&
+                        <div
+                            className="AnnotationNaveBar-item AnnotationNaveBar-more"
+                            onClick={loadMore}
+                        >
+                            Load more...
+                        </div>
+                    }
                 </div>
             </div>
             <DrawerHandle sizePx={panelWidthPx} setSize={setPanelWidth} direction="left" />
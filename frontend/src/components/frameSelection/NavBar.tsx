@@ -1,7 +1,8 @@
 import "./NavBar.scss";
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 import { faFolder, faImage } from "@fortawesome/free-solid-svg-icons";
-import { getImageFile, listFrameContents } from "../../services/framesService";
+import { getThumbnailFile, listFrameContentsPage } from "../../services/framesService";
+import { subscribeToChanges } from "../../services/eventsService";
 import { useEffect, useRef, useState } from "react";
 import { FrameState, FrameOrFolderState } from "../../types";
 import DrawerHandle from "../annotations/DrawerHandle";
@@ -20,6 +21,7 @@ const FrameSelectionNaveBar: React.FC<FrameSelectionNaveBarProps> = ({
     frame
 }) => {
     const [contents, setContents] = useState<FrameOrFolderState[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [panelWidthPx, setPanelWidth] = useState(250);
     const loadingRef = useRef(false);
     
@@ -32,10 +34,17 @@ const FrameSelectionNaveBar: React.FC<FrameSelectionNaveBarProps> = ({
             getPathContents(path);
     }, [frame]);
 
+    // Reload the folder when frames are added or converted elsewhere
+    useEffect(()=> {
+        if (frame)
+            return;
+        return subscribeToChanges(undefined, path, () => getPathContents(path));
+    }, [path, frame]);
+
     const getPathContents = async (path: string) => {
         const ext = path.substring(path.lastIndexOf("."));
         if ([".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff"].includes(ext)) {
-            const blob = await getImageFile(path);
+            const blob = await getThumbnailFile(path, "large");
             setFrame({
                 name: path.substring(path.lastIndexOf("/")),
                 path,
@@ -43,11 +52,20 @@ const FrameSelectionNaveBar: React.FC<FrameSelectionNaveBarProps> = ({
             });
         }
         else {
-            const result = await listFrameContents(path);
-            setContents(result);
+            const page = await listFrameContentsPage(path);
+            setContents(page.items);
+            setNextCursor(page.nextCursor);
         }
     }
 
+    const loadMore = async () => {
+        if (!nextCursor)
+            return;
+        const page = await listFrameContentsPage(path, { cursor: nextCursor });
+        setContents((current) => [...current, ...page.items]);
+        setNextCursor(page.nextCursor);
+    }
+
     const handleClick = (item: FrameOrFolderState) => {
         if (loadingRef.current)
             return;
@@ -108,6 +126,15 @@ const FrameSelectionNaveBar: React.FC<FrameSelectionNaveBarProps> = ({
                             </div>
                         )
                     }
+                    {
+                        nextCursor &&
+                        <div
+                            className="FrameSelectionNaveBar-item FrameSelectionNaveBar-more"
+                            onClick={loadMore}
+                        >
+                            Load more...
+                        </div>
+                    }
                 </div>
             </div>
             <DrawerHandle sizePx={panelWidthPx} setSize={setPanelWidth} direction="left" />
@@ -7,7 +7,8 @@
 import axios from 'axios'
 
 const api = axios.create({
-  baseURL: 'http://localhost:8000', // Adjust as needed
+  // The dev server runs next to the backend; a production build is served by the backend itself
+  baseURL: import.meta.env.VITE_API_URL || (import.meta.env.DEV ? 'http://localhost:8000' : window.location.origin),
 })
 
 export default api
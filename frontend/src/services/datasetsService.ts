@@ -4,7 +4,7 @@
  */
 
 import api from './api'
-import type { AnnotationData, DatasetItemState, MetadataState } from '../types'
+import type { AnnotationData, AnnotationState, DatasetItemState, ListOptions, ListPage, MetadataState } from '../types'
 
 export async function listDatasets(path: string): Promise<DatasetItemState[]> {
     // GET /frames/list with optional query parameter
@@ -18,6 +18,33 @@ export async function listDatasets(path: string): Promise<DatasetItemState[]> {
     }));
 }
 
+interface ListPageResponse {
+    items: string[]
+    next_cursor: string | null
+    total: number
+}
+
+export interface DatasetListOptions extends ListOptions {
+    is_ready?: boolean
+    is_valid?: boolean
+}
+
+export async function listDatasetsPage(path: string, options: DatasetListOptions = {}): Promise<ListPage<DatasetItemState>> {
+    // GET /datasets/list?limit=...&cursor=...
+    const response = await api.get<ListPageResponse>('/datasets/list', {
+        params: { path, limit: 200, ...options }
+    });
+
+    return {
+        items: response.data.items.map((item: string) => ({
+            path: item,
+            isFolder: !item.toLowerCase().match(/\.(png|jpg|jpeg|gif|bmp|txt|json)$/)
+        })),
+        nextCursor: response.data.next_cursor,
+        total: response.data.total
+    };
+}
+
 export async function getImageFile(path?: string): Promise<Blob> {
     // GET /frames/list with optional query parameter
     const response = await api.get<string[] | string>('/datasets/file', {
@@ -39,6 +66,37 @@ export async function getMetadataFile(path?: string): Promise<MetadataState> {
     return response.data; // This will be a string (file content)
 }
 
+export interface BatchRecord {
+    path: string
+    data?: MetadataState
+    error?: string
+}
+
+export interface BatchOptions {
+    fields?: string[]
+    annotationFields?: string[]
+}
+
+/**
+ * Fetches the annotation JSON of every file in a folder in a single (NDJSON) request.
+ */
+export async function getMetadataBatch(path: string, options: BatchOptions = {}): Promise<BatchRecord[]> {
+    // GET /datasets/batch?path=...
+    const response = await api.get<string>('/datasets/batch', {
+        params: {
+            path,
+            fields: options.fields?.join(","),
+            annotation_fields: options.annotationFields?.join(",")
+        },
+        responseType: 'text'
+    });
+
+    return response.data
+        .split("\n")
+        .filter((line) => line.length > 0)
+        .map((line) => JSON.parse(line) as BatchRecord);
+}
+
 export async function getAnnotations(path: string): Promise<AnnotationData> {
     // GET /datasets/annotations?path=...
     const response = await api.get('/datasets/annotations', { params: { path } })
@@ -50,3 +108,44 @@ export async function updateAnnotations(path: string, annotations: AnnotationDat
     const response = await api.post('/datasets/annotations', annotations, { params: { path } })
     return response.data
 }
+
+
+export interface AnnotationChanges {
+    upsert?: AnnotationState[]
+    delete?: number[]
+    set?: { [key: string]: any }
+}
+
+/**
+ * Sends only the changed annotations. Pass the ETag of the version being edited
+ * to get a 412 instead of silently overwriting someone else's changes.
+ */
+export async function patchAnnotations(path: string, changes: AnnotationChanges, etag?: string) {
+    // PATCH /datasets/annotations?path=...
+    const response = await api.patch('/datasets/annotations', changes, {
+        params: { path },
+        headers: etag ? { 'If-Match': etag } : undefined
+    })
+    return response.data
+}
+
+/**
+ * Returns the annotations with parent_id/children rebuilt from box containment.
+ */
+export async function inferHierarchy(annotations: AnnotationState[]): Promise<AnnotationState[]> {
+    // POST /datasets/hierarchy
+    const response = await api.post('/datasets/hierarchy', { annotations })
+    return response.data.annotations
+}
+
+/**
+ * Rebuilds parent_id/children of a saved annotation file on the server.
+ */
+export async function applyHierarchy(path: string, etag?: string) {
+    // POST /datasets/annotations/hierarchy?path=...
+    const response = await api.post('/datasets/annotations/hierarchy', null, {
+        params: { path },
+        headers: etag ? { 'If-Match': etag } : undefined
+    })
+    return response.data
+}
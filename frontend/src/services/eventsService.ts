@@ -0,0 +1,36 @@
+/**
+ * eventsService.ts
+ * Service for subscribing to the /events change stream of the backend.
+ */
+
+import api from './api'
+import type { ChangeEvent } from '../types'
+
+/**
+ * Subscribes to debounced change batches for a folder.
+ *
+ * @param root - "frames" or "annotations"; both when undefined
+ * @param path - Folder to watch (including sub-folders); the whole root when omitted
+ * @param onChanges - Called with each batch of changes
+ * @returns - A function that closes the subscription
+ */
+export function subscribeToChanges(
+    root: "frames" | "annotations" | undefined,
+    path: string | undefined,
+    onChanges: (events: ChangeEvent[]) => void
+): () => void {
+    const url = new URL('/events', api.defaults.baseURL);
+    if (root) {
+        url.searchParams.set('root', root);
+    }
+    if (path) {
+        url.searchParams.set('path', path);
+    }
+
+    const source = new EventSource(url.toString());
+    source.addEventListener('changes', (message) => {
+        onChanges(JSON.parse((message as MessageEvent).data) as ChangeEvent[]);
+    });
+
+    return () => source.close();
+}
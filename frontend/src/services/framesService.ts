@@ -4,7 +4,7 @@
  */
 
 import api from './api'
-import type { FrameOrFolderState } from '../types'
+import type { FrameOrFolderState, ListOptions, ListPage, PyramidInfo } from '../types'
 
 /**
  * Fetches the list of frames (folders and files) or the content of a file.
@@ -25,6 +25,39 @@ export async function listFrameContents(path?: string): Promise<FrameOrFolderSta
     }));
 }
 
+interface ListPageResponse {
+    items: string[]
+    next_cursor: string | null
+    total: number
+}
+
+export interface FrameListOptions extends ListOptions {
+    status?: "all" | "annotated" | "unannotated"
+    diff?: "exclude" | "include" | "only"
+}
+
+/**
+ * Fetches one page of a frames folder, sorted and filtered on the server.
+ *
+ * @param path - Optional path to a folder
+ * @param options - Sorting, filters, page size and the cursor of the previous page
+ */
+export async function listFrameContentsPage(path?: string, options: FrameListOptions = {}): Promise<ListPage<FrameOrFolderState>> {
+    // GET /frames/list?limit=...&cursor=...
+    const response = await api.get<ListPageResponse>('/frames/list', {
+        params: { path, limit: 200, ...options }
+    });
+
+    return {
+        items: response.data.items.map((item: string) => ({
+            path: item,
+            isFolder: !item.toLowerCase().match(/\.(png|jpg|jpeg|gif|bmp|txt|json)$/)
+        })),
+        nextCursor: response.data.next_cursor,
+        total: response.data.total
+    };
+}
+
 export async function getImageFile(path?: string): Promise<Blob> {
     // GET /frames/list with optional query parameter
     const response = await api.get<string[] | string>('/frames/file', {
@@ -36,8 +69,59 @@ export async function getImageFile(path?: string): Promise<Blob> {
     return response.data as unknown as Blob; // This will be a string (file content)
 }
 
-export async function convertFrame(path: string) {
-    // POST /frames/convert?path=...
-    const response = await api.post('/frames/convert', null, { params: { path } })
+export async function getThumbnailFile(path: string, size: "small" | "medium" | "large" = "medium"): Promise<Blob> {
+    // GET /frames/thumbnail?path=...&size=...
+    const response = await api.get('/frames/thumbnail', {
+        params: { path, size },
+        responseType: 'blob'
+    });
+
+    return response.data as Blob;
+}
+
+export async function getPyramidInfo(path: string): Promise<PyramidInfo> {
+    // GET /frames/pyramid?path=...
+    const response = await api.get<PyramidInfo>('/frames/pyramid', { params: { path } })
+    return response.data
+}
+
+/**
+ * URL of one pyramid tile, usable directly as an <img> source so the browser caches it.
+ * Level info.max_level is full resolution; each level below halves the frame.
+ */
+export function getTileUrl(path: string, level: number, col: number, row: number): string {
+    const params = new URLSearchParams({ path, level: String(level), col: String(col), row: String(row) })
+    return `${api.defaults.baseURL}/frames/tile?${params.toString()}`
+}
+
+export async function convertFrame(path: string, preannotate: boolean = false) {
+    // POST /frames/convert?path=...&preannotate=...
+    const response = await api.post('/frames/convert', null, { params: { path, preannotate } })
+    return response.data
+}
+
+export interface BulkConvertRequest {
+    folder?: string
+    glob?: string
+    paths?: string[]
+    recursive?: boolean
+    preannotate?: boolean
+}
+
+export async function convertFramesBulk(request: BulkConvertRequest): Promise<{ job_id: string, total: number }> {
+    // POST /frames/convert/bulk
+    const response = await api.post('/frames/convert/bulk', request)
+    return response.data
+}
+
+export async function cancelJob(jobId: string) {
+    // POST /jobs/{jobId}/cancel
+    const response = await api.post(`/jobs/${jobId}/cancel`)
+    return response.data
+}
+
+export async function getJobStatus(jobId: string) {
+    // GET /jobs/{jobId}
+    const response = await api.get(`/jobs/${jobId}`)
     return response.data
 }
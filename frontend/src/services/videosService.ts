@@ -0,0 +1,42 @@
+/**
+ * videosService.ts
+ * Service for interacting with the /videos routes in the backend.
+ */
+
+import api from './api'
+import type { TimelineData } from '../types'
+
+function videoPath(video: string): string {
+    return video.split('/').map(encodeURIComponent).join('/')
+}
+
+/**
+ * Fetches the whole segment table of an extracted video (e.g. "recordings/video_00") in one request.
+ */
+export async function getTimeline(video: string): Promise<TimelineData> {
+    // GET /videos/{video}/timeline
+    const response = await api.get<TimelineData>(`/videos/${videoPath(video)}/timeline`)
+    return response.data
+}
+
+/**
+ * URL of one thumbnail sprite sheet, usable directly as an <img> or CSS background.
+ */
+export function getSpriteUrl(video: string, sheet: number): string {
+    return `${api.defaults.baseURL}/videos/${videoPath(video)}/timeline/sprite?sheet=${sheet}`
+}
+
+/**
+ * Where the thumbnail of segment index sits: its sheet and pixel offset within it.
+ */
+export function getSpriteTile(timeline: TimelineData, index: number) {
+    const { tile_width, tile_height, columns, tiles_per_sheet } = timeline.sprite
+    const tile = index % tiles_per_sheet
+    return {
+        sheet: Math.floor(index / tiles_per_sheet),
+        x: (tile % columns) * tile_width,
+        y: Math.floor(tile / columns) * tile_height,
+        width: tile_width,
+        height: tile_height
+    }
+}
@@ -8,6 +8,51 @@ export interface FrameOrFolderState {
   isFolder: boolean
 }
 
+export interface ListPage<T> {
+  items: T[]
+  nextCursor: string | null
+  total: number
+}
+
+export interface ListOptions {
+  sort?: "name" | "frame" | "mtime"
+  order?: "asc" | "desc"
+  limit?: number
+  cursor?: string | null
+}
+
+export interface PyramidInfo {
+  width: number
+  height: number
+  tile_size: number
+  overlap: number
+  format: string
+  max_level: number
+}
+
+export interface TimelineData {
+  video: string
+  count: number
+  width: number
+  height: number
+  frames: string[]
+  start_frame_idx: number[]
+  end_frame_idx: number[]
+  start_sec: number[]
+  end_sec: number[]
+  mean_diff: number[]
+  // Bit flags, see status_flags
+  status: number[]
+  status_flags: { converted: number, ready: number, valid: number }
+  sprite: {
+    tile_width: number
+    tile_height: number
+    columns: number
+    tiles_per_sheet: number
+    sheets: number
+  }
+}
+
 export interface FrameState {
     name: string;
     path: string;
@@ -76,4 +121,9 @@ export interface GrowthState {
 
 export interface Selection {
     annotationId: string;
-}
\ No newline at end of file
+}
+export interface ChangeEvent {
+    type: "created" | "modified" | "deleted" | "annotation_saved" | "frame_converted" | "frame_preannotated" | "resync"
+    root: "frames" | "annotations"
+    path: string
+}
@@ -1,8 +1,15 @@
 import os
+import sys
 import cv2
 import json
+import argparse
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.blob_service import write_image
+from backend.services.metrics_service import increment, stage, write_report
+
 # Adjustable parameters
 THRESHOLD = 100000  # (Unused in this version, but kept for reference)
 SENSITIVITY = 0.00002  # If the mean difference is below this, frames are considered "the same"
@@ -60,7 +67,7 @@ def save_segment(
 ):
     """
     Immediately saves the old (distinct) frame segment as a PNG plus a JSON file
-    containing metadata. Returns nothing; used for "save on the fly."
+    containing metadata. Returns the path of the saved PNG; used for "save on the fly."
     """
     # Filenames for image + JSON
     frame_filename = f"{FRAME_PREFIX}_{distinct_count:05d}{EXT_FRAMES}"
@@ -69,11 +76,11 @@ def save_segment(
 
     # Save color PNG (the representative distinct frame)
     out_png_path = os.path.join(out_folder, frame_filename)
-    cv2.imwrite(out_png_path, color_img)
+    write_image(out_png_path, color_img)
 
     # Save the masked-diff PNG (highlight changes from the previous distinct frame)
     out_diff_path = os.path.join(out_folder, diff_filename)
-    cv2.imwrite(out_diff_path, diff_img)
+    write_image(out_diff_path, diff_img)
 
     # Create JSON metadata
     metadata = {
@@ -90,13 +97,16 @@ def save_segment(
     out_json_path = os.path.join(out_folder, json_filename)
     with open(out_json_path, "w", encoding="utf-8") as jf:
         json.dump(metadata, jf, indent=2)
+    return out_png_path
 
 
-def process_video(video_path):
+def process_video(video_path, on_frame=None):
     """
     Extracts distinct frames from the given video file in color.
     Uses color-frame comparisons (with masking) to detect whether frames are effectively the same.
-    Immediately saves each old segment as soon as a new distinct one is found.
+    Immediately saves each old segment as soon as a new distinct one is found,
+    and passes the saved PNG path to on_frame (if given) so later stages can start on it.
+    Returns the number of frames decoded.
     """
     video_name = os.path.basename(video_path)
     out_folder = get_output_folder(video_path)
@@ -108,7 +118,7 @@ def process_video(video_path):
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print(f"Error: Could not open video {video_path}")
-        return
+        return 0
 
     fps = cap.get(cv2.CAP_PROP_FPS)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -172,7 +182,7 @@ def process_video(video_path):
                 print(f" - Distinct change at frame {frame_idx}, mean diff: {mean_diff:.6f}")
 
                 # Finalize/save the old distinct frame segment
-                save_segment(
+                saved_path = save_segment(
                     prev_color_frame,
                     masked_diff,       # Show changes from old -> current
                     first_seen_sec,
@@ -186,6 +196,8 @@ def process_video(video_path):
                     mean_diff
                 )
                 distinct_count += 1
+                if on_frame is not None:
+                    on_frame(saved_path)
 
                 # Now this new frame becomes the "current distinct segment"
                 prev_gray_frame = gray
@@ -201,7 +213,7 @@ def process_video(video_path):
     if prev_color_frame is not None:
         # No new frame to compare to, so we provide a zeroed diff image
         zero_diff = np.zeros_like(prev_color_frame)
-        save_segment(
+        saved_path = save_segment(
             prev_color_frame,
             zero_diff,
             first_seen_sec,
@@ -215,12 +227,16 @@ def process_video(video_path):
             mean_diff
         )
         distinct_count += 1
+        if on_frame is not None:
+            on_frame(saved_path)
 
     cap.release()
+    increment("frames_saved_total", distinct_count, "Distinct frames saved by extraction")
     print(f" - Saved {distinct_count} distinct frames (color) to '{out_folder}'")
+    return frame_idx
 
 
-def main():
+def main(report_path=None):
     # Ensure data/raw/videos directory exists
     if not os.path.exists(VIDEO_DIR):
         print(f"No directory found at '{VIDEO_DIR}'. Nothing to process.")
@@ -246,8 +262,16 @@ def main():
             # If a folder already exists for this relative path, skip it
             print(f"Video '{video_path}' is already processed. Skipping.")
         else:
-            process_video(video_path)
+            with stage("extract_frames") as tracker:
+                tracker.add(process_video(video_path))
+            print(f" - Decoded {tracker.items} frames at {tracker.rate:.1f} frames/sec")
+
+    if report_path:
+        write_report(report_path, script="extract_frames")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract distinct frames from the raw videos.")
+    parser.add_argument("--report", help="Write a JSON run report with stage timings to this path.")
+    args = parser.parse_args()
+    main(args.report)
\ No newline at end of file
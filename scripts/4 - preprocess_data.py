@@ -1,9 +1,16 @@
 import os
+import sys
 import json
 import shutil
+import argparse
 import cv2
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.blob_service import write_image
+from backend.services.metrics_service import stage, timer, write_report
+
 # Paths
 ANNOTATION_ROOT_DIR = os.path.join("data" , "annotations")
 IMAGE_ROOT_DIR = os.path.join("data" , "frames")
@@ -108,7 +115,7 @@ def resize_image_with_padding(image_path, output_path, max_width, max_height):
     y_offset = (max_height - new_h) // 2
     padded_img[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = resized_img
 
-    cv2.imwrite(output_path, padded_img)
+    write_image(output_path, padded_img)
 
 # Step 5: Apply Image Augmentations
 def augment_image(image_path, output_dir):
@@ -131,13 +138,13 @@ def augment_image(image_path, output_dir):
     grayscale = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # Convert to grayscale
     bright = cv2.convertScaleAbs(img, alpha=1.2, beta=30)  # Brightness increase
     
-    cv2.imwrite(os.path.join(aug_output_dir, f"{base_name}_flipped.png"), flipped)
-    cv2.imwrite(os.path.join(aug_output_dir, f"{base_name}_blurred.png"), blurred)
-    cv2.imwrite(os.path.join(aug_output_dir, f"{base_name}_grayscale.png"), grayscale)
-    cv2.imwrite(os.path.join(aug_output_dir, f"{base_name}_bright.png"), bright)
+    write_image(os.path.join(aug_output_dir, f"{base_name}_flipped.png"), flipped)
+    write_image(os.path.join(aug_output_dir, f"{base_name}_blurred.png"), blurred)
+    write_image(os.path.join(aug_output_dir, f"{base_name}_grayscale.png"), grayscale)
+    write_image(os.path.join(aug_output_dir, f"{base_name}_bright.png"), bright)
 
 # Step 6: Process all files
-def preprocess_data():
+def preprocess_data(report_path=None):
     """Main function to preprocess annotations and images."""
     json_files = find_json_files(ANNOTATION_ROOT_DIR)
     
@@ -151,22 +158,34 @@ def preprocess_data():
     print(f"✅ Largest frame size determined: {max_width}x{max_height}")
 
     # Normalize attributes and save JSON files
-    normalize_and_save_json(json_files, unique_attributes)
+    with stage("preprocess_annotations") as tracker:
+        normalize_and_save_json(json_files, unique_attributes)
+        tracker.add(len(json_files))
 
-    for file_path in json_files:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    with stage("preprocess_images") as tracker:
+        for file_path in json_files:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            image_path = os.path.normpath(os.path.join(IMAGE_ROOT_DIR, data["frame"]["path"]))
+            relative_image_path = os.path.relpath(image_path, IMAGE_ROOT_DIR)
+            output_image_path = os.path.join(IMAGE_OUTPUT_DIR, relative_image_path)
 
-        image_path = os.path.normpath(os.path.join(IMAGE_ROOT_DIR, data["frame"]["path"]))
-        relative_image_path = os.path.relpath(image_path, IMAGE_ROOT_DIR)
-        output_image_path = os.path.join(IMAGE_OUTPUT_DIR, relative_image_path)
+            os.makedirs(os.path.dirname(output_image_path), exist_ok=True)
 
-        os.makedirs(os.path.dirname(output_image_path), exist_ok=True)
+            with timer("preprocess_resize_seconds", "Time to resize and pad one frame"):
+                resize_image_with_padding(image_path, output_image_path, max_width, max_height)
+            with timer("preprocess_augment_seconds", "Time to write the augmentations of one frame"):
+                augment_image(output_image_path, IMAGE_OUTPUT_DIR)
+            tracker.add()
 
-        resize_image_with_padding(image_path, output_image_path, max_width, max_height)
-        augment_image(output_image_path, IMAGE_OUTPUT_DIR)
+    print(f"✅ Preprocessing complete ({tracker.rate:.1f} frames/sec).")
 
-    print("✅ Preprocessing complete.")
+    if report_path:
+        write_report(report_path, script="preprocess_data")
 
 if __name__ == "__main__":
-    preprocess_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Normalize annotations and resize/augment frames for training.")
+    parser.add_argument("--report", help="Write a JSON run report with stage timings to this path.")
+    args = parser.parse_args()
+    preprocess_data(args.report)
\ No newline at end of file
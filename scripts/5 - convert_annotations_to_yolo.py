@@ -13,10 +13,20 @@ def ensure_dir_exists(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-def get_class_mapping(annotations_dir):
-    """Generate a class mapping based on 'component_type' in annotations."""
-    class_mapping = {}
-    class_id = 0
+def load_class_mapping(file_path):
+    """Load a previously saved class mapping, or an empty one."""
+    if not os.path.isfile(file_path):
+        return {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def get_class_mapping(annotations_dir, class_mapping=None):
+    """
+    Generate a class mapping based on 'component_type' in annotations.
+    An existing mapping is extended, so classes keep their ids between runs.
+    """
+    class_mapping = dict(class_mapping or {})
+    class_id = max(class_mapping.values(), default=-1) + 1
 
     for root, _, files in os.walk(annotations_dir):
         for file in files:
@@ -37,35 +47,39 @@ def save_class_mapping(class_mapping, file_path):
         json.dump(class_mapping, f, indent=4)
     print(f"Class mapping saved to {file_path}")
 
+def convert_annotation_file(annotation_path, annotations_dir, yolo_output_dir, class_mapping):
+    """Convert one annotation file to a YOLO label file. Returns the label file path."""
+    with open(annotation_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    frame_width, frame_height = data["frame"]["width"], data["frame"]["height"]
+
+    label_output_dir = os.path.join(yolo_output_dir, os.path.relpath(os.path.dirname(annotation_path), annotations_dir))
+    ensure_dir_exists(label_output_dir)
+
+    yolo_label_path = os.path.join(label_output_dir, f"{data['frame']['name']}.txt")
+
+    with open(yolo_label_path, "w") as label_file:
+        for annotation in data.get("annotations", []):
+            bbox = annotation["bounding_box"]
+            x_center = (bbox["x"] + bbox["width"] / 2) / frame_width
+            y_center = (bbox["y"] + bbox["height"] / 2) / frame_height
+            width = bbox["width"] / frame_width
+            height = bbox["height"] / frame_height
+            class_id = class_mapping[annotation["component_type"]]
+            
+            label_file.write(f"{class_id} {x_center} {y_center} {width} {height}\n")
+    return yolo_label_path
+
 def convert_annotations(annotations_dir, frames_dir, yolo_output_dir, class_mapping):
     """Convert annotations to YOLO format and save label files."""
     for root, _, files in os.walk(annotations_dir):
         for file in files:
             if file.endswith(".json"):
-                with open(os.path.join(root, file), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                frame_path = os.path.join(frames_dir, data["frame"]["path"])
-                frame_width, frame_height = data["frame"]["width"], data["frame"]["height"]
-
-                label_output_dir = os.path.join(yolo_output_dir, os.path.relpath(root, annotations_dir))
-                ensure_dir_exists(label_output_dir)
-
-                yolo_label_path = os.path.join(label_output_dir, f"{data['frame']['name']}.txt")
-
-                with open(yolo_label_path, "w") as label_file:
-                    for annotation in data.get("annotations", []):
-                        bbox = annotation["bounding_box"]
-                        x_center = (bbox["x"] + bbox["width"] / 2) / frame_width
-                        y_center = (bbox["y"] + bbox["height"] / 2) / frame_height
-                        width = bbox["width"] / frame_width
-                        height = bbox["height"] / frame_height
-                        class_id = class_mapping[annotation["component_type"]]
-                        
-                        label_file.write(f"{class_id} {x_center} {y_center} {width} {height}\n")
+                convert_annotation_file(os.path.join(root, file), annotations_dir, yolo_output_dir, class_mapping)
 
 if __name__ == "__main__":
-    class_mapping = get_class_mapping(ANNOTATIONS_DIR)
+    class_mapping = get_class_mapping(ANNOTATIONS_DIR, load_class_mapping(CLASS_MAPPING_FILE))
     save_class_mapping(class_mapping, CLASS_MAPPING_FILE)
     convert_annotations(ANNOTATIONS_DIR, FRAMES_DIR, YOLO_OUTPUT_DIR, class_mapping)
 
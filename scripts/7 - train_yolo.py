@@ -1,8 +1,72 @@
+import os
+import argparse
+import shutil
 from ultralytics import YOLO
 
-def train_yolo(model_name="yolov8n.pt", data_yaml="data/processed/yolo/data.yaml", epochs=50):
+from training_data import build_tiled_dataset, make_cached_trainer, make_image_cache
+
+MODELS_DIR = os.path.join("data", "models")
+
+def train_yolo(model_name="yolov8n.pt", data_yaml="data/processed/yolo/data.yaml", epochs=50,
+               imgsz=640, cache=None, cache_size_mb=4096, **train_args):
+    """
+    Train the detector. With cache="ram" or cache="disk" decoded frames are kept
+    in a size-bounded LRU cache instead of being re-decoded every epoch.
+    """
     model = YOLO(model_name)
-    model.train(data=data_yaml, epochs=epochs)
+    if cache:
+        train_args["trainer"] = make_cached_trainer(make_image_cache(cache, cache_size_mb))
+    model.train(data=data_yaml, epochs=epochs, imgsz=imgsz, **train_args)
+    return model.trainer.best
+
+def quantize_onnx(onnx_path, output_path):
+    """Apply dynamic int8 weight quantization to an exported ONNX model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QUInt8)
+    return output_path
+
+def export_onnx(weights_path, imgsz=640, int8=False, output_dir=MODELS_DIR):
+    """
+    Export trained weights to ONNX for the torch-free CPU runtime
+    (backend/services/detector_service.py) and copy both files into output_dir.
+    With int8=True the exported graph is additionally quantized.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    model = YOLO(weights_path)
+    onnx_path = model.export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+
+    shutil.copy2(weights_path, os.path.join(output_dir, "best.pt"))
+    output_path = os.path.join(output_dir, "best.onnx")
+    if int8:
+        quantize_onnx(onnx_path, output_path)
+    else:
+        shutil.copy2(onnx_path, output_path)
+
+    print(f"ONNX model saved to {output_path}")
+    return output_path
 
 if __name__ == "__main__":
-    train_yolo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train a YOLO detector and export it to ONNX.")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--data", default="data/processed/yolo/data.yaml")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--imgsz", type=int, default=640, help="Training and export input size")
+    parser.add_argument("--cache", choices=["ram", "disk"], help="Cache decoded frames between epochs")
+    parser.add_argument("--cache-size-mb", type=int, default=4096, help="Size limit of the frame cache")
+    parser.add_argument("--tile", action="store_true", help="Train on overlapping tiles of the full frames")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--tile-overlap", type=float, default=0.2)
+    parser.add_argument("--int8", action="store_true", help="Quantize the exported model to int8")
+    parser.add_argument("--no-export", action="store_true", help="Only train, skip the ONNX export")
+    args = parser.parse_args()
+
+    data_yaml = args.data
+    if args.tile:
+        data_yaml = build_tiled_dataset(tile_size=args.tile_size, overlap=args.tile_overlap)
+
+    best_weights = train_yolo(args.model, data_yaml, args.epochs, imgsz=args.imgsz,
+                              cache=args.cache, cache_size_mb=args.cache_size_mb)
+    if not args.no_export:
+        export_onnx(best_weights, imgsz=args.imgsz, int8=args.int8)
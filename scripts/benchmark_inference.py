@@ -0,0 +1,112 @@
+"""
+Compare the torch (ultralytics) and ONNX inference paths on CPU.
+
+Each runtime is measured in a fresh subprocess so that cold-start time
+(imports + model load) and peak RSS are not polluted by the other runtime.
+
+Usage:
+  python scripts/benchmark_inference.py --image data/frames/x/frame_00000.png
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def max_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def run_worker(runtime, model_path, image_path, runs, warmup):
+    """Load one runtime, time repeated predictions and print a JSON summary."""
+    start = time.perf_counter()
+    if runtime == "torch":
+        from ultralytics import YOLO
+        model = YOLO(model_path)
+        predict = lambda: model.predict(image_path, verbose=False, device="cpu")
+    else:
+        from backend.services.detector_service import OnnxDetector
+        model = OnnxDetector(model_path, use_opencv=(runtime == "opencv"))
+        predict = lambda: model.predict(image_path)
+    predict()
+    cold_start = time.perf_counter() - start
+
+    for _ in range(warmup):
+        predict()
+
+    latencies = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        predict()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    print(json.dumps({
+        "runtime": runtime,
+        "model": model_path,
+        "cold_start_sec": round(cold_start, 3),
+        "latency_ms_mean": round(sum(latencies) / len(latencies), 2),
+        "latency_ms_p50": round(percentile(latencies, 50), 2),
+        "latency_ms_p95": round(percentile(latencies, 95), 2),
+        "max_rss_mb": round(max_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark torch vs ONNX detector inference on CPU.")
+    parser.add_argument("--image", required=True, help="Frame used for every prediction")
+    parser.add_argument("--weights", default=os.path.join("data", "models", "best.pt"))
+    parser.add_argument("--onnx", default=os.path.join("data", "models", "best.onnx"))
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--runtimes", default="torch,onnxruntime,opencv")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        model_path = args.weights if args.worker == "torch" else args.onnx
+        run_worker(args.worker, model_path, args.image, args.runs, args.warmup)
+        return
+
+    results = []
+    for runtime in args.runtimes.split(","):
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--worker", runtime,
+            "--image", args.image,
+            "--weights", args.weights,
+            "--onnx", args.onnx,
+            "--runs", str(args.runs),
+            "--warmup", str(args.warmup),
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"Warning: {runtime} benchmark failed:\n{completed.stderr}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{runtime:12s} cold start {result['cold_start_sec']:.2f}s, "
+              f"mean {result['latency_ms_mean']:.1f}ms, p95 {result['latency_ms_p95']:.1f}ms, "
+              f"RSS {result['max_rss_mb']:.0f}MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Streaming orchestrator for pipeline stages 1-6.
+
+Instead of running the numbered scripts one after the other, every item flows
+through the stages as soon as its inputs are ready:
+
+    extract (video) -> convert (frame) -> preprocess (annotation) -> yolo
+                                                                  -> ocr
+
+Frames are converted while their video is still decoding, and a reviewed
+annotation is preprocessed, labelled and OCR'd without waiting for the rest
+of the dataset. Each stage has a bounded queue and its own worker pool. The
+status and input cache key of every item are kept in data/cache/pipeline.db,
+so an interrupted run resumes where it stopped and a rerun only processes
+what changed. Annotations wait in the preprocess stage until they are marked
+ready and valid in the UI; training (stage 7) still runs on its own.
+
+Usage (from the repository root):
+    python scripts/pipeline.py
+    python scripts/pipeline.py --watch 10 --workers convert=8,preprocess=4
+    python scripts/pipeline.py --status
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import importlib.util
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.file_service import atomic_write_json
+from backend.services.conversion_service import _is_frame
+from backend.services.frames_service import VALID_IMAGE_EXTENSIONS, convert_frame_to_dataset
+from backend.services.hierarchy_service import enclosing_ids
+from backend.services.metrics_service import write_report
+
+from pipeline_engine import Pipeline, Stage, StateStore
+
+STATE_PATH = os.path.join("data", "cache", "pipeline.db")
+OCR_OUTPUT_DIR = os.path.join("data", "processed", "ocr")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+STAGE_NAMES = ("extract", "convert", "preprocess", "yolo", "ocr")
+DEFAULT_WORKERS = {"extract": 1, "convert": 4, "preprocess": 2, "yolo": 2, "ocr": 2}
+# Preprocessed frames are padded to this size (the batch script uses the largest frame of the dataset)
+DEFAULT_SIZE = "1920x1080"
+
+
+def load_script(file_name: str):
+    """Import a numbered pipeline script (whose file name is not a valid module name)."""
+    module_name = "pipeline_" + os.path.splitext(file_name)[0].replace(" - ", "_").replace(" ", "_")
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def file_key(path: str, *extra) -> str:
+    """Cache key of a file's contents (size and mtime), plus any stage settings it depends on."""
+    stat = os.stat(path)
+    return ":".join([str(stat.st_size), str(stat.st_mtime_ns)] + [str(value) for value in extra])
+
+
+def walk_files(root_dir: str, extensions):
+    """Yield the paths (relative, with / separators) of the files below root_dir with the given extensions."""
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        for file in sorted(filenames):
+            if file.lower().endswith(extensions):
+                yield os.path.relpath(os.path.join(dirpath, file), root_dir).replace(os.sep, "/")
+
+
+def load_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class PipelineStages:
+    """The stage functions, bound to the paths and modules of the numbered scripts."""
+    def __init__(self, width: int, height: int, preannotate: bool = False):
+        self.extract_script = load_script("1 - extract_frames.py")
+        self.preprocess_script = load_script("4 - preprocess_data.py")
+        self.yolo_script = load_script("5 - convert_annotations_to_yolo.py")
+        self.width = width
+        self.height = height
+        self.preannotate = preannotate
+
+        self.video_dir = self.extract_script.VIDEO_DIR
+        self.frames_dir = self.extract_script.OUTPUT_DIR
+        self.annotations_dir = self.preprocess_script.ANNOTATION_ROOT_DIR
+        self.processed_annotations_dir = self.preprocess_script.ANNOTATION_OUTPUT_DIR
+        self.processed_frames_dir = self.preprocess_script.IMAGE_OUTPUT_DIR
+
+        # Class ids must stay stable while labels are written one file at a time
+        self.class_mapping = self.yolo_script.load_class_mapping(self.yolo_script.CLASS_MAPPING_FILE)
+        self.class_mapping_lock = threading.Lock()
+
+        try:
+            import pytesseract
+            self.pytesseract = pytesseract
+        except ImportError:
+            self.pytesseract = None
+
+    # Stage 1: videos -> distinct frames
+    def extract_key(self, item: str):
+        return file_key(os.path.join(self.video_dir, item))
+
+    def extract(self, item: str, emit):
+        def on_frame(png_path):
+            emit(os.path.relpath(png_path, self.frames_dir).replace(os.sep, "/"))
+        self.extract_script.process_video(os.path.join(self.video_dir, item), on_frame=on_frame)
+
+    # Stage 2: frames -> dataset items (annotation JSON files)
+    def convert_key(self, item: str):
+        if not _is_frame(item):
+            return None
+        return file_key(os.path.join(self.frames_dir, item), self.preannotate)
+
+    def convert(self, item: str, emit):
+        base_name, _ = os.path.splitext(item)
+        annotation_path = os.path.join(self.annotations_dir, f"{base_name}.json")
+        # Never overwrite a dataset item that may already hold an annotator's work
+        if not os.path.isfile(annotation_path):
+            convert_frame_to_dataset(item, self.frames_dir, self.annotations_dir)
+            if self.preannotate:
+                from backend.services.preannotation_service import preannotate_frame
+                preannotate_frame(item, self.frames_dir, self.annotations_dir)
+        emit(f"{base_name}.json")
+
+    # Stage 4: reviewed annotations -> normalized annotations and resized, augmented frames
+    def preprocess_key(self, item: str):
+        return file_key(os.path.join(self.annotations_dir, item), f"{self.width}x{self.height}")
+
+    def preprocess_ready(self, item: str) -> bool:
+        data = load_json(os.path.join(self.annotations_dir, item))
+        return bool(data.get("isReady") and data.get("isValid"))
+
+    def preprocess(self, item: str, emit):
+        script = self.preprocess_script
+        annotation_path = os.path.join(self.annotations_dir, item)
+        data = load_json(annotation_path)
+
+        attributes = {attr for annotation in data["annotations"] for attr in annotation.get("attributes", {})}
+        script.normalize_and_save_json([annotation_path], attributes)
+
+        image_path = os.path.normpath(os.path.join(self.frames_dir, data["frame"]["path"]))
+        output_image_path = os.path.join(self.processed_frames_dir, os.path.relpath(image_path, self.frames_dir))
+        os.makedirs(os.path.dirname(output_image_path), exist_ok=True)
+        script.resize_image_with_padding(image_path, output_image_path, self.width, self.height)
+        script.augment_image(output_image_path, self.processed_frames_dir)
+        emit(item)
+
+    # Stage 5: processed annotations -> YOLO label files
+    def processed_key(self, item: str):
+        return file_key(os.path.join(self.processed_annotations_dir, item))
+
+    def yolo(self, item: str, emit):
+        script = self.yolo_script
+        annotation_path = os.path.join(self.processed_annotations_dir, item)
+        component_types = [annotation["component_type"] for annotation in load_json(annotation_path)["annotations"]]
+
+        with self.class_mapping_lock:
+            new_types = [t for t in dict.fromkeys(component_types) if t not in self.class_mapping]
+            if new_types:
+                next_id = max(self.class_mapping.values(), default=-1) + 1
+                for offset, component_type in enumerate(new_types):
+                    self.class_mapping[component_type] = next_id + offset
+                atomic_write_json(script.CLASS_MAPPING_FILE, self.class_mapping, indent=4)
+            class_mapping = dict(self.class_mapping)
+
+        script.convert_annotation_file(annotation_path, self.processed_annotations_dir, script.YOLO_OUTPUT_DIR,
+                                       class_mapping)
+
+    # Stage 6: processed annotations -> detected text, linked to the innermost enclosing component
+    def ocr(self, item: str, emit):
+        import cv2
+
+        data = load_json(os.path.join(self.processed_annotations_dir, item))
+        # The original frame, whose coordinates match the bounding boxes
+        image = cv2.imread(os.path.join(self.frames_dir, data["frame"]["path"]))
+        if image is None:
+            raise FileNotFoundError(f"Frame '{data['frame']['path']}' could not be read.")
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        detections = self.pytesseract.image_to_data(gray, output_type=self.pytesseract.Output.DICT)
+
+        text = []
+        for i, word in enumerate(detections["text"]):
+            word = word.strip()
+            if not word:
+                continue
+            bbox = {"x": detections["left"][i], "y": detections["top"][i],
+                    "width": detections["width"][i], "height": detections["height"][i]}
+            text.append({
+                "text": word,
+                "confidence": float(detections["conf"][i]),
+                "bounding_box": bbox,
+            })
+        parent_ids = enclosing_ids(data["annotations"], [entry["bounding_box"] for entry in text])
+        for entry, parent_id in zip(text, parent_ids):
+            entry["parent_id"] = parent_id
+
+        output_path = os.path.join(OCR_OUTPUT_DIR, item)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        atomic_write_json(output_path, {"frame": data["frame"]["path"], "text": text})
+
+    def build(self, workers, queue_size: int, enabled=STAGE_NAMES):
+        def stage(name, func, key, **options):
+            return Stage(name, func, key, workers=workers.get(name, DEFAULT_WORKERS[name]),
+                         queue_size=queue_size, **options)
+
+        stages = [
+            stage("extract", self.extract, self.extract_key, downstream=["convert"]),
+            stage("convert", self.convert, self.convert_key, downstream=["preprocess"]),
+            stage("preprocess", self.preprocess, self.preprocess_key, ready=self.preprocess_ready,
+                  downstream=["yolo", "ocr"]),
+            stage("yolo", self.yolo, self.processed_key),
+        ]
+        if self.pytesseract is not None:
+            stages.append(stage("ocr", self.ocr, self.processed_key))
+        elif "ocr" in enabled:
+            print("OCR stage disabled: pytesseract is not installed.")
+        return [s for s in stages if s.name in enabled]
+
+    def discover(self, pipeline: Pipeline):
+        """Submit every source item; the state store skips the ones already processed."""
+        for item in walk_files(self.video_dir, VIDEO_EXTENSIONS):
+            # Videos extracted by the batch script before the orchestrator was used
+            if pipeline.state.status("extract", item) is None and \
+                    self.extract_script.is_video_processed(os.path.join(self.video_dir, item)):
+                pipeline.state.mark("extract", item, self.extract_key(item), "done")
+            pipeline.submit("extract", item)
+        for item in walk_files(self.frames_dir, tuple(VALID_IMAGE_EXTENSIONS)):
+            pipeline.submit("convert", item)
+        for item in walk_files(self.annotations_dir, (".json",)):
+            pipeline.submit("preprocess", item)
+        for item in walk_files(self.processed_annotations_dir, (".json",)):
+            pipeline.submit("yolo", item)
+            pipeline.submit("ocr", item)
+
+
+def parse_workers(value: str):
+    """Parse 'convert=8,preprocess=4' into {stage: workers}."""
+    workers = {}
+    for part in filter(None, value.split(",")):
+        name, _, count = part.partition("=")
+        if name not in STAGE_NAMES or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid worker count '{part}' (expected stage=N).")
+        workers[name] = int(count)
+    return workers
+
+
+def parse_size(value: str):
+    width, _, height = value.lower().partition("x")
+    if not (width.isdigit() and height.isdigit()):
+        raise argparse.ArgumentTypeError(f"Invalid size '{value}' (expected WIDTHxHEIGHT).")
+    return int(width), int(height)
+
+
+def print_status(state: StateStore):
+    counts = state.counts()
+    if not counts:
+        print("No items recorded yet.")
+    for name in STAGE_NAMES:
+        if name in counts:
+            print(f"{name:<12} " + ", ".join(f"{status}: {n}" for status, n in sorted(counts[name].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline stages 1-6 per item, resuming from the last run.")
+    parser.add_argument("--stages", default=",".join(STAGE_NAMES),
+                        help="Comma-separated stages to run (default: all).")
+    parser.add_argument("--workers", type=parse_workers, default={},
+                        help="Worker threads per stage, e.g. convert=8,preprocess=4.")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Items buffered per stage before its producers block (default: 64).")
+    parser.add_argument("--size", type=parse_size, default=parse_size(DEFAULT_SIZE),
+                        help=f"Size preprocessed frames are padded to (default: {DEFAULT_SIZE}).")
+    parser.add_argument("--preannotate", action="store_true",
+                        help="Pre-annotate newly converted frames with the detection model.")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="Keep running and rescan the sources at this interval.")
+    parser.add_argument("--reset", metavar="STAGE", choices=STAGE_NAMES + ("all",),
+                        help="Forget the recorded items of a stage (or all) so they are processed again.")
+    parser.add_argument("--status", action="store_true", help="Print the recorded item counts and exit.")
+    parser.add_argument("--quiet", action="store_true", help="Only print failures and the summary.")
+    parser.add_argument("--report", help="Write a JSON run report with stage timings to this path.")
+    args = parser.parse_args()
+
+    state = StateStore(STATE_PATH)
+    if args.status:
+        print_status(state)
+        return
+    if args.reset:
+        state.forget(None if args.reset == "all" else args.reset)
+
+    enabled = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = set(enabled) - set(STAGE_NAMES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    stages = PipelineStages(*args.size, preannotate=args.preannotate)
+    pipeline = Pipeline(stages.build(args.workers, args.queue_size, enabled), state, quiet=args.quiet)
+    results = pipeline.run(stages.discover, watch_interval=args.watch)
+    state.close()
+
+    for name, counts in results.items():
+        print(f"{name:<12} done: {counts['done']}, skipped: {counts['skipped']}, "
+              f"waiting: {counts['waiting']}, failed: {counts['failed']}")
+    if results.get("yolo", {}).get("done"):
+        print("YOLO labels updated; run 'scripts/7 - train_yolo.py' to train on them.")
+
+    if args.report:
+        write_report(args.report, script="pipeline", results=results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Per-item streaming engine used by pipeline.py.
+
+Stages form a DAG. Every stage has its own bounded queue and worker threads;
+an item finished by one stage is handed to the downstream stages right away,
+so a frame can be labelled while the rest of its video is still decoding.
+A full queue blocks the producer, which keeps a fast stage from running ahead
+of a slow one. Each finished item is recorded in a SQLite state store with the
+cache key of its inputs, so a restarted run skips the work that is still valid.
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+from backend.services.metrics_service import increment, record_stage, set_gauge, timer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    stage TEXT NOT NULL,
+    item TEXT NOT NULL,
+    key TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (stage, item)
+);
+"""
+
+# Statuses that stay valid while the item's cache key does not change
+SETTLED_STATUSES = ("done", "waiting")
+
+
+class StateStore:
+    """Resumable record of the status and cache key of every (stage, item)."""
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.failed_this_run = set()
+        # (stage, item) -> (key, status), read once so skip checks stay in memory
+        self.records = {
+            (stage, item): (key, status)
+            for stage, item, key, status in self.connection.execute("SELECT stage, item, key, status FROM items")
+        }
+
+    def status(self, stage: str, item: str):
+        with self.lock:
+            record = self.records.get((stage, item))
+        return record[1] if record else None
+
+    def is_settled(self, stage: str, item: str, key: str) -> bool:
+        """
+        Whether the item was already processed (or found not ready) with this
+        cache key. Items that failed are retried once per run.
+        """
+        with self.lock:
+            record = self.records.get((stage, item))
+            if record is None or record[0] != key:
+                return False
+            return record[1] in SETTLED_STATUSES or (stage, item) in self.failed_this_run
+
+    def mark(self, stage: str, item: str, key: str, status: str, error: str = None):
+        with self.lock:
+            self.records[(stage, item)] = (key, status)
+            if status == "failed":
+                self.failed_this_run.add((stage, item))
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO items (stage, item, key, status, error, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (stage, item, key, status, error, time.time()),
+                )
+
+    def forget(self, stage: str = None):
+        """Drop the records of one stage (or all of them) so its items are processed again."""
+        with self.lock:
+            with self.connection:
+                if stage is None:
+                    self.connection.execute("DELETE FROM items")
+                else:
+                    self.connection.execute("DELETE FROM items WHERE stage = ?", (stage,))
+            self.records = {k: v for k, v in self.records.items() if stage is not None and k[0] != stage}
+
+    def counts(self):
+        """Return {stage: {status: count}}."""
+        counts = {}
+        with self.lock:
+            for (stage, _), (_, status) in self.records.items():
+                counts.setdefault(stage, {}).setdefault(status, 0)
+                counts[stage][status] += 1
+        return counts
+
+    def close(self):
+        self.connection.close()
+
+
+class Stage:
+    """
+    One node of the pipeline.
+
+    func(item, emit) processes an item and calls emit(output) for every item it
+    hands to the downstream stages. key(item) returns the cache key of the
+    item's inputs (e.g. file size and mtime), or None if they are missing.
+    ready(item) returns False while the item must wait (e.g. an annotation not
+    reviewed yet); the item is picked up again once its key changes.
+    """
+    def __init__(self, name: str, func, key, ready=None, workers: int = 1, queue_size: int = 64,
+                 downstream=()):
+        self.name = name
+        self.func = func
+        self.key = key
+        self.ready = ready
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.downstream = list(downstream)
+
+
+class Pipeline:
+    def __init__(self, stages, state: StateStore, quiet: bool = False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state = state
+        self.quiet = quiet
+        self.threads = []
+        self.stopping = False
+        # (stage, item) pairs queued or running, so an item is never processed twice at once
+        self.active = set()
+        self.pending = 0
+        self.condition = threading.Condition()
+        self.results = {name: {"done": 0, "skipped": 0, "waiting": 0, "failed": 0} for name in self.stages}
+        # Seconds spent on the items each stage finished, summed over its workers
+        self.busy_seconds = {name: 0.0 for name in self.stages}
+
+    def log(self, message: str):
+        if not self.quiet:
+            print(message)
+
+    def count(self, stage: str, result: str):
+        with self.condition:
+            self.results[stage][result] += 1
+        increment("pipeline_items_total", help_text="Items handled by the pipeline orchestrator", stage=stage, result=result)
+
+    def submit(self, stage_name: str, item: str):
+        """
+        Queue an item for a stage unless it is already queued or settled with
+        its current cache key. Blocks while the stage's queue is full.
+        """
+        stage = self.stages.get(stage_name)
+        if stage is None or self.stopping:
+            return
+        try:
+            key = stage.key(item)
+        except OSError:
+            key = None
+        if key is None:
+            return
+        if self.state.is_settled(stage_name, item, key):
+            self.count(stage_name, "skipped")
+            return
+
+        with self.condition:
+            if (stage_name, item) in self.active:
+                return
+            self.active.add((stage_name, item))
+            self.pending += 1
+        stage.queue.put((item, key))
+        set_gauge("pipeline_queue_depth", stage.queue.qsize(), "Items waiting in a pipeline stage queue",
+                  stage=stage_name)
+
+    def emitter(self, stage: Stage):
+        def emit(output: str):
+            for name in stage.downstream:
+                self.submit(name, output)
+        return emit
+
+    def process(self, stage: Stage, item: str, key: str):
+        try:
+            if stage.ready is not None and not stage.ready(item):
+                self.state.mark(stage.name, item, key, "waiting")
+                self.count(stage.name, "waiting")
+                return
+
+            self.state.mark(stage.name, item, key, "running")
+            start = time.perf_counter()
+            with timer("pipeline_item_seconds", "Time to process one item in a pipeline stage", stage=stage.name):
+                stage.func(item, self.emitter(stage))
+        except Exception as e:
+            self.state.mark(stage.name, item, key, "failed", f"{type(e).__name__}: {e}")
+            self.count(stage.name, "failed")
+            print(f"[{stage.name}] {item} failed: {type(e).__name__}: {e}")
+            return
+        self.state.mark(stage.name, item, key, "done")
+        self.count(stage.name, "done")
+        with self.condition:
+            self.busy_seconds[stage.name] += time.perf_counter() - start
+        self.log(f"[{stage.name}] {item}")
+
+    def worker(self, stage: Stage):
+        while True:
+            entry = stage.queue.get()
+            if entry is None:
+                return
+            item, key = entry
+            set_gauge("pipeline_queue_depth", stage.queue.qsize(), "Items waiting in a pipeline stage queue",
+                      stage=stage.name)
+            try:
+                self.process(stage, item, key)
+            except Exception as e:
+                # Keep the worker alive; a dead worker would leave the item pending forever
+                print(f"[{stage.name}] {item} crashed: {type(e).__name__}: {e}")
+            finally:
+                with self.condition:
+                    self.active.discard((stage.name, item))
+                    self.pending -= 1
+                    self.condition.notify_all()
+
+    def start(self):
+        for stage in self.stages.values():
+            for index in range(stage.workers):
+                thread = threading.Thread(target=self.worker, args=(stage,), name=f"{stage.name}-{index}",
+                                          daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Wait until no item is queued or running. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self):
+        for stage in self.stages.values():
+            for _ in range(stage.workers):
+                stage.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def run(self, discover, watch_interval: float = None):
+        """
+        Feed the stages with discover(pipeline), which submits the source items,
+        and wait until everything reachable from them is processed. With a
+        watch_interval the sources are scanned again at that interval until
+        interrupted; settled items are skipped by their cache keys.
+        """
+        self.start()
+        try:
+            while True:
+                discover(self)
+                self.wait_idle()
+                if watch_interval is None:
+                    break
+                time.sleep(watch_interval)
+        except KeyboardInterrupt:
+            print("Interrupted; waiting for the items in progress...")
+            self.stopping = True
+            for stage in self.stages.values():
+                self.drain(stage)
+        finally:
+            self.stop()
+        for name, results in self.results.items():
+            if results["done"]:
+                record_stage(name, results["done"], self.busy_seconds[name])
+        return self.results
+
+    def drain(self, stage: Stage):
+        """Drop the queued items of a stage; they are picked up again by the next run."""
+        while True:
+            try:
+                entry = stage.queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                with self.condition:
+                    self.active.discard((stage.name, entry[0]))
+                    self.pending -= 1
+                    self.condition.notify_all()
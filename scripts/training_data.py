@@ -0,0 +1,275 @@
+"""
+Training front-end for the YOLO detector.
+
+- RamImageCache / DiskImageCache keep decoded (and resized) frames so the
+  data loader stops re-decoding PNGs every epoch. Both are size-bounded with
+  least-recently-used eviction; the disk cache stores .npy files that are
+  memory-mapped on read and can be shared between data loader workers.
+- build_tiled_dataset slices full-resolution frames into overlapping tiles
+  with remapped YOLO labels, so small UI controls survive a small imgsz.
+  Use OnnxDetector.predict_tiled to merge tile predictions at inference time.
+"""
+
+import os
+import sys
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from backend.services.columnar_service import load_dataset
+from backend.services.tiling_service import compute_tiles, slice_boxes
+
+ANNOTATIONS_DIR = os.path.join("data", "processed", "annotations")
+IMAGE_ROOT_DIR = os.path.join("data", "frames")
+CLASS_MAPPING_FILE = os.path.join("data", "processed", "yolo", "class_mapping.json")
+TILES_OUTPUT_DIR = os.path.join("data", "processed", "yolo_tiles")
+CACHE_DIR = os.path.join("data", "processed", "cache")
+
+
+class RamImageCache:
+    """In-memory LRU cache of decoded images bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, img, orig_shape):
+        if img.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (img, tuple(orig_shape))
+            self.current_bytes += img.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+
+class DiskImageCache:
+    """
+    On-disk LRU cache of decoded images stored as .npy files and read back
+    with np.load(mmap_mode="r"). The original image size is kept in the file name.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Rebuild the index from previous runs, oldest access first
+        self._entries = OrderedDict()
+        self.current_bytes = 0
+        files = []
+        for entry in os.scandir(cache_dir):
+            if entry.is_file() and entry.name.endswith(".npy"):
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            digest = name.split("_", 1)[0]
+            self._entries[digest] = (name, size)
+            self.current_bytes += size
+
+    def _digest(self, key):
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        digest = self._digest(key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._entries.move_to_end(digest)
+        name, _ = entry
+        try:
+            img = np.load(os.path.join(self.cache_dir, name), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            # Evicted by another worker process or partially written
+            return None
+        h0, w0 = name[:-4].split("_")[1:3]
+        return img, (int(h0), int(w0))
+
+    def put(self, key, img, orig_shape):
+        digest = self._digest(key)
+        name = f"{digest}_{orig_shape[0]}_{orig_shape[1]}.npy"
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if digest in self._entries:
+                return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(img))
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._entries[digest] = (name, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (evicted_name, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                try:
+                    os.remove(os.path.join(self.cache_dir, evicted_name))
+                except FileNotFoundError:
+                    pass
+
+
+def make_image_cache(kind, max_mb, cache_dir=CACHE_DIR):
+    """Create a RAM or disk image cache limited to max_mb megabytes."""
+    max_bytes = int(max_mb * 1024 * 1024)
+    if kind == "ram":
+        return RamImageCache(max_bytes)
+    if kind == "disk":
+        return DiskImageCache(cache_dir, max_bytes)
+    raise ValueError(f"Unknown cache type '{kind}', expected 'ram' or 'disk'.")
+
+
+def make_cached_trainer(image_cache):
+    """
+    Return an ultralytics DetectionTrainer whose datasets look up decoded images
+    in image_cache before reading them from disk. A RAM cache lives in each data
+    loader worker process, so its budget applies per worker.
+    """
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from ultralytics.utils import colorstr
+    from ultralytics.utils.torch_utils import de_parallel
+
+    class CachedYOLODataset(YOLODataset):
+        def load_image(self, i, rect_mode=True):
+            if self.ims[i] is not None:
+                return super().load_image(i, rect_mode)
+            # Size and mtime in the key, so an edited frame is never served from the cache
+            stat = os.stat(self.im_files[i])
+            key = f"{self.im_files[i]}:{stat.st_size}:{stat.st_mtime_ns}:{self.imgsz}:{int(rect_mode)}"
+            cached = image_cache.get(key)
+            if cached is None:
+                img, orig_shape, resized_shape = super().load_image(i, rect_mode)
+                image_cache.put(key, img, orig_shape)
+                return img, orig_shape, resized_shape
+
+            img, orig_shape = np.array(cached[0]), cached[1]
+            # Same buffer bookkeeping as BaseDataset.load_image: mosaic draws its extra images from it
+            if self.augment:
+                self.ims[i], self.im_hw0[i], self.im_hw[i] = img, orig_shape, img.shape[:2]
+                self.buffer.append(i)
+                if 1 < len(self.buffer) >= self.max_buffer_length:
+                    j = self.buffer.pop(0)
+                    if self.cache != "ram":
+                        self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+            return img, orig_shape, img.shape[:2]
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            # Same arguments as ultralytics.data.build_yolo_dataset, with the cached dataset class
+            cfg = self.args
+            stride = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+            return CachedYOLODataset(
+                img_path=img_path,
+                imgsz=cfg.imgsz,
+                batch_size=batch,
+                augment=mode == "train",
+                hyp=cfg,
+                rect=cfg.rect or mode == "val",
+                cache=cfg.cache or None,
+                single_cls=cfg.single_cls or False,
+                stride=stride,
+                pad=0.0 if mode == "train" else 0.5,
+                prefix=colorstr(f"{mode}: "),
+                task=cfg.task,
+                classes=cfg.classes,
+                data=self.data,
+                fraction=cfg.fraction if mode == "train" else 1.0,
+            )
+
+    return CachedDetectionTrainer
+
+
+def _is_validation(relative_path, val_fraction):
+    """Deterministically assign whole frames to the validation split."""
+    return zlib.crc32(relative_path.encode("utf-8")) % 1000 < val_fraction * 1000
+
+
+def build_tiled_dataset(tile_size=640, overlap=0.2, min_visibility=0.5, val_fraction=0.1,
+                        annotations_dir=ANNOTATIONS_DIR, image_root_dir=IMAGE_ROOT_DIR,
+                        output_dir=TILES_OUTPUT_DIR, class_mapping_file=CLASS_MAPPING_FILE):
+    """
+    Slice every annotated frame into overlapping tile_size tiles and write a YOLO
+    dataset (images/, labels/, data.yaml) with labels remapped to each tile.
+    Boxes that keep less than min_visibility of their area inside a tile are dropped.
+    Returns the path of the generated data.yaml.
+    """
+    with open(class_mapping_file, "r", encoding="utf-8") as f:
+        class_mapping = json.load(f)
+
+    # Whole-dataset box arrays from the columnar packs instead of parsing every JSON file
+    dataset = load_dataset(annotations_dir)
+    # The packs' class list is append-only, so only look up the classes some box still uses
+    class_ids_by_code = np.full(len(dataset["class_names"]), -1, dtype=np.int64)
+    for code in np.unique(dataset["class_codes"]):
+        class_ids_by_code[code] = class_mapping[dataset["class_names"][code]]
+    xyxy = dataset["boxes"].copy()
+    xyxy[:, 2:] += xyxy[:, :2]
+
+    tile_count = 0
+    for i, frame_image in enumerate(dataset["frame_images"]):
+        rows = slice(dataset["frame_offsets"][i], dataset["frame_offsets"][i + 1])
+        relative_path = os.path.normpath(frame_image)
+        img = cv2.imread(os.path.join(image_root_dir, relative_path), cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"Warning: Unable to read image {relative_path}")
+            continue
+
+        boxes = xyxy[rows]
+        class_ids = class_ids_by_code[dataset["class_codes"][rows]]
+
+        split = "val" if _is_validation(relative_path, val_fraction) else "train"
+        base_name, _ = os.path.splitext(relative_path)
+        image_dir = os.path.join(output_dir, "images", split, os.path.dirname(base_name))
+        label_dir = os.path.join(output_dir, "labels", split, os.path.dirname(base_name))
+        os.makedirs(image_dir, exist_ok=True)
+        os.makedirs(label_dir, exist_ok=True)
+
+        h, w = img.shape[:2]
+        for x, y, tw, th in compute_tiles(w, h, tile_size, overlap):
+            tile_boxes, keep = slice_boxes(boxes, (x, y, tw, th), min_visibility)
+            tile_name = f"{os.path.basename(base_name)}_{x}_{y}"
+            cv2.imwrite(os.path.join(image_dir, f"{tile_name}.png"), img[y:y + th, x:x + tw])
+
+            with open(os.path.join(label_dir, f"{tile_name}.txt"), "w") as label_file:
+                for (x1, y1, x2, y2), class_id in zip(tile_boxes, class_ids[keep]):
+                    label_file.write(f"{class_id} {(x1 + x2) / 2 / tw} {(y1 + y2) / 2 / th} "
+                                     f"{(x2 - x1) / tw} {(y2 - y1) / th}\n")
+            tile_count += 1
+
+    names = {class_id: component_type for component_type, class_id in class_mapping.items()}
+    data_yaml = os.path.join(output_dir, "data.yaml")
+    with open(data_yaml, "w", encoding="utf-8") as f:
+        f.write(f"path: {os.path.abspath(output_dir)}\n")
+        f.write("train: images/train\n")
+        f.write("val: images/val\n")
+        f.write("names:\n")
+        for class_id in sorted(names):
+            f.write(f"  {class_id}: {json.dumps(names[class_id])}\n")
+
+    print(f"Wrote {tile_count} tiles of {tile_size}px to {output_dir}")
+    return data_yaml
@@ -4,21 +4,92 @@ start_application.py
 
 Usage:
   python start_application.py
+  python start_application.py --prod [--workers 4] [--build]
 
 What it does:
   1) Activates the __env virtual environment in Windows.
   2) Starts the Uvicorn (FastAPI) backend on port 8000.
   3) Starts the Vite/React frontend dev server (npm run dev).
 
+With --prod there is no reload watcher and no dev server: the built frontend
+(frontend/dist, see --build) is served by the backend itself, which runs
+several worker processes with uvloop/httptools when they are installed.
+Health and readiness are reported on /health and /ready.
+
 Stop with Ctrl + C.
 """
 
 import os
 import sys
+import argparse
 import subprocess
 import platform
 
+def has_module(python_exe, module):
+    """Whether module can be imported by the given interpreter."""
+    return subprocess.call([python_exe, "-c", f"import {module}"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+
+def start_production(python_exe, args):
+    """Run the backend with multiple workers, serving the built frontend. Returns the exit code."""
+    frontend_cwd = os.path.join(os.getcwd(), "frontend")
+    dist_path = os.path.join(frontend_cwd, "dist")
+
+    if args.build:
+        print("Building Frontend (Vite + React)...")
+        if subprocess.call("npm run build", cwd=frontend_cwd, shell=True) != 0:
+            print("Error: frontend build failed.")
+            return 1
+    if not os.path.isfile(os.path.join(dist_path, "index.html")):
+        print(f"Warning: no built frontend at {dist_path}; run with --build. Serving the API only.")
+
+    loop = "uvloop" if has_module(python_exe, "uvloop") else "asyncio"
+    http = "httptools" if has_module(python_exe, "httptools") else "h11"
+
+    backend_command = [
+        python_exe,
+        "-m", "uvicorn",
+        "backend.main:app",
+        "--host", args.host,
+        "--port", str(args.port),
+        "--workers", str(args.workers),
+        "--loop", loop,
+        "--http", http,
+        "--timeout-keep-alive", str(args.keep_alive),
+        "--backlog", str(args.backlog),
+        "--timeout-graceful-shutdown", str(args.graceful_timeout),
+        "--no-access-log",
+    ]
+
+    env = dict(os.environ, FRONTEND_DIST_PATH=dist_path)
+    print(f"Starting Backend (FastAPI) with {args.workers} workers, {loop}/{http}, "
+          f"on http://{args.host}:{args.port} ...")
+    backend_process = subprocess.Popen(backend_command, cwd=os.getcwd(), env=env, shell=False)
+
+    try:
+        return backend_process.wait()
+    except KeyboardInterrupt:
+        # uvicorn drains in-flight requests on SIGTERM, up to --graceful-timeout seconds
+        print("Received Ctrl+C, shutting down gracefully...")
+        backend_process.terminate()
+        return backend_process.wait()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the backend and the frontend.")
+    parser.add_argument("--prod", action="store_true", help="Production mode: multi-worker backend serving the built frontend.")
+    parser.add_argument("--build", action="store_true", help="Build the frontend before starting (production mode).")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=min(8, (os.cpu_count() or 1) + 1),
+                        help="Worker processes (production mode).")
+    parser.add_argument("--keep-alive", type=int, default=15, help="Seconds to keep idle HTTP connections open.")
+    parser.add_argument("--backlog", type=int, default=2048, help="Maximum number of pending connections.")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="Seconds to wait for in-flight requests on shutdown.")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     # 1. Paths to environment and commands
     venv_name = ".env"  # Change if your venv is named differently
     # Python and pip executables inside the virtual environment
@@ -35,14 +106,19 @@ def main():
         print("Make sure .env exists and is a valid virtual environment.")
         sys.exit(1)
 
+    if args.prod:
+        sys.exit(start_production(python_exe, args))
+
     # 3. Start backend (Uvicorn) using the environment python
     backend_command = [
         python_exe, 
         "-m", "uvicorn", 
         "backend.main:app", 
         "--reload", 
-        "--host", "0.0.0.0", 
-        "--port", "8000"
+        # Only watch the code: watching the huge data folders costs CPU
+        "--reload-dir", "backend",
+        "--host", args.host, 
+        "--port", str(args.port)
     ]
 
     # We'll run this from the 'backend' folder
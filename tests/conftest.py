@@ -0,0 +1,24 @@
+import os
+import sys
+import warnings
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    '''
+    Test client of the app, run in an empty data tree (the configured paths are relative).
+    '''
+    # Deprecation notices of the installed FastAPI/Starlette versions, not of this code
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from fastapi.testclient import TestClient
+        from backend.main import app
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "annotations").mkdir(parents=True)
+    (tmp_path / "data" / "frames").mkdir(parents=True)
+    return TestClient(app)
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def files(client):
+    os.makedirs(os.path.join("data", "frames", "v"))
+    with open(os.path.join("data", "frames", "v", "frame_1.png"), "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    os.makedirs(os.path.join("data", "annotations", "v"))
+    with open(os.path.join("data", "annotations", "v", "frame_1.json"), "w") as f:
+        json.dump({"name": "frame_1.png", "annotations": []}, f)
+
+
+@pytest.mark.parametrize("url, path", [
+    ("/frames/file", "v/frame_1.png"),
+    ("/datasets/file", "v/frame_1.json"),
+])
+def test_matching_validators_answer_304(client, files, url, path):
+    first = client.get(url, params={"path": path})
+    assert first.status_code == 200
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    for headers in ({"If-None-Match": etag},
+                    {"If-None-Match": f"W/{etag}"},
+                    {"If-None-Match": f'"other", {etag}'},
+                    {"If-None-Match": "*"},
+                    {"If-Modified-Since": last_modified}):
+        response = client.get(url, params={"path": path}, headers=headers)
+        assert response.status_code == 304, headers
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    # If-None-Match takes precedence over If-Modified-Since
+    response = client.get(url, params={"path": path},
+                          headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.content == first.content
+
+
+def test_saved_annotation_gets_a_new_etag(client, files):
+    params = {"path": "v/frame_1.json"}
+    etag = client.get("/datasets/file", params=params).headers["etag"]
+    saved = client.post("/datasets/annotations", params={"path": "v/frame_1.png"},
+                        json={"name": "frame_1.png", "annotations": [], "isReady": False})
+    assert saved.headers["etag"] != etag
+
+    response = client.get("/datasets/file", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == saved.headers["etag"]
+    assert client.get("/datasets/file", params=params,
+                      headers={"If-None-Match": saved.headers["etag"]}).status_code == 304
+
+
+def test_frames_are_cached_as_immutable(client, files):
+    response = client.get("/frames/file", params={"path": "v/frame_1.png"})
+    assert "immutable" in response.headers["cache-control"]
+    response = client.get("/datasets/file", params={"path": "v/frame_1.json"})
+    assert response.headers["cache-control"] == "no-cache"
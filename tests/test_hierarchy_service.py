@@ -0,0 +1,101 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.hierarchy_service import enclosing_ids, infer_hierarchy  # noqa: E402
+
+
+def box(x, y, width, height):
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
+def contains(outer, inner):
+    return (outer["x"] <= inner["x"] and outer["y"] <= inner["y"]
+            and outer["x"] + outer["width"] >= inner["x"] + inner["width"]
+            and outer["y"] + outer["height"] >= inner["y"] + inner["height"])
+
+
+def rank(ann):
+    return (ann["bounding_box"]["width"] * ann["bounding_box"]["height"], -ann["id"])
+
+
+def reference_parents(annotations):
+    # O(n^2): the lowest-ranked box that ranks above the annotation and contains it
+    parents = {}
+    for ann in annotations:
+        candidates = [other for other in annotations
+                      if rank(other) > rank(ann) and contains(other["bounding_box"], ann["bounding_box"])]
+        parents[ann["id"]] = min(candidates, key=rank)["id"] if candidates else None
+    return parents
+
+
+def reference_enclosing(annotations, bbox):
+    candidates = [ann for ann in annotations if contains(ann["bounding_box"], bbox)]
+    return min(candidates, key=rank)["id"] if candidates else None
+
+
+def annotations_from(boxes):
+    return [{"id": i, "bounding_box": bbox} for i, bbox in enumerate(boxes)]
+
+
+def check(boxes):
+    annotations = infer_hierarchy(annotations_from(boxes))
+    expected = reference_parents(annotations)
+    assert {ann["id"]: ann["parent_id"] for ann in annotations} == expected
+    for ann in annotations:
+        assert sorted(ann["children"]) == sorted(i for i, parent in expected.items() if parent == ann["id"])
+    assert enclosing_ids(annotations, boxes) == [reference_enclosing(annotations, bbox) for bbox in boxes]
+
+
+def nested_layout(rng, count):
+    # UI-like screens: boxes mostly placed inside an earlier box, on a coarse grid so ties are common
+    boxes = [box(0, 0, 64, 64)]
+    while len(boxes) < count:
+        outer = rng.choice(boxes)
+        width = rng.randint(0, outer["width"])
+        height = rng.randint(0, outer["height"])
+        boxes.append(box(outer["x"] + rng.randint(0, outer["width"] - width),
+                         outer["y"] + rng.randint(0, outer["height"] - height), width, height))
+    return boxes
+
+
+def test_matches_reference_on_random_nested_layouts():
+    rng = random.Random(0)
+    for _ in range(200):
+        check(nested_layout(rng, rng.randint(1, 40)))
+
+
+def test_matches_reference_on_random_overlapping_boxes():
+    rng = random.Random(1)
+    for _ in range(200):
+        check([box(rng.randint(0, 8), rng.randint(0, 8), rng.randint(0, 8), rng.randint(0, 8))
+               for _ in range(rng.randint(1, 30))])
+
+
+def test_equal_area_ties():
+    check([box(0, 0, 4, 4), box(0, 0, 2, 8), box(0, 0, 8, 2), box(0, 0, 2, 2), box(2, 2, 2, 2)])
+
+
+def test_identical_boxes_form_a_chain_in_id_order():
+    annotations = infer_hierarchy(annotations_from([box(1, 1, 5, 5)] * 4))
+    assert [ann["parent_id"] for ann in annotations] == [None, 0, 1, 2]
+    check([box(1, 1, 5, 5)] * 4 + [box(2, 2, 1, 1)] * 3)
+
+
+def test_float_edges():
+    # x + width lands on rounded values, e.g. 0.1 + 0.2 != 0.3
+    check([
+        box(0.1, 0.1, 0.2, 0.2),
+        box(0.1, 0.1, 0.19999999999999998, 0.2),
+        box(0.2, 0.2, 0.1, 0.1),
+        box(0.0, 0.0, 0.30000000000000004, 0.30000000000000004),
+        box(1e-9, 1e-9, 0.3, 0.3),
+        box(1e6 + 0.1, 1e6 + 0.1, 0.2, 0.2),
+        box(1e6, 1e6, 0.30000000000000004, 0.3),
+    ])
+    rng = random.Random(2)
+    for _ in range(200):
+        check([box(rng.randint(0, 10) / 10, rng.randint(0, 10) / 10, rng.randint(0, 10) / 10, rng.randint(0, 10) / 10)
+               for _ in range(rng.randint(1, 30))])
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+FILES = [f"frame_{i}.json" for i in range(7)]
+
+
+@pytest.fixture
+def folder(client):
+    folder = os.path.join("data", "annotations", "v")
+    os.makedirs(os.path.join(folder, "sub"))
+    for name in FILES:
+        with open(os.path.join(folder, name), "w") as f:
+            json.dump({"name": name}, f)
+    return folder
+
+
+def get_page(client, limit, cursor=None, order="asc"):
+    params = {"path": "v", "limit": limit, "order": order}
+    if cursor is not None:
+        params["cursor"] = cursor
+    response = client.get("/datasets/list", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def all_pages(client, limit, order="asc"):
+    items, cursor = [], None
+    while True:
+        page = get_page(client, limit, cursor, order)
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 8])
+def test_pages_cover_the_listing_once(client, folder, order, limit):
+    full = client.get("/datasets/list", params={"path": "v", "order": order}).json()
+    # Folders come first in both orders
+    expected = ["sub"] + (FILES if order == "asc" else FILES[::-1])
+    assert full == expected
+    assert all_pages(client, limit, order) == expected
+    assert get_page(client, limit, order=order)["total"] == len(expected)
+
+
+@pytest.mark.parametrize("order, first_page, next_page", [
+    ("asc", ["sub", "frame_0.json", "frame_1.json"], ["frame_2.json", "frame_3.json", "frame_4.json"]),
+    ("desc", ["sub", "frame_6.json", "frame_5.json"], ["frame_4.json", "frame_3.json", "frame_2.json"]),
+])
+def test_cursor_survives_deletion_of_its_entry(client, folder, order, first_page, next_page):
+    page = get_page(client, 3, order=order)
+    assert page["items"] == first_page
+    # The entry the cursor points at disappears between two requests
+    os.remove(os.path.join(folder, first_page[-1]))
+    page = get_page(client, 3, page["next_cursor"], order)
+    assert page["items"] == next_page
+    assert page["total"] == len(FILES)
+
+
+def test_cursor_keeps_position_when_earlier_entries_change(client, folder):
+    page = get_page(client, 3)
+    os.remove(os.path.join(folder, "frame_0.json"))
+    with open(os.path.join(folder, "frame_00.json"), "w") as f:
+        json.dump({}, f)
+    assert get_page(client, 3, page["next_cursor"])["items"] == ["frame_2.json", "frame_3.json", "frame_4.json"]
+
+
+def test_frame_listing_pages(client):
+    folder = os.path.join("data", "frames", "v")
+    os.makedirs(folder)
+    names = [f"frame_{i}.png" for i in range(5)]
+    for name in names:
+        open(os.path.join(folder, name), "wb").close()
+    for order, expected in (("asc", names), ("desc", names[::-1])):
+        items, cursor = [], None
+        while True:
+            params = {"path": "v", "limit": 2, "order": order, "status": "all"}
+            if cursor is not None:
+                params["cursor"] = cursor
+            page = client.get("/frames/list", params=params).json()
+            items.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert items == expected
+
+
+def test_invalid_cursor_is_rejected(client, folder):
+    assert client.get("/datasets/list", params={"path": "v", "limit": 2, "cursor": "not-a-cursor"}).status_code == 400
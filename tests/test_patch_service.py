@@ -0,0 +1,126 @@
+import pytest
+
+from backend.services.patch_service import apply_annotation_changes, apply_json_patch
+
+DOC = {"name": "a.png", "isReady": False, "keywords": ["login"], "annotations": [{"id": 1}, {"id": 2}]}
+
+
+def test_json_patch_operations():
+    patched = apply_json_patch(DOC, [
+        {"op": "add", "path": "/keywords/-", "value": "form"},
+        {"op": "add", "path": "/keywords/0", "value": "start"},
+        {"op": "replace", "path": "/isReady", "value": True},
+        {"op": "remove", "path": "/annotations/0"},
+        {"op": "copy", "from": "/name", "path": "/frame"},
+        {"op": "move", "from": "/frame", "path": "/source"},
+        {"op": "add", "path": "/a~1b", "value": {"c~d": 1}},
+        {"op": "test", "path": "/a~1b/c~0d", "value": 1.0},
+    ])
+    assert patched == {"name": "a.png", "isReady": True, "keywords": ["start", "login", "form"],
+                       "annotations": [{"id": 2}], "source": "a.png", "a/b": {"c~d": 1}}
+    assert DOC["keywords"] == ["login"]
+
+
+def test_failed_patch_leaves_document_untouched():
+    doc = {"keywords": ["login"]}
+    with pytest.raises(ValueError):
+        apply_json_patch(doc, [{"op": "add", "path": "/keywords/-", "value": "x"},
+                               {"op": "remove", "path": "/missing"}])
+    assert doc == {"keywords": ["login"]}
+
+
+@pytest.mark.parametrize("value, expected, passes", [
+    (1, True, False),
+    (True, 1, False),
+    (0, False, False),
+    (1, 1.0, True),
+    ("1", 1, False),
+    (None, False, False),
+    ([1, True], [1, True], True),
+    ([1, True], [1, 1], False),
+    ({"a": 1}, {"a": True}, False),
+    ({"a": [None]}, {"a": [None]}, True),
+])
+def test_test_operation_compares_json_types(value, expected, passes):
+    operations = [{"op": "test", "path": "/a/0", "value": expected}]
+    if passes:
+        apply_json_patch({"a": [value]}, operations)
+    else:
+        with pytest.raises(ValueError):
+            apply_json_patch({"a": [value]}, operations)
+
+
+@pytest.mark.parametrize("pointer", ["/a/01", "/a/-1", "/a/+1", "/a/ 1", "/a/1.0", "/a/00/b"])
+def test_invalid_array_indices_are_rejected(pointer):
+    doc = {"a": [{"b": 1}, {"b": 2}]}
+    for operation in ({"op": "replace", "path": pointer, "value": 0},
+                      {"op": "remove", "path": pointer},
+                      {"op": "test", "path": pointer, "value": 2}):
+        with pytest.raises(ValueError):
+            apply_json_patch(doc, [operation])
+
+
+def test_invalid_operations():
+    for operations in (
+        [{"op": "replace", "path": "/missing", "value": 1}],
+        [{"op": "add", "path": "/a/5", "value": 1}],
+        [{"op": "move", "from": "/a", "path": "/a/0"}],
+        [{"op": "remove", "path": ""}],
+        [{"op": "add", "value": 1}],
+        [{"op": "merge", "path": "/a", "value": 1}],
+        [{"op": "add", "path": "a", "value": 1}],
+    ):
+        with pytest.raises(ValueError):
+            apply_json_patch({"a": [0]}, operations)
+
+
+def test_annotation_changes():
+    doc = {"name": "a.png", "annotations": [
+        {"id": 1, "children": [2, 3]},
+        {"id": 2, "parent_id": 1},
+        {"id": 3, "parent_id": 1},
+    ]}
+    updated = apply_annotation_changes(
+        doc,
+        upsert=[{"id": 3, "parent_id": 1, "component_type": "Button"}, {"id": 4, "parent_id": 2}],
+        delete=[2],
+        set_fields={"isReady": True},
+    )
+    assert updated == {"name": "a.png", "isReady": True, "annotations": [
+        {"id": 1, "children": [3]},
+        {"id": 3, "parent_id": 1, "component_type": "Button"},
+        {"id": 4, "parent_id": None},
+    ]}
+    assert len(doc["annotations"]) == 3
+
+
+def test_annotation_changes_errors():
+    with pytest.raises(ValueError):
+        apply_annotation_changes({"annotations": []}, upsert=[{"component_type": "Button"}])
+    with pytest.raises(ValueError):
+        apply_annotation_changes({"annotations": []}, set_fields={"annotations": []})
+
+
+def test_if_match_conflicts_answer_412(client):
+    params = {"path": "v/a.png"}
+    saved = client.post("/datasets/annotations", params=params, json={"name": "a.png", "annotations": []})
+    assert saved.status_code == 200
+    etag = saved.headers["etag"]
+
+    patched = client.patch("/datasets/annotations", params=params, headers={"If-Match": etag},
+                           json=[{"op": "add", "path": "/keywords", "value": ["login"]}])
+    assert patched.status_code == 200
+    assert patched.json()["etag"] == patched.headers["etag"] != etag
+
+    stale = {"If-Match": etag}
+    assert client.patch("/datasets/annotations", params=params, headers=stale,
+                        json={"set": {"isReady": True}}).status_code == 412
+    assert client.post("/datasets/annotations", params=params, headers=stale,
+                       json={"name": "a.png", "annotations": []}).status_code == 412
+    assert client.get("/datasets/file", params={"path": "v/a.json"}).json()["keywords"] == ["login"]
+
+    current = {"If-Match": patched.headers["etag"]}
+    assert client.patch("/datasets/annotations", params=params, headers=current,
+                        json={"set": {"isReady": False}}).status_code == 200
+    assert client.patch("/datasets/annotations", params=params,
+                        json=[{"op": "test", "path": "/isReady", "value": 0}]).status_code == 400
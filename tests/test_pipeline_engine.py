@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "scripts")]
+
+from pipeline_engine import Pipeline, Stage, StateStore  # noqa: E402
+
+ITEMS = ["a", "b", "c", "d"]
+
+
+def run_with_timeout(pipeline, timeout=10):
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(pipeline.run(discover)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline run hung"
+    return results
+
+
+def discover(pipeline):
+    for item in ITEMS:
+        pipeline.submit("stage", item)
+
+
+def make_pipeline(tmp_path, processed, ready=None):
+    stage = Stage("stage", lambda item, emit: processed.append(item), key=lambda item: "key", ready=ready)
+    state = StateStore(str(tmp_path / "state.db"))
+    return Pipeline([stage], state, quiet=True), state
+
+
+def test_ready_exception_marks_item_failed(tmp_path):
+    def ready(item):
+        if item == "b":
+            raise ValueError("unreadable annotation")
+        return True
+
+    processed = []
+    pipeline, state = make_pipeline(tmp_path, processed, ready)
+    results = run_with_timeout(pipeline)
+
+    assert results["stage"]["failed"] == 1
+    assert results["stage"]["done"] == 3
+    assert sorted(processed) == ["a", "c", "d"]
+    assert state.status("stage", "b") == "failed"
+    assert all(state.status("stage", item) == "done" for item in ("a", "c", "d"))
+
+
+def test_worker_survives_unexpected_exception(tmp_path):
+    processed = []
+    pipeline, _ = make_pipeline(tmp_path, processed)
+    process = pipeline.process
+
+    def crashing_process(stage, item, key):
+        if item == "a":
+            raise RuntimeError("state store unavailable")
+        process(stage, item, key)
+
+    pipeline.process = crashing_process
+    results = run_with_timeout(pipeline)
+
+    assert results["stage"]["done"] == 3
+    assert sorted(processed) == ["b", "c", "d"]
+    assert pipeline.pending == 0